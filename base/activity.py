@@ -0,0 +1,104 @@
+"""
+Heartbeat-based activity tracking for ProductivityTracker.hours_worked.
+
+Every authenticated request (and the page's periodic ping) is a heartbeat.
+The time since an employee's previous heartbeat is credited to them when it
+is shorter than ACTIVITY_IDLE_TIMEOUT; longer gaps count as time away. The
+last-seen timestamps live in the shared cache so all workers agree on them.
+The gap after a timestamp is claimed with an atomic `cache.add` before it
+is credited, so concurrent heartbeats that read the same timestamp credit
+it once. Credited time is buffered per process and written in one UPSERT
+every ACTIVITY_FLUSH_INTERVAL seconds.
+"""
+import atexit
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.timezone import now
+
+from .models import ProductivityTracker
+
+_lock = threading.Lock()
+_pending = Counter()  # (employee_id, date) -> seconds not yet written
+_last_flush = time.monotonic()
+
+SECONDS_PER_HUNDREDTH_HOUR = 36
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _last_seen_key(employee_id):
+    return f'activity:last_seen:{employee_id}'
+
+
+def _claim(employee_id, last_seen, timeout):
+    """Claim the gap after `last_seen`; True for exactly one caller per timestamp."""
+    return cache.add(f'activity:claimed:{employee_id}:{last_seen!r}', True, timeout=timeout)
+
+
+def heartbeat(employee_id, at=None):
+    """Record that `employee_id` is active and credit the time since their last heartbeat."""
+    at = at or now()
+    idle_timeout = _setting('ACTIVITY_IDLE_TIMEOUT', 15 * 60)
+    key = _last_seen_key(employee_id)
+    last_seen = cache.get(key)
+    if last_seen is None:
+        cache.add(key, at.timestamp(), timeout=idle_timeout)  # Start of a session: nothing to credit yet
+        return
+    gap = at.timestamp() - last_seen
+    if gap < _setting('ACTIVITY_MIN_HEARTBEAT', 30):
+        return  # Let short bursts of requests accumulate into one credit
+    if not _claim(employee_id, last_seen, idle_timeout):
+        return  # A concurrent heartbeat already credited this gap
+    if gap <= idle_timeout:
+        with _lock:
+            _pending[(employee_id, at.date())] += gap
+    cache.set(key, at.timestamp(), timeout=idle_timeout)
+
+
+def end_session(employee_id):
+    """Credit the final stretch of a session and forget the employee's last heartbeat."""
+    idle_timeout = _setting('ACTIVITY_IDLE_TIMEOUT', 15 * 60)
+    key = _last_seen_key(employee_id)
+    last_seen = cache.get(key)
+    if last_seen is not None and _claim(employee_id, last_seen, idle_timeout):
+        at = now()
+        gap = at.timestamp() - last_seen
+        if 0 < gap <= idle_timeout:
+            with _lock:
+                _pending[(employee_id, at.date())] += gap
+    cache.delete(key)
+
+
+def flush(force=False):
+    """Write buffered hours to ProductivityTracker if the flush interval has passed (or `force`)."""
+    global _last_flush
+    with _lock:
+        if not force and time.monotonic() - _last_flush < _setting('ACTIVITY_FLUSH_INTERVAL', 5 * 60):
+            return
+        _last_flush = time.monotonic()
+        batch = {}
+        for key, seconds in _pending.items():
+            # hours_worked has two decimal places; carry the remainder to the next flush
+            hundredths = int(seconds // SECONDS_PER_HUNDREDTH_HOUR)
+            if hundredths:
+                batch[key] = Decimal(hundredths) / 100
+                _pending[key] = seconds - hundredths * SECONDS_PER_HUNDREDTH_HOUR
+        for key in [key for key, seconds in _pending.items() if not seconds]:
+            del _pending[key]
+    if batch:
+        write_hours(batch)
+
+
+def write_hours(batch):
+    """Add `batch` ({(employee_id, date): Decimal hours}) to ProductivityTracker in one statement."""
+    ProductivityTracker.increment({key: {'hours_worked': hours} for key, hours in batch.items()})
+
+
+atexit.register(flush, force=True)
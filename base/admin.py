@@ -13,5 +13,8 @@ admin.site.register(ProductivityTracker)
 admin.site.register(PredefinedTask)
 admin.site.register(Sale)
 admin.site.register(AgentProfit)
-
-
+admin.site.register(PerformanceEvent)
+admin.site.register(DailySalesRollup)
+admin.site.register(MonthlySalesRollup)
+admin.site.register(PropertyFacetCount)
+admin.site.register(PriceModel)
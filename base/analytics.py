@@ -0,0 +1,35 @@
+"""
+Price statistics over PropertyListing for the predictive analysis page.
+
+Group averages are computed by the database (`values().annotate(Avg())`), so
+no listing is loaded to produce them. Per-listing series are read with
+`values_list` straight into NumPy arrays; nothing here instantiates a model.
+"""
+import numpy as np
+from django.db.models import Avg, Count, FloatField
+from django.db.models.functions import Cast
+
+
+def average_price_by(queryset, field):
+    """[(value, average price, listings)] for each `field` value, ordered by value."""
+    rows = (
+        queryset.order_by()
+        .values(field)
+        .annotate(average=Avg(Cast('price', FloatField())), listings=Count('pk'))
+        .order_by(field)
+        .values_list(field, 'average', 'listings')
+    )
+    return [(value, round(average, 2), listings) for value, average, listings in rows]
+
+
+def columns(queryset, *fields, dtype=float):
+    """One NumPy array per field in `fields`, read without creating model instances."""
+    rows = queryset.order_by().values_list(*fields)
+    data = np.array(list(rows), dtype=dtype).reshape(-1, len(fields))
+    return tuple(data.T)
+
+
+def price_vs_area(queryset):
+    """Scatter points {'x': covered area (sqft), 'y': price} for listings with a parsed area."""
+    area, price = columns(queryset.filter(covered_area_sqft__isnull=False), 'covered_area_sqft', 'price')
+    return [{'x': x, 'y': y} for x, y in zip(area.tolist(), price.tolist())]
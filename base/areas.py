@@ -0,0 +1,64 @@
+"""
+Parsing of free-text covered areas ("1,200 sqft", "110 sq m", "800-1000 Sq-ft")
+into square feet.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+SQFT_PER_UNIT = {
+    'sqft': Decimal('1'),
+    'sqm': Decimal('10.7639'),
+    'sqyd': Decimal('9'),
+    'acre': Decimal('43560'),
+    'hectare': Decimal('107639.104'),
+}
+
+# Spellings seen in listings, matched after lower-casing and dropping spaces, dots and dashes
+UNIT_ALIASES = {
+    'sqft': ('sqft', 'sqfeet', 'squarefeet', 'squarefoot', 'sft', 'ft2', 'ft²', 'feet', 'ft'),
+    'sqm': ('sqm', 'sqmt', 'sqmtr', 'sqmeter', 'sqmetre', 'squaremeter', 'squaremetre', 'squaremeters',
+            'squaremetres', 'm2', 'm²'),
+    'sqyd': ('sqyd', 'sqyrd', 'sqyard', 'sqyards', 'squareyard', 'squareyards', 'yd2', 'yd²', 'gaj'),
+    'acre': ('acre', 'acres'),
+    'hectare': ('hectare', 'hectares', 'ha'),
+}
+UNITS = {alias: unit for unit, aliases in UNIT_ALIASES.items() for alias in aliases}
+
+NUMBER = r'\d[\d,]*(?:\.\d+)?|\.\d+'
+AREA_PATTERN = re.compile(
+    rf'^\s*(?P<low>{NUMBER})\s*(?:(?:-|–|to)\s*(?P<high>{NUMBER}))?\s*(?P<unit>[^\d]*?)\s*$',
+    re.IGNORECASE,
+)
+MISSING_VALUES = ('', 'na', 'n/a', 'none')
+
+
+def normalize_unit(unit):
+    """Canonical unit name for `unit` ('sqft' when blank), or None if it is not recognised."""
+    key = re.sub(r'[\s.\-_]', '', (unit or '').lower())
+    if key in MISSING_VALUES:
+        return 'sqft'
+    return UNITS.get(key)
+
+
+def parse_area_sqft(text, unit=None):
+    """
+    Covered area in square feet, as a Decimal rounded to 2 places, or None when
+    `text` is missing or unparseable. A range ("800-1000") gives its midpoint;
+    `unit` is used when the text has no unit of its own, defaulting to sqft.
+    """
+    if text is None or str(text).strip().lower() in MISSING_VALUES:
+        return None
+    match = AREA_PATTERN.match(str(text))
+    if not match:
+        return None
+    unit = normalize_unit(match['unit'] or unit)
+    if unit is None:
+        return None
+    try:
+        low = Decimal(match['low'].replace(',', ''))
+        high = Decimal(match['high'].replace(',', '')) if match['high'] else low
+    except InvalidOperation:
+        return None
+    if low <= 0 or high < low:
+        return None
+    return ((low + high) / 2 * SQFT_PER_UNIT[unit]).quantize(Decimal('0.01'))
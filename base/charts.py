@@ -0,0 +1,117 @@
+"""
+Server-rendered charts, drawn with matplotlib's object-oriented API.
+
+`chart_url()` records a chart's input as a ChartSpec row under a hash of it
+and returns the URL it is served from; `render()` draws it as SVG or PNG.
+Each figure is built on its own Agg/SVG canvas rather than the global pyplot
+state, so nothing is left behind between requests. Rendered images are
+cached by hash, so an identical series is drawn once. The spec itself lives
+in the database, so a URL keeps resolving for as long as pages link it and
+never changes meaning, and browsers may cache it indefinitely; `prune()`
+(the prune_chart_specs command) removes specs no page has linked for a
+while. Imports matplotlib: import this module lazily from the code that
+draws a chart.
+"""
+import hashlib
+import io
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.timezone import now
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_svg import FigureCanvasSVG
+from matplotlib.figure import Figure
+
+from .models import ChartSpec
+
+FORMATS = {
+    # format: (canvas, content type)
+    'svg': (FigureCanvasSVG, 'image/svg+xml'),
+    'png': (FigureCanvasAgg, 'image/png'),
+}
+
+
+def cache_timeout():
+    return getattr(settings, 'CHART_CACHE_TIMEOUT', 30 * 24 * 60 * 60)
+
+
+def _known_key(digest):
+    return f'charts:known:{digest}'
+
+
+def _image_key(digest, fmt):
+    return f'charts:image:{digest}:{fmt}'
+
+
+def chart_url(data, title, labels=None, fmt='svg'):
+    """
+    URL of a line chart with optional x `labels`, registering it for rendering.
+    `data` is one sequence of values, or a mapping of legend label to values
+    for several lines on the same axes.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unsupported chart format {fmt!r}')
+    series = data.items() if isinstance(data, dict) else [(None, data)]
+    spec = {
+        'series': [[name, [float(value) for value in values]] for name, values in series],
+        'title': str(title),
+        'labels': [str(label) for label in labels] if labels is not None else None,
+    }
+    digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+    # Pages re-request the same charts, so only the first sighting per timeout writes
+    if cache.get(_known_key(digest)) is None:
+        ChartSpec.objects.update_or_create(
+            digest=digest, defaults={'last_used_at': now()}, create_defaults={'spec': spec},
+        )
+        cache.set(_known_key(digest), True, timeout=cache_timeout())
+    return reverse('chart', args=[digest, fmt])
+
+
+def prune(older_than=None):
+    """
+    Delete specs no page has linked for `older_than` (default: the chart
+    cache timeout, after which browsers have dropped their copies too).
+    Returns how many were deleted.
+    """
+    older_than = older_than or timedelta(seconds=cache_timeout())
+    deleted, _ = ChartSpec.objects.filter(last_used_at__lt=now() - older_than).delete()
+    return deleted
+
+
+def render(spec, fmt='svg'):
+    """Draw `spec` and return the image bytes."""
+    canvas_class, _ = FORMATS[fmt]
+    figure = Figure(figsize=(5, 3))
+    canvas_class(figure)
+    axes = figure.add_subplot()
+    for name, values in spec['series']:
+        axes.plot(values, marker='o', linestyle='-', label=name)
+    if any(name for name, _ in spec['series']):
+        axes.legend()
+    if spec['labels']:
+        axes.set_xticks(range(len(spec['labels'])), spec['labels'], rotation=45, ha='right')
+    axes.set_title(spec['title'])
+    axes.grid(True)
+    figure.tight_layout()
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format=fmt)
+    figure.clear()
+    return buffer.getvalue()
+
+
+def get_image(digest, fmt):
+    """(image bytes, content type) for a registered chart, or None if it is unknown."""
+    if fmt not in FORMATS:
+        return None
+    image = cache.get(_image_key(digest, fmt))
+    if image is None:
+        spec = ChartSpec.objects.filter(digest=digest).values_list('spec', flat=True).first()
+        if spec is None:
+            return None
+        image = render(spec, fmt)
+        cache.set(_image_key(digest, fmt), image, timeout=cache_timeout())
+    return image, FORMATS[fmt][1]
@@ -0,0 +1,160 @@
+"""
+Comparable properties ("comps") from a nearest-neighbour index.
+
+Listings with a parsed covered area are embedded as standardized vectors of
+floors, log covered area, bedrooms and bathrooms, and indexed in one KD-tree
+per location plus a global one. A lookup searches the listing's own location
+first and tops up from the global tree when the location has too few
+listings, so it is a pair of tree queries rather than a scan.
+
+The index is built only by the rebuild_comps_index command, from
+`values_list` columns, and stored as a ComparablesIndex row stamped with the
+'listings' data version, like the price model. The newest row is served:
+each worker looks up its id, unpickles it once and keeps it in memory, so
+every host switches to a new build as soon as it is committed. Until the
+first build, lookups return no comparables. Run the command on a schedule
+with --if-stale to rebuild once more than COMPS_REFRESH_THRESHOLD listing
+writes have happened. Results are re-read from the database, so deleted
+listings drop out and shown values are always current.
+"""
+import pickle
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from sklearn.neighbors import KDTree
+
+from .analytics import columns
+from .models import ComparablesIndex, PropertyListing
+from .pricing import FEATURES
+from .snapshots import get_version
+
+DEFAULT_COUNT = 10
+KEEP_VERSIONS = 2  # Older ComparablesIndex rows are pruned after each build
+
+_lock = threading.Lock()
+_loaded = None  # (ComparablesIndex id, index) held by this worker
+
+
+def refresh_threshold():
+    return getattr(settings, 'COMPS_REFRESH_THRESHOLD', 100)
+
+
+def _embed(X):
+    """Raw FEATURES columns to the space distances are measured in."""
+    X = np.array(X, dtype=float)
+    X[:, 1] = np.log1p(np.clip(X[:, 1], 0, None))  # Area differences matter relatively, not absolutely
+    return X
+
+
+def build():
+    """Build the index from the current listings and store it as the newest ComparablesIndex."""
+    # Read the stamp first, so changes made while building count towards the next run
+    version = get_version('listings')
+    queryset = PropertyListing.objects.filter(covered_area_sqft__isnull=False)
+    ids, locations, *data = columns(queryset, 'id', 'location', *FEATURES, dtype=object)
+    X = _embed(np.column_stack(data).astype(float) if len(ids) else np.empty((0, len(FEATURES))))
+
+    index = {'ids': ids, 'locations': {}, 'global': None}
+    if len(ids):
+        index['medians'] = np.median(X, axis=0)
+        index['mean'] = X.mean(axis=0)
+        index['scale'] = np.where(X.std(axis=0) > 0, X.std(axis=0), 1.0)
+        X = (X - index['mean']) / index['scale']
+        index['global'] = KDTree(X)
+        for location in np.unique(locations):
+            rows = np.flatnonzero(locations == location)
+            index['locations'][location] = (KDTree(X[rows]), rows)
+
+    with transaction.atomic():
+        ComparablesIndex.objects.create(
+            data_version=version,
+            listing_count=len(ids),
+            location_count=len(index['locations']),
+            artifact=pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL),
+        )
+        stale = ComparablesIndex.objects.order_by('-pk').values_list('pk', flat=True)[KEEP_VERSIONS:]
+        ComparablesIndex.objects.filter(pk__in=list(stale)).delete()
+    return index
+
+
+def is_stale(threshold=None):
+    """True when there is no index yet or more than `threshold` listing writes happened since it was built."""
+    threshold = refresh_threshold() if threshold is None else threshold
+    built = ComparablesIndex.objects.order_by('-pk').values_list('data_version', flat=True).first()
+    if built is None:
+        return True
+    changes = get_version('listings') - built
+    # A stamp ahead of the counter predates the counter living in the database
+    return changes < 0 or changes > threshold
+
+
+def current():
+    """This worker's copy of the newest built index, or None until rebuild_comps_index has run."""
+    global _loaded
+    active_id = ComparablesIndex.objects.order_by('-pk').values_list('pk', flat=True).first()
+    if active_id is None:
+        return None
+    if _loaded is not None and _loaded[0] == active_id:
+        return _loaded[1]
+    with _lock:
+        if _loaded is None or _loaded[0] != active_id:
+            artifact = ComparablesIndex.objects.filter(pk=active_id).values_list('artifact', flat=True).first()
+            if artifact is None:
+                return None  # Pruned by a build in the meantime; the next call finds its successor
+            _loaded = (active_id, pickle.loads(artifact))
+        return _loaded[1]
+
+
+def _query(tree, rows, x, count):
+    count = min(count, len(rows))
+    distances, positions = tree.query(x, k=count)
+    return zip(rows[positions[0]], distances[0])
+
+
+def nearest(location, features, count=DEFAULT_COUNT, exclude=None):
+    """
+    [(listing id, distance, same_location)] for the `count` listings closest to
+    `features` (a dict of FEATURES values; missing ones use the medians),
+    preferring listings in `location`. `exclude` is a listing id to leave out.
+    """
+    index = current()
+    if index is None or index['global'] is None:
+        return []
+    x = np.array([[np.nan if features.get(name) is None else float(features[name]) for name in FEATURES]])
+    x = _embed(x)
+    x = np.where(np.isnan(x), index['medians'], x)
+    x = (x - index['mean']) / index['scale']
+
+    # A little extra in case some of the indexed listings were deleted since the build
+    wanted = count + 1 + refresh_threshold() // 20
+    found, seen = [], set()
+    searches = [(index['locations'][location], True)] if location in index['locations'] else []
+    searches.append(((index['global'], np.arange(len(index['ids']))), False))
+    for (tree, rows), same_location in searches:
+        for row, distance in _query(tree, rows, x, wanted):
+            listing_id = index['ids'][row]
+            if listing_id not in seen and listing_id != exclude:
+                seen.add(listing_id)
+                found.append((listing_id, float(distance), same_location))
+        if len(found) >= wanted:
+            break
+    return found
+
+
+def comparables(location, features, count=DEFAULT_COUNT, exclude=None):
+    """[(listing, distance, same_location)] for the nearest listings that still exist."""
+    found = nearest(location, features, count, exclude)
+    listings = PropertyListing.objects.in_bulk([listing_id for listing_id, _, _ in found])
+    return [
+        (listings[listing_id], distance, same_location)
+        for listing_id, distance, same_location in found
+        if listing_id in listings
+    ][:count]
+
+
+def comparables_for(listing, count=DEFAULT_COUNT):
+    """Comparables of an existing listing, excluding the listing itself."""
+    features = {name: getattr(listing, name) for name in FEATURES}
+    return comparables(listing.location, features, count, exclude=listing.pk)
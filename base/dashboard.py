@@ -0,0 +1,210 @@
+import json
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractDay
+from django.utils.timezone import now
+
+from .models import (
+    DailySalesRollup,
+    MonthlySalesRollup,
+    PerformanceMetrics,
+    PropertyListing,
+    Revenue,
+    Sale,
+    Task,
+)
+
+
+MONTH_LABELS = ["January", "February", "March", "April", "May", "June",
+                "July", "August", "September", "October", "November", "December"]
+
+
+def sales_totals():
+    """Total number of sales and their combined sale price, from the monthly rollup."""
+    totals = MonthlySalesRollup.objects.aggregate(count=Sum('sales_count'), revenue=Sum('sales_total'))
+    return totals['count'] or 0, totals['revenue'] or Decimal("0")
+
+
+def agent_sales_totals(employee):
+    """Sales count, revenue and average sale price for one agent, from the daily rollup."""
+    totals = DailySalesRollup.objects.filter(agent=employee).aggregate(
+        count=Sum('sales_count'), revenue=Sum('sales_total'),
+    )
+    count = totals['count'] or 0
+    revenue = totals['revenue'] or Decimal("0")
+    return count, revenue, (revenue / count if count else 0)
+
+
+def property_status_counts():
+    """Listing counts per status using conditional aggregation (one query)."""
+    return PropertyListing.objects.aggregate(
+        total=Count('id'),
+        available=Count('id', filter=Q(status='Available')),
+        sold=Count('id', filter=Q(status='Sold')),
+        under_contract=Count('id', filter=Q(status='Under Contract')),
+    )
+
+
+def monthly_sales_counts(year):
+    """Sales per calendar month of `year` as a 12-item list (one query)."""
+    counts = [0] * 12
+    rows = MonthlySalesRollup.objects.filter(year=year).values_list('month', 'sales_count')
+    for month, count in rows:
+        counts[month - 1] = count
+    return counts
+
+
+def sales_by_day_of_month(days=30):
+    """Sales grouped by day of month (1..days) as a list (one grouped query)."""
+    rows = (
+        DailySalesRollup.objects
+        .annotate(day=ExtractDay('date'))
+        .values('day')
+        .annotate(count=Sum('sales_count'))
+        .order_by()
+    )
+    counts = [0] * days
+    for row in rows:
+        if 1 <= row['day'] <= days:
+            counts[row['day'] - 1] = row['count']
+    return counts
+
+
+def top_agents(limit=5):
+    """Highest scoring agents with their user rows joined in."""
+    return list(
+        PerformanceMetrics.objects.select_related("employee__user").order_by("-aggregate_points")[:limit]
+    )
+
+
+def revenue_series():
+    """All revenue rows in chronological order."""
+    return list(Revenue.objects.order_by("year", "month"))
+
+
+def build_home_context():
+    """
+    Collect every series shown on the `home` dashboard.
+
+    Each block is a single aggregate or grouped query, so the page costs six
+    queries no matter how many sales or listings exist.
+    """
+    properties_sold, total_revenue = sales_totals()
+    status_counts = property_status_counts()
+    monthly_sales = monthly_sales_counts(now().year)
+    sales_data = sales_by_day_of_month()
+    agent_performance = top_agents()
+    revenue_entries = revenue_series()
+
+    # Latest Revenue row doubles as the net profit figure
+    net_profit = revenue_entries[-1].net_profit if revenue_entries else Decimal("0")
+
+    property_status_data = {
+        'labels': ['Available', 'Sold', 'Under Contract'],
+        'data': [
+            status_counts['available'],
+            properties_sold,
+            status_counts['under_contract'],
+        ]
+    }
+
+    agent_performance_data = {
+        'labels': [metric.employee.user.get_full_name() for metric in agent_performance],
+        'tasks_completed': [metric.tasks_completed for metric in agent_performance],
+        'sales_closed': [metric.sales_closed for metric in agent_performance],
+        'aggregate_points': [metric.aggregate_points for metric in agent_performance]
+    }
+
+    revenue_trends = {
+        'labels': [f"{entry.year}-{entry.month:02d}" for entry in revenue_entries],
+        'total_revenue': [float(entry.total_revenue) for entry in revenue_entries],
+        'total_expenses': [float(entry.total_expenses) for entry in revenue_entries],
+        'net_profit': [float(entry.net_profit) for entry in revenue_entries]
+    }
+
+    return {
+        "total_revenue": float(total_revenue),
+        "net_profit": float(net_profit),
+        "properties_sold": properties_sold,
+        "agent_performance": [
+            {
+                "name": metric.employee.user.get_full_name(),
+                "tasks_completed": metric.tasks_completed,
+                "sales_closed": metric.sales_closed,
+                "aggregate_points": metric.aggregate_points,
+            }
+            for metric in agent_performance
+        ],
+        "sales_data": json.dumps(sales_data),
+        "productivity_data": json.dumps([metric.tasks_completed for metric in agent_performance]),
+        "revenue_trends": json.dumps(revenue_trends),
+        "last_30_days": json.dumps([f"Day {i}" for i in range(1, 31)]),
+        "month_labels": json.dumps(MONTH_LABELS),
+        "property_status_data": json.dumps(property_status_data),
+        "agent_performance_data": json.dumps(agent_performance_data),
+        "monthly_sales": json.dumps(monthly_sales),
+    }
+
+
+def build_admin_context():
+    """
+    Collect everything shown on the `admin_panel` page.
+
+    Querysets are evaluated into lists so the result can be cached as a snapshot.
+    """
+    employee_performance = list(PerformanceMetrics.objects.select_related('employee__user'))
+
+    # Property Status
+    status_counts = property_status_counts()
+    sold_properties, _ = sales_totals()
+    property_status = {
+        'total_properties': status_counts['total'],
+        'available_properties': status_counts['available'],
+        'sold_properties': sold_properties,
+    }
+
+    # Financial Overview
+    totals = Revenue.objects.aggregate(total_revenue=Sum('total_revenue'), total_expenses=Sum('total_expenses'))
+    total_revenue = totals['total_revenue'] or 0
+    total_expenses = totals['total_expenses'] or 0
+    financial_overview = {
+        'total_revenue': total_revenue,
+        'total_expenses': total_expenses,
+        'net_profit': total_revenue - total_expenses,
+    }
+
+    # Revenue Trends Data - Get last 12 months of data
+    current_date = now()
+    revenue_data = Revenue.objects.filter(
+        Q(year=current_date.year) |
+        Q(year=current_date.year - 1, month__gt=current_date.month)
+    ).order_by('year', 'month')
+
+    revenue_trends = {
+        'labels': [],
+        'total_revenue': [],
+        'total_expenses': [],
+        'net_profit': []
+    }
+
+    for revenue in revenue_data:
+        revenue_trends['labels'].append(f"{revenue.year}-{revenue.month:02d}")
+        revenue_trends['total_revenue'].append(float(revenue.total_revenue))
+        revenue_trends['total_expenses'].append(float(revenue.total_expenses))
+        revenue_trends['net_profit'].append(float(revenue.net_profit))
+
+    # Recent Activities
+    recent_sales = list(Sale.objects.select_related('property_listing').order_by('-sale_date')[:5])
+    recent_tasks = list(
+        Task.objects.select_related('assigned_to__user', 'predefined_task').order_by('-due_date')[:5]
+    )
+
+    return {
+        'employee_performance': employee_performance,
+        'property_status': property_status,
+        'financial_overview': financial_overview,
+        'revenue_trends': json.dumps(revenue_trends),
+        'recent_sales': recent_sales,
+        'recent_tasks': recent_tasks,
+    }
@@ -0,0 +1,71 @@
+"""
+Per-transaction buffer for signal side effects.
+
+Receivers call `defer(name, key, **deltas)` instead of writing straight away.
+Deltas for the same (name, key) are summed, and once the surrounding
+transaction commits every registered handler receives its whole batch, so
+ten saves touching one agent on one day become a single write. Outside a
+transaction the effect is applied immediately.
+
+Deltas are buffered per savepoint: each savepoint level gets its own batch,
+registered with `transaction.on_commit` from inside that savepoint. Django
+drops the registration when the savepoint (or the whole transaction) rolls
+back, so a batch whose registration is gone is known to be rolled back and
+is discarded rather than reused.
+"""
+from collections import Counter, defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+_handlers = {}
+
+
+def handler(name):
+    """Register `func(batch)` to apply deferred effects named `name`.
+
+    `batch` maps each key passed to `defer` to a Counter of its summed deltas.
+    """
+    def register(func):
+        _handlers[name] = func
+        return func
+    return register
+
+
+def _new_batches():
+    return defaultdict(lambda: defaultdict(Counter))
+
+
+def _pending(connection, using):
+    """The live batches for the current savepoint level, registering a new one if needed."""
+    levels = getattr(connection, '_deferred_side_effects', None)
+    registered = {id(entry[1]) for entry in connection.run_on_commit}
+    # Forget batches whose on_commit registration was discarded by a rollback
+    levels = {sids: state for sids, state in (levels or {}).items() if id(state['flush']) in registered}
+    sids = tuple(connection.savepoint_ids)
+    state = levels.get(sids)
+    if state is None:
+        state = {'batches': _new_batches()}
+        state['flush'] = lambda: _flush(using, state['batches'])
+        levels[sids] = state
+        transaction.on_commit(state['flush'], using=using)
+    connection._deferred_side_effects = levels
+    return state
+
+
+def defer(name, key, using=DEFAULT_DB_ALIAS, **deltas):
+    """Add `deltas` to the pending `name` effect for `key`, flushed on commit."""
+    connection = connections[using]
+    if not connection.in_atomic_block:
+        # Autocommit: nothing to coalesce with, and no transaction to wait for
+        connection._deferred_side_effects = None
+        batches = _new_batches()
+        batches[name][key].update(deltas)
+        _flush(using, batches)
+        return
+    _pending(connection, using)['batches'][name][key].update(deltas)
+
+
+def _flush(using, batches):
+    with transaction.atomic(using=using):
+        for name, batch in batches.items():
+            _handlers[name](batch)
@@ -0,0 +1,144 @@
+"""
+Faceted browsing over PropertyListing.
+
+`selected_facets()` reads the chosen values from the query string,
+`filter_by_facets()` narrows a queryset to them, and `facet_counts()` returns
+the count beside every option. Unfiltered counts come straight from the
+precomputed PropertyFacetCount table. Once filters are applied, each facet is
+counted against every *other* active filter, so options within a facet stay
+selectable together; all facets are counted in a single UNION ALL query.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db.models import Case, CharField, Count, Q, Value, When
+from django.db.models.functions import Cast
+
+from .models import PropertyFacetCount, PropertyListing
+
+FACETS = [
+    ('status', 'Status'),
+    ('type', 'Property Type'),
+    ('location', 'Location'),
+    ('bedrooms', 'Bedrooms'),
+    ('bathrooms', 'Bathrooms'),
+    ('price', 'Price'),
+]
+MAX_OPTIONS = 15  # Options shown per facet, beyond the selected ones
+
+PRICE_LABELS = {value: label for value, label, _, _ in PropertyFacetCount.PRICE_BANDS}
+PRICE_LABELS[PropertyFacetCount.UNPRICED] = 'Price on request'
+
+
+def selected_facets(params):
+    """{facet: [values]} for the facets chosen in `params`."""
+    selected = {}
+    for facet, _ in FACETS:
+        values = [value for value in params.getlist(facet) if value]
+        if values:
+            selected[facet] = values
+    return selected
+
+
+def _price_band_q(value):
+    if value == PropertyFacetCount.UNPRICED:
+        return Q(price__isnull=True) | Q(price=0)
+    for band, _, low, high in PropertyFacetCount.PRICE_BANDS:
+        if band == value:
+            condition = Q(price__gte=low) & Q(price__gt=0)
+            return condition & Q(price__lt=high) if high is not None else condition
+    return Q(pk__in=[])
+
+
+def _facet_q(facet, values):
+    if facet == 'price':
+        return reduce(or_, (_price_band_q(value) for value in values))
+    return Q(**{f'{PropertyFacetCount.FIELD_FACETS[facet]}__in': values})
+
+
+def filter_by_facets(queryset, selected, exclude=None):
+    """`queryset` narrowed to the `selected` values (OR within a facet, AND across facets)."""
+    for facet, values in selected.items():
+        if facet != exclude:
+            queryset = queryset.filter(_facet_q(facet, values))
+    return queryset
+
+
+def _facet_expression(facet):
+    if facet == 'price':
+        whens = [When(Q(price__isnull=True) | Q(price=0), then=Value(PropertyFacetCount.UNPRICED))]
+        for band, _, low, high in PropertyFacetCount.PRICE_BANDS:
+            condition = Q(price__gte=low) if high is None else Q(price__gte=low, price__lt=high)
+            whens.append(When(condition, then=Value(band)))
+        return Case(*whens, default=Value(PropertyFacetCount.UNPRICED), output_field=CharField())
+    return Cast(PropertyFacetCount.FIELD_FACETS[facet], output_field=CharField())
+
+
+def _live_counts(queryset, selected):
+    """One query counting every facet value across `queryset` and `selected`."""
+    per_facet = [
+        filter_by_facets(queryset, selected, exclude=facet)
+        .order_by()
+        .annotate(facet_name=Value(facet, output_field=CharField()), facet_value=_facet_expression(facet))
+        .values('facet_name', 'facet_value')
+        .annotate(listings=Count('pk'))
+        .values_list('facet_name', 'facet_value', 'listings')
+        for facet, _ in FACETS
+    ]
+    return per_facet[0].union(*per_facet[1:], all=True)
+
+
+def facet_counts(queryset=None, selected=None):
+    """
+    [(facet, label, [option, ...])] for the property browser, each option a
+    dict with value, label, count and whether it is selected. `queryset` holds
+    the non-facet filters (search, area); leave it None when there are none.
+    """
+    selected = selected or {}
+    if queryset is None and not selected:
+        rows = PropertyFacetCount.objects.filter(count__gt=0).values_list('facet', 'value', 'count')
+    else:
+        rows = _live_counts(PropertyListing.objects.all() if queryset is None else queryset, selected)
+
+    options = {facet: [] for facet, _ in FACETS}
+    for facet, value, count in rows:
+        if facet in options and count:
+            options[facet].append({
+                'value': value,
+                'label': PRICE_LABELS.get(value, value) if facet == 'price' else value,
+                'count': count,
+                'selected': value in selected.get(facet, ()),
+            })
+
+    result = []
+    for facet, label in FACETS:
+        values = options[facet]
+        if facet == 'price':
+            order = [band for band, _, _, _ in PropertyFacetCount.PRICE_BANDS] + [PropertyFacetCount.UNPRICED]
+            values.sort(key=lambda option: order.index(option['value']))
+        elif facet in ('bedrooms', 'bathrooms'):
+            values.sort(key=lambda option: int(option['value']) if option['value'].isdigit() else 0)
+        else:
+            values.sort(key=lambda option: (-option['count'], option['value']))
+            values = [option for index, option in enumerate(values) if index < MAX_OPTIONS or option['selected']]
+        # Selected values with no matches left still need to be shown so they can be cleared
+        shown = {option['value'] for option in values}
+        values += [{'value': value, 'label': PRICE_LABELS.get(value, value) if facet == 'price' else value,
+                    'count': 0, 'selected': True}
+                   for value in selected.get(facet, ()) if value not in shown]
+        result.append((facet, label, values))
+    return result
+
+
+def add_toggle_links(facets, params):
+    """Give every option a `query` string that toggles it on top of the current `params`."""
+    for facet, _, options in facets:
+        for option in options:
+            query = params.copy()
+            query.pop('cursor', None)
+            values = [value for value in query.getlist(facet) if value != option['value']]
+            if not option['selected']:
+                values.append(option['value'])
+            query.setlist(facet, values)
+            option['query'] = query.urlencode()
+    return facets
@@ -0,0 +1,188 @@
+"""
+Monthly revenue forecasting over the Revenue table.
+
+Months are handled as integer indexes (year * 12 + month - 1), so future
+periods are exact calendar months rather than 30-day steps. Each model in
+MODELS fits a history and forecasts a mean with a standard error, from which
+`build_forecast()` derives confidence intervals. `backtest()` scores every
+model with a rolling origin: refit on each prefix of the history, forecast the
+months that follow and compare with what actually happened. All candidates are
+scored on the same origins, those every one of them has enough history for,
+and the model with the lowest backtest error is served; results are cached in the 'revenue' snapshot
+namespace, which Revenue writes bump, so the page never fits on a hit.
+"""
+from statistics import NormalDist
+
+import numpy as np
+
+from .models import Revenue
+from .snapshots import get_snapshot
+
+FIELDS = {'net_profit': 'Net profit', 'total_revenue': 'Total revenue', 'total_expenses': 'Total expenses'}
+DEFAULT_HORIZON = 3
+MAX_HORIZON = 24
+
+
+def month_index(year, month):
+    return year * 12 + month - 1
+
+
+def period_label(index):
+    """'YYYY-MM' for a month index."""
+    return f'{index // 12}-{index % 12 + 1:02d}'
+
+
+def monthly_series(field='net_profit'):
+    """(month indexes, values) from Revenue, oldest first; months may have gaps."""
+    rows = list(Revenue.objects.order_by('year', 'month').values_list('year', 'month', field))
+    t = np.array([month_index(year, month) for year, month, _ in rows], dtype=int)
+    y = np.array([value for _, _, value in rows], dtype=float)
+    return t, y
+
+
+class LeastSquaresModel:
+    """Linear model on a design matrix of the month index, with OLS standard errors."""
+    name = label = None
+    min_history = 3
+
+    def design(self, t):
+        raise NotImplementedError
+
+    def fit(self, t, y):
+        X = self.design(t)
+        self.beta, *_ = np.linalg.lstsq(X, y, rcond=None)
+        residuals = y - X @ self.beta
+        dof = max(len(y) - X.shape[1], 1)
+        self.variance = float(residuals @ residuals) / dof
+        self.covariance = self.variance * np.linalg.pinv(X.T @ X)
+        return self
+
+    def forecast(self, t):
+        X = self.design(t)
+        parameter_variance = np.einsum('ij,jk,ik->i', X, self.covariance, X)
+        return X @ self.beta, np.sqrt(self.variance + parameter_variance)
+
+
+class LinearTrend(LeastSquaresModel):
+    name, label = 'trend', 'Linear trend'
+
+    def design(self, t):
+        return np.column_stack([np.ones(len(t)), t])
+
+
+class SeasonalTrend(LeastSquaresModel):
+    name, label = 'seasonal_trend', 'Linear trend + monthly seasonality'
+    min_history = 24  # Every calendar month seen at least twice
+
+    def design(self, t):
+        t = np.asarray(t)
+        months = np.eye(12)[t % 12][:, 1:]  # January is the baseline
+        return np.column_stack([np.ones(len(t)), t, months])
+
+
+class SeasonalNaive:
+    """Each month repeats the latest observation of the same calendar month."""
+    name, label = 'seasonal_naive', 'Same month last year'
+    min_history = 13
+
+    def fit(self, t, y):
+        self.last = dict(zip((t % 12).tolist(), zip(t.tolist(), y.tolist())))
+        self.latest = (int(t[-1]), float(y[-1]))  # For calendar months missing from the history
+        observed = dict(zip(t.tolist(), y.tolist()))
+        errors = [value - observed[index - 12] for index, value in observed.items() if index - 12 in observed]
+        self.scale = float(np.sqrt(np.mean(np.square(errors)))) if errors else 0.0
+        return self
+
+    def forecast(self, t):
+        mean, std = [], []
+        for index in np.asarray(t).tolist():
+            seen_at, value = self.last.get(index % 12, self.latest)
+            mean.append(value)
+            # Uncertainty grows with the number of years we reach forward
+            std.append(self.scale * np.sqrt((index - seen_at - 1) // 12 + 1))
+        return np.array(mean), np.array(std)
+
+
+MODELS = [LinearTrend, SeasonalTrend, SeasonalNaive]
+
+
+def backtest(model_class, t, y, horizon=DEFAULT_HORIZON, level=0.95, start=None):
+    """
+    Rolling-origin errors of `model_class` on the series: mean absolute error,
+    root mean squared error, mean absolute percentage error and how often the
+    actual value fell inside the `level` interval. Origins run from `start`
+    (at least the model's min_history) to the end of the series; give models
+    the same `start` to compare them. None if the history is too short.
+    """
+    z = NormalDist().inv_cdf((1 + level) / 2)
+    errors, percentages, covered, origins = [], [], [], 0
+    for origin in range(max(start or 0, model_class.min_history), len(y)):
+        model = model_class().fit(t[:origin], y[:origin])
+        actual = y[origin:origin + horizon]
+        mean, std = model.forecast(t[origin:origin + horizon])
+        errors.extend(actual - mean)
+        percentages.extend(abs(error) / abs(value) for error, value in zip(actual - mean, actual) if value)
+        covered.extend(np.abs(actual - mean) <= z * std)
+        origins += 1
+    if not origins:
+        return None
+    errors = np.array(errors)
+    return {
+        'origins': origins,
+        'mae': round(float(np.mean(np.abs(errors))), 2),
+        'rmse': round(float(np.sqrt(np.mean(errors ** 2))), 2),
+        'mape': round(float(np.mean(percentages)) * 100, 2) if percentages else None,
+        'coverage': round(float(np.mean(covered)) * 100, 1),
+    }
+
+
+def build_forecast(field='net_profit', horizon=DEFAULT_HORIZON, level=0.95):
+    """
+    Backtest every model on the `field` series, then forecast the next
+    `horizon` months with the best one. Returns plain data suitable for caching,
+    or None when there is no history.
+    """
+    t, y = monthly_series(field)
+    if not len(y):
+        return None
+
+    candidates = [model_class for model_class in MODELS if len(y) >= model_class.min_history]
+    # Score on the origins every testable candidate can forecast from, so their errors are comparable
+    testable = [model_class.min_history for model_class in candidates if model_class.min_history < len(y)]
+    start = max(testable, default=len(y))
+    scores = [
+        {'name': model_class.name, 'label': model_class.label,
+         **(backtest(model_class, t, y, horizon, level, start=start) or {})}
+        for model_class in candidates
+    ]
+    tested = [score for score in scores if 'mae' in score]
+    best = min(tested, key=lambda score: score['mae'])['name'] if tested else LinearTrend.name
+    model_class = next(model_class for model_class in MODELS if model_class.name == best)
+
+    future = np.arange(t[-1] + 1, t[-1] + 1 + horizon)
+    if len(y) < 2:
+        # A single month has no trend to fit; carry it forward without an interval
+        mean, std = np.full(horizon, y[-1]), np.zeros(horizon)
+    else:
+        mean, std = model_class().fit(t, y).forecast(future)
+    z = NormalDist().inv_cdf((1 + level) / 2)
+    return {
+        'field': field,
+        'level': level,
+        'model': model_class.name,
+        'model_label': model_class.label,
+        'models': scores,
+        'history': [{'period': period_label(index), 'value': value} for index, value in zip(t.tolist(), y.tolist())],
+        'forecast': [
+            {'period': period_label(index), 'value': round(value, 2),
+             'lower': round(value - z * error, 2), 'upper': round(value + z * error, 2)}
+            for index, value, error in zip(future.tolist(), mean.tolist(), std.tolist())
+        ],
+    }
+
+
+def get_forecast(field='net_profit', horizon=DEFAULT_HORIZON):
+    """The cached forecast for `field`, rebuilt only after Revenue changes."""
+    return get_snapshot(
+        f'forecast:{field}:{horizon}', lambda: build_forecast(field, horizon), namespace='revenue', timeout=None,
+    )
@@ -0,0 +1,83 @@
+"""
+Resized, recompressed variants of property photos.
+
+Every uploaded image is rendered at each width in PROPERTY_IMAGE_WIDTHS as
+both WebP and JPEG. Variant names are derived from a hash of the source
+bytes, so an image that was already processed is never rendered twice and
+the files can be cached forever. The generated names are recorded in
+PropertyListing.image_variants for the `property_picture` template tag.
+"""
+import hashlib
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = 'property_images/variants'
+FORMATS = {
+    # extension: (Pillow format, save options)
+    'webp': ('WEBP', {'quality': 75, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+
+
+def variant_widths():
+    return sorted(getattr(settings, 'PROPERTY_IMAGE_WIDTHS', (320, 640, 1280)))
+
+
+def _read(image_field):
+    image_field.open('rb')
+    try:
+        image_field.seek(0)
+        return image_field.read()
+    finally:
+        image_field.seek(0)
+
+
+def generate_variants(image_field, storage=default_storage, overwrite=False):
+    """
+    Render the variants of `image_field` and return their description:
+    {'hash', 'width', 'height', 'webp': {width: name}, 'jpg': {width: name}}.
+    Existing variant files are kept unless `overwrite` is set, which renders
+    them again in place. Returns {} when the file is missing or not an image.
+    """
+    try:
+        data = _read(image_field)
+        source = Image.open(BytesIO(data))
+        source = ImageOps.exif_transpose(source)
+    except (OSError, UnidentifiedImageError, ValueError) as exc:
+        logger.warning('Cannot create variants for %s: %s', image_field.name, exc)
+        return {}
+
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    if source.mode not in ('RGB', 'L'):
+        source = source.convert('RGB')
+
+    # Never upscale: widths above the original collapse into one full-size variant
+    widths = [width for width in variant_widths() if width < source.width] + [
+        min(variant_widths()[-1], source.width)
+    ]
+    variants = {'hash': digest, 'width': source.width, 'height': source.height}
+    for extension in FORMATS:
+        variants[extension] = {}
+    for width in sorted(set(widths)):
+        resized = None
+        for extension, (image_format, options) in FORMATS.items():
+            name = f'{VARIANT_DIR}/{digest}-{width}.{extension}'
+            exists = storage.exists(name)
+            if overwrite or not exists:
+                if resized is None:
+                    height = round(source.height * width / source.width)
+                    resized = source.resize((width, height), Image.LANCZOS)
+                buffer = BytesIO()
+                resized.save(buffer, image_format, **options)
+                if exists:
+                    storage.delete(name)  # Storage.save() would pick a new name rather than replace it
+                storage.save(name, ContentFile(buffer.getvalue()))
+            variants[extension][str(width)] = name
+    return variants
@@ -0,0 +1,96 @@
+"""
+Agent leaderboard served from the (aggregate_points, id) index on PerformanceMetrics.
+
+Ranks are competition ranks: agents with equal points share a rank and the next
+agent skips ahead ("1, 2, 2, 4"). Every lookup is an index seek or a bounded
+range scan, so cost does not grow with the number of agents behind the cursor.
+"""
+from django.db.models import Count, Q
+
+from .models import PerformanceMetrics
+from .snapshots import get_snapshot
+
+
+def ranked_metrics():
+    return PerformanceMetrics.objects.filter(employee__isnull=False)
+
+
+def total_agents():
+    """Number of ranked agents, cached until the metrics change."""
+    return get_snapshot('leaderboard_size', lambda: ranked_metrics().count())
+
+
+def ranks_for(points_values):
+    """Map each points value to its competition rank using a single query."""
+    points_values = sorted(set(points_values))
+    if not points_values:
+        return {}
+    counts = ranked_metrics().aggregate(**{
+        f'above_{i}': Count('id', filter=Q(aggregate_points__gt=points))
+        for i, points in enumerate(points_values)
+    })
+    return {points: counts[f'above_{i}'] + 1 for i, points in enumerate(points_values)}
+
+
+def percentile(rank, total):
+    """Share of agents ranked at or below `rank`, as a percentage."""
+    if not total:
+        return 0.0
+    return round(100.0 * (total - rank + 1) / total, 1)
+
+
+def _entries(metrics):
+    ranks = ranks_for(metric.aggregate_points for metric in metrics)
+    return [
+        {
+            'employee_id': metric.employee_id,
+            'name': metric.employee.user.get_full_name(),
+            'aggregate_points': metric.aggregate_points,
+            'rank': ranks[metric.aggregate_points],
+        }
+        for metric in metrics
+    ]
+
+
+def top(k=10):
+    """The `k` highest-ranked agents."""
+    metrics = list(
+        ranked_metrics().select_related('employee__user').order_by('-aggregate_points', 'id')[:k]
+    )
+    return _entries(metrics)
+
+
+def position(employee):
+    """Rank, total and percentile for `employee`, or None if they have no metrics."""
+    metric = ranked_metrics().filter(employee=employee).first()
+    if metric is None:
+        return None
+    rank = ranks_for([metric.aggregate_points])[metric.aggregate_points]
+    total = total_agents()
+    return {
+        'employee_id': employee.id,
+        'aggregate_points': metric.aggregate_points,
+        'rank': rank,
+        'total': total,
+        'percentile': percentile(rank, total),
+    }
+
+
+def around(employee, size=2):
+    """`employee` plus up to `size` agents directly above and below them."""
+    metric = ranked_metrics().select_related('employee__user').filter(employee=employee).first()
+    if metric is None:
+        return []
+    points = metric.aggregate_points
+    # Keyset seeks on (aggregate_points, id) in both directions
+    above = list(
+        ranked_metrics().select_related('employee__user')
+        .filter(Q(aggregate_points__gt=points) | Q(aggregate_points=points, id__lt=metric.id))
+        .order_by('aggregate_points', '-id')[:size]
+    )
+    below = list(
+        ranked_metrics().select_related('employee__user')
+        .filter(Q(aggregate_points__lt=points) | Q(aggregate_points=points, id__gt=metric.id))
+        .order_by('-aggregate_points', 'id')[:size]
+    )
+    return _entries(above[::-1] + [metric] + below)
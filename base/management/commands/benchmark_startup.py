@@ -0,0 +1,85 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Libraries a plain worker must not load at boot; see the note at the top of base/views.py
+HEAVY_MODULES = ['numpy', 'pandas', 'matplotlib', 'sklearn', 'scipy']
+ANALYTICS_MODULES = ['base.analytics', 'base.pricing', 'base.forecasting', 'base.comps', 'base.charts']
+
+# Runs in a fresh interpreter, like a gunicorn worker: load the WSGI app and the
+# URLconf (which imports every view), then the analytics modules views load lazily
+PROBE = '''
+import importlib, json, resource, sys, time
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+started = time.perf_counter()
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+get_wsgi_application()
+get_resolver().url_patterns
+boot = time.perf_counter() - started
+boot_rss = peak_rss_mb()
+loaded = [name for name in HEAVY if name in sys.modules]
+
+started = time.perf_counter()
+for name in ANALYTICS:
+    importlib.import_module(name)
+print(json.dumps({
+    'boot_ms': boot * 1000,
+    'boot_rss_mb': boot_rss,
+    'heavy_loaded': loaded,
+    'analytics_ms': (time.perf_counter() - started) * 1000,
+    'analytics_rss_mb': peak_rss_mb() - boot_rss,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure worker boot time and memory, and check that no heavy library is imported at boot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to measure (median is reported)')
+        parser.add_argument('--max-boot-ms', type=float, default=None, help='Fail if the median boot time is above this')
+        parser.add_argument('--max-rss-mb', type=float, default=None, help='Fail if the median boot RSS is above this')
+
+    def probe(self):
+        script = f'HEAVY = {HEAVY_MODULES!r}\nANALYTICS = {ANALYTICS_MODULES!r}\n{PROBE}'
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=os.environ.copy(),
+            capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f'Startup probe failed:\n{result.stderr}')
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        runs = [self.probe() for _ in range(max(options['runs'], 1))]
+        median = {key: statistics.median(run[key] for run in runs)
+                  for key in ('boot_ms', 'boot_rss_mb', 'analytics_ms', 'analytics_rss_mb')}
+
+        self.stdout.write(f'Worker boot (median of {len(runs)}): {median["boot_ms"]:.0f} ms, '
+                          f'{median["boot_rss_mb"]:.1f} MB peak RSS')
+        self.stdout.write(f'Analytics modules on first use: +{median["analytics_ms"]:.0f} ms, '
+                          f'+{median["analytics_rss_mb"]:.1f} MB')
+
+        failures = []
+        heavy = sorted({name for run in runs for name in run['heavy_loaded']})
+        if heavy:
+            failures.append(f'imported at boot: {", ".join(heavy)}')
+        if options['max_boot_ms'] is not None and median['boot_ms'] > options['max_boot_ms']:
+            failures.append(f'boot time {median["boot_ms"]:.0f} ms is above {options["max_boot_ms"]:.0f} ms')
+        if options['max_rss_mb'] is not None and median['boot_rss_mb'] > options['max_rss_mb']:
+            failures.append(f'boot RSS {median["boot_rss_mb"]:.1f} MB is above {options["max_rss_mb"]:.1f} MB')
+        if failures:
+            raise CommandError('Startup regression: ' + '; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('No heavy libraries imported at boot'))
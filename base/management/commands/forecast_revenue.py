@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from base import forecasting
+
+
+class Command(BaseCommand):
+    help = 'Backtest the revenue forecasting models and precompute the cached forecasts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--series', choices=list(forecasting.FIELDS), default=None,
+                            help='Revenue column to forecast (default: all of them)')
+        parser.add_argument('--months', type=int, default=forecasting.DEFAULT_HORIZON,
+                            help='Months to forecast and to score in the backtest')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['months'] <= forecasting.MAX_HORIZON:
+            raise CommandError(f'--months must be between 1 and {forecasting.MAX_HORIZON}')
+
+        for field in [options['series']] if options['series'] else forecasting.FIELDS:
+            started = time.monotonic()
+            forecast = forecasting.get_forecast(field, options['months'])
+            if forecast is None:
+                self.stdout.write(self.style.WARNING('No revenue data to forecast'))
+                return
+            self.stdout.write(f'{forecasting.FIELDS[field]} ({len(forecast["history"])} months):')
+            for score in forecast['models']:
+                marker = '*' if score['name'] == forecast['model'] else ' '
+                if 'mae' in score:
+                    self.stdout.write(
+                        f' {marker} {score["label"]:<36} MAE {score["mae"]:>14,.2f}  RMSE {score["rmse"]:>14,.2f}  '
+                        f'MAPE {score["mape"] if score["mape"] is not None else "-":>6}%  '
+                        f'coverage {score["coverage"]}%  ({score["origins"]} origins)'
+                    )
+                else:
+                    self.stdout.write(f' {marker} {score["label"]:<36} not enough history to backtest')
+            for row in forecast['forecast']:
+                self.stdout.write(f'   {row["period"]}: {row["value"]:,.2f}  [{row["lower"]:,.2f}, {row["upper"]:,.2f}]')
+            self.stdout.write(self.style.SUCCESS(f'   cached in {time.monotonic() - started:.2f}s'))
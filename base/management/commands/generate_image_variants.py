@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from base.images import generate_variants
+from base.models import PropertyListing
+
+
+class Command(BaseCommand):
+    help = 'Create resized WebP/JPEG variants for property images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate and overwrite the variants of every image, not only the missing ones')
+
+    def handle(self, *args, **options):
+        listings = PropertyListing.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['force']:
+            listings = listings.filter(image_variants={})
+
+        processed = failed = 0
+        for listing in listings.only('pk', 'image').iterator(chunk_size=100):
+            variants = generate_variants(listing.image, overwrite=options['force'])
+            # update() skips save() and the listing signals; only the variants change
+            PropertyListing.objects.filter(pk=listing.pk).update(image_variants=variants)
+            if variants:
+                processed += 1
+            else:
+                failed += 1
+                self.stderr.write(f'Could not process {listing.image.name}')
+
+        self.stdout.write(self.style.SUCCESS(f'Created variants for {processed} images, {failed} failed'))
@@ -1,45 +1,188 @@
 import csv
+import io
+import time
+import zipfile
 from decimal import Decimal, InvalidOperation
-from django.core.management.base import BaseCommand
-from base.models import PropertyListing
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from base.areas import parse_area_sqft
+from base.models import PropertyFacetCount, PropertyListing
+from base.search import get_backend
+from base.snapshots import bump_version_on_commit
+
+MISSING_VALUES = ('N/A', '', 'NA', 'n/a', 'None')
+
+UPSERT_FIELDS = [
+    'propertyType', 'location', 'address', 'floors', 'coveredArea', 'covered_area_sqft', 'electricityStatus',
+    'bathroomCount', 'bedroomCount', 'bookingAmount', 'price', 'status',
+]
+
+
+def safe_decimal(value):
+    """Parse a CSV amount, treating missing or malformed values as 0.0."""
+    if value is None or value.strip() in MISSING_VALUES:
+        return Decimal('0.0')
+    try:
+        # Clean the value by removing commas and extra spaces
+        clean_value = value.replace(',', '').strip()
+        return Decimal(clean_value) if clean_value else Decimal('0.0')
+    except InvalidOperation:
+        return Decimal('0.0')
+
+
+def safe_int(value):
+    value = (value or '').strip()
+    return int(value) if value.isdigit() else 0
+
+
+def open_rows(path, member=None):
+    """Yield CSV rows from `path`, streaming straight out of the archive for .zip files."""
+    path = Path(path)
+    if path.suffix.lower() == '.zip':
+        with zipfile.ZipFile(path) as archive:
+            if member is None:
+                members = [name for name in archive.namelist() if name.lower().endswith('.csv')]
+                if not members:
+                    raise CommandError(f'No CSV file found in {path}')
+                member = members[0]
+            with archive.open(member) as raw:
+                yield from csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8', newline=''))
+    else:
+        with open(path, mode='r', encoding='utf-8', newline='') as file:
+            yield from csv.DictReader(file)
+
+
+def build_listing(row):
+    """Turn a CSV row into an unsaved PropertyListing, raising ValueError for unusable rows."""
+    # csv.DictReader fills the columns of a short row with None and keys the surplus of a long one by None
+    if None in row or None in row.values():
+        raise ValueError('wrong number of columns')
+    covered_area = row['Covered Area'].strip()
+    unit = (row.get('covArea Unit') or '').strip()
+    if unit and unit not in MISSING_VALUES:
+        covered_area = f'{covered_area} {unit}'
+    listing = PropertyListing(
+        source_id=(row.get('ID') or '').strip() or None,
+        propertyType=row['Type of Property'],
+        location=row['Area Name'],
+        address=row['Location'],
+        floors=safe_int(row['floors']),
+        coveredArea=covered_area,
+        # bulk_create skips save(), so parse the area here
+        covered_area_sqft=parse_area_sqft(covered_area),
+        electricityStatus=row['Electricity Status'],
+        bathroomCount=safe_int(row['Bathroom']),
+        bedroomCount=safe_int(row['bedroom']),
+        bookingAmount=safe_decimal(row['Booking Amount']),
+        price=safe_decimal(row['Price']),
+        status=row['Possession Status'],
+    )
+    for field in ('propertyType', 'location', 'address', 'coveredArea', 'electricityStatus', 'status'):
+        max_length = PropertyListing._meta.get_field(field).max_length
+        if len(getattr(listing, field) or '') > max_length:
+            raise ValueError(f'{field} longer than {max_length} characters')
+    for field in ('bookingAmount', 'price'):
+        try:
+            PropertyListing._meta.get_field(field).run_validators(getattr(listing, field))
+        except ValidationError as exc:
+            raise ValueError(f'{field}: {" ".join(exc.messages)}')
+    return listing
+
 
 class Command(BaseCommand):
-    help = 'Load property listings from a CSV file'
-
-    def handle(self, *args, **kwargs):
-        with open('base/management/commands/properties.csv', mode='r') as file:
-            csv_reader = csv.DictReader(file)
-            count = 0  # Initialize a counter to limit to the first 5 records
-            for row in csv_reader:
-                if count == 1000:
-                    break  # Stop processing after 5 records
-                
-                # Safely handle decimal fields with error handling
-                def safe_decimal(value):
-                    if value in ('N/A', '', 'NA', 'n/a', 'None'):  # Handle missing or invalid data
-                        return Decimal('0.0')  # Default to 0.0 if value is missing or invalid
-                    try:
-                        # Clean the value by removing commas and extra spaces
-                        clean_value = value.replace(',', '').strip()
-                        return Decimal(clean_value) if clean_value else Decimal('0.0')
-                    except InvalidOperation:
-                        # Return 0.0 if conversion fails
-                        return Decimal('0.0')
-
-                property_listing = PropertyListing(
-                    propertyType=row['Type of Property'],
-                    location=row['Area Name'],
-                    address=row['Location'],
-                    floors=int(row['floors']) if row['floors'].isdigit() else 0,
-                    coveredArea=row['Covered Area'],
-                    electricityStatus=row['Electricity Status'],
-                    bathroomCount=int(row['Bathroom']) if row['Bathroom'].isdigit() else 0,
-                    bedroomCount=int(row['bedroom']) if row['bedroom'].isdigit() else 0,
-                    bookingAmount=safe_decimal(row['Booking Amount']),
-                    price=safe_decimal(row['Price']),
-                    status=row['Possession Status'],
-                )
-                property_listing.save()
-                count += 1  # Increment the counter
-
-        self.stdout.write(self.style.SUCCESS('Successfully loaded first 1000 property listings'))
+    help = 'Load property listings from a CSV file or a zip archive containing one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=str(Path(settings.BASE_DIR) / 'properties.zip'),
+                            help='CSV or .zip file to load (default: properties.zip in the project root)')
+        parser.add_argument('--member', help='CSV file name inside the zip (default: the first .csv)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows inserted per bulk_create/transaction (default: 1000)')
+        parser.add_argument('--limit', type=int, help='Stop after this many rows')
+        parser.add_argument('--upsert', action='store_true',
+                            help='Update listings whose source ID already exists instead of skipping them')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        limit = options['limit']
+        upsert = options['upsert']
+
+        if not Path(options['path']).exists():
+            raise CommandError(f"{options['path']} does not exist")
+
+        search_index = get_backend()
+        started = time.monotonic()
+        loaded = 0
+        rejected = 0
+        skipped = 0
+        batch = []
+
+        def write(batch):
+            """Insert (or upsert) one batch in its own transaction; returns the rows skipped."""
+            with transaction.atomic():
+                if upsert:
+                    PropertyListing.objects.bulk_create(
+                        batch, batch_size=batch_size, update_conflicts=True,
+                        unique_fields=['source_id'], update_fields=UPSERT_FIELDS,
+                    )
+                    # Rows that already existed keep their original primary key
+                    written = PropertyListing.objects.filter(
+                        source_id__in=[listing.source_id for listing in batch if listing.source_id]
+                    ).values_list('pk', flat=True)
+                    search_index.update(list(written) + [listing.pk for listing in batch if not listing.source_id])
+                    bump_version_on_commit('dashboard')
+                    bump_version_on_commit('listings', changes=len(batch))
+                    return 0
+                existing = set(PropertyListing.objects.filter(
+                    source_id__in=[listing.source_id for listing in batch if listing.source_id]
+                ).values_list('source_id', flat=True))
+                new = [listing for listing in batch if listing.source_id not in existing]
+                PropertyListing.objects.bulk_create(new, batch_size=batch_size)
+                # bulk_create sends no post_save, so index, count and invalidate here
+                search_index.update(listing.pk for listing in new)
+                PropertyFacetCount.count_listings(new)
+                bump_version_on_commit('dashboard')
+                bump_version_on_commit('listings', changes=len(new))
+                return len(batch) - len(new)
+
+        for line, row in enumerate(open_rows(options['path'], options['member']), start=2):
+            if limit is not None and loaded + skipped + len(batch) >= limit:
+                break
+            try:
+                batch.append(build_listing(row))
+            except (KeyError, ValueError) as exc:
+                rejected += 1
+                if options['verbosity'] >= 2:
+                    self.stderr.write(f'Line {line} rejected: {exc}')
+                continue
+
+            if len(batch) >= batch_size:
+                batch_skipped = write(batch)
+                skipped += batch_skipped
+                loaded += len(batch) - batch_skipped
+                batch = []
+                if options['verbosity'] >= 2:
+                    rate = (loaded + skipped) / max(time.monotonic() - started, 1e-9)
+                    self.stdout.write(f'{loaded} rows loaded ({rate:.0f} rows/s)')
+
+        if batch:
+            batch_skipped = write(batch)
+            skipped += batch_skipped
+            loaded += len(batch) - batch_skipped
+
+        if upsert:
+            # Updated rows may have moved between facet values, so recount from scratch
+            with transaction.atomic():
+                PropertyFacetCount.rebuild()
+
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {loaded} property listings in {elapsed:.2f}s '
+            f'({(loaded + skipped) / elapsed:.0f} rows/s), rejected {rejected} rows, '
+            f'skipped {skipped} already imported'
+        ))
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from base import charts
+
+
+class Command(BaseCommand):
+    help = 'Delete stored chart specs that no page has linked for a while'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Unused for this many days (default: CHART_CACHE_TIMEOUT)')
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options['days']) if options['days'] else None
+        deleted = charts.prune(older_than)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} unused chart specs'))
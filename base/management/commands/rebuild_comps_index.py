@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from base import comps
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the comparable-properties nearest-neighbour index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-stale', action='store_true',
+                            help='Only rebuild when enough listings changed since the last build (for cron)')
+        parser.add_argument('--threshold', type=int, default=None,
+                            help='Listing writes that make the index stale (default: COMPS_REFRESH_THRESHOLD)')
+
+    def handle(self, *args, **options):
+        if options['if_stale'] and not comps.is_stale(options['threshold']):
+            self.stdout.write('Comparables index is up to date, not rebuilding')
+            return
+
+        started = time.monotonic()
+        index = comps.build()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {len(index["ids"])} property listings in {len(index["locations"])} locations '
+            f'in {time.monotonic() - started:.2f}s'
+        ))
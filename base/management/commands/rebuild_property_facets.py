@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from base.models import PropertyFacetCount
+
+
+class Command(BaseCommand):
+    help = 'Recount the precomputed property facet counts from PropertyListing'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            values = PropertyFacetCount.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Counted {values} facet values'))
@@ -0,0 +1,89 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+
+from base.models import AgentProfit, DailySalesRollup, MonthlySalesRollup, Sale
+
+
+def month_windows(first, last):
+    """Yield (start, end) date pairs covering every calendar month from `first` to `last`."""
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        start = date(year, month, 1)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        yield start, date(year, month, 1)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily and monthly sales rollups from the Sale and AgentProfit tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Rows per bulk insert (default: 1000)')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        started = time.monotonic()
+
+        bounds = Sale.objects.aggregate(first=Min('sale_date'), last=Max('sale_date'))
+
+        with transaction.atomic():
+            DailySalesRollup.objects.all().delete()
+            MonthlySalesRollup.objects.all().delete()
+
+            if bounds['first'] is None:
+                self.stdout.write(self.style.WARNING('No dated sales found; rollups cleared'))
+                return
+
+            daily_rows = 0
+            monthly_rows = 0
+            # One month of history at a time keeps memory bounded on large tables
+            for start, end in month_windows(bounds['first'], bounds['last']):
+                buckets = {}
+                sales = (
+                    Sale.objects.filter(sale_date__gte=start, sale_date__lt=end)
+                    .values('sale_date', 'agent_id')
+                    .annotate(count=Count('id'), total=Sum('sale_price'))
+                    .order_by()
+                )
+                for row in sales:
+                    bucket = buckets.setdefault((row['sale_date'], row['agent_id']), DailySalesRollup(
+                        date=row['sale_date'], agent_id=row['agent_id'],
+                    ))
+                    bucket.sales_count = row['count']
+                    bucket.sales_total = row['total'] or Decimal('0')
+
+                profits = (
+                    AgentProfit.objects.filter(sale__sale_date__gte=start, sale__sale_date__lt=end)
+                    .values('sale__sale_date', 'agent_id')
+                    .annotate(total=Sum('profit_amount'))
+                    .order_by()
+                )
+                for row in profits:
+                    bucket = buckets.setdefault((row['sale__sale_date'], row['agent_id']), DailySalesRollup(
+                        date=row['sale__sale_date'], agent_id=row['agent_id'],
+                    ))
+                    bucket.profit_total = row['total'] or Decimal('0')
+
+                if not buckets:
+                    continue
+
+                DailySalesRollup.objects.bulk_create(buckets.values(), batch_size=chunk_size)
+                MonthlySalesRollup.objects.create(
+                    year=start.year,
+                    month=start.month,
+                    sales_count=sum(b.sales_count for b in buckets.values()),
+                    sales_total=sum((Decimal(b.sales_total) for b in buckets.values()), Decimal('0')),
+                    profit_total=sum((Decimal(b.profit_total) for b in buckets.values()), Decimal('0')),
+                )
+                daily_rows += len(buckets)
+                monthly_rows += 1
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {daily_rows} daily and {monthly_rows} monthly rollups in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from base.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the property search index from the PropertyListing table'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        started = time.monotonic()
+        with transaction.atomic():
+            indexed = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} property listings with {type(backend).__name__} '
+            f'in {time.monotonic() - started:.2f}s'
+        ))
@@ -0,0 +1,130 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from base.models import Employee, PerformanceEvent, PerformanceMetrics, Sale, Task
+from base.snapshots import bump_version
+
+
+def missing_events(chunk_size):
+    """
+    Yield lists of up to `chunk_size` unsaved PerformanceEvents for completed
+    tasks and sales that have no event in the ledger.
+    """
+    sources = [
+        (PerformanceEvent.TASK_COMPLETED, 'task',
+         Task.objects.filter(status='Completed', assigned_to__isnull=False).values_list('assigned_to_id', 'id')),
+        (PerformanceEvent.SALE_CLOSED, 'sale',
+         Sale.objects.filter(agent__isnull=False).values_list('agent_id', 'id')),
+    ]
+    for kind, field, rows in sources:
+        recorded = PerformanceEvent.objects.filter(kind=kind, **{f'{field}__isnull': False}).values(f'{field}_id')
+        chunk = []
+        for employee_id, object_id in rows.exclude(id__in=recorded).order_by('id').iterator(chunk_size=chunk_size):
+            chunk.append(PerformanceEvent(
+                employee_id=employee_id, kind=kind, points=PerformanceEvent.points_for(kind),
+                **{f'{field}_id': object_id},
+            ))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def reconcile_ledger(chunk_size, dry_run):
+    """Append the events missing from the ledger, one transaction per chunk. Returns how many."""
+    added = 0
+    for chunk in missing_events(chunk_size):
+        added += len(chunk)
+        if not dry_run:
+            # Inserted without projecting them: the counters are recomputed from the ledger next
+            with transaction.atomic():
+                PerformanceEvent.objects.bulk_create(chunk, ignore_conflicts=True)
+    return added
+
+
+def recompute_chunk(employee_ids, dry_run):
+    """
+    Rewrite the counters of `employee_ids` from their ledger totals in one transaction.
+
+    Returns a list of (employee_id, (old tasks, sales, points), (new tasks, sales, points))
+    for every agent whose stored counters had drifted.
+    """
+    with transaction.atomic():
+        metrics = {
+            metric.employee_id: metric
+            for metric in PerformanceMetrics.objects.select_for_update()
+            .filter(employee_id__in=employee_ids)
+            .only('id', 'employee_id', 'tasks_completed', 'sales_closed', 'aggregate_points')
+        }
+        totals = PerformanceEvent.totals(employee_ids)
+
+        drift, changed, missing = [], [], []
+        for employee_id in employee_ids:
+            new = totals.get(employee_id, (0, 0, 0))
+            metric = metrics.get(employee_id)
+            if metric is None:
+                drift.append((employee_id, None, new))
+                missing.append(PerformanceMetrics(employee_id=employee_id))
+                metric = missing[-1]
+            else:
+                old = (metric.tasks_completed, metric.sales_closed, metric.aggregate_points)
+                if old == new:
+                    continue
+                drift.append((employee_id, old, new))
+                changed.append(metric)
+            metric.tasks_completed, metric.sales_closed, metric.aggregate_points = new
+
+        if not dry_run:
+            PerformanceMetrics.objects.bulk_update(changed, ['tasks_completed', 'sales_closed', 'aggregate_points'])
+            PerformanceMetrics.objects.bulk_create(missing)
+    return drift
+
+
+class Command(BaseCommand):
+    help = ('Add completed tasks and sales missing from the performance ledger, then recompute every '
+            'agent\'s PerformanceMetrics from the ledger and report drift')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Rows read and written per transaction (default: 1000)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drift without writing anything')
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        dry_run = options['dry_run']
+        started = time.monotonic()
+
+        added = reconcile_ledger(chunk_size, dry_run)
+
+        # Keyset over employee ids, so each chunk is one short transaction
+        drift, chunks, last_id = [], 0, None
+        while True:
+            employees = Employee.objects.order_by('id')
+            if last_id is not None:
+                employees = employees.filter(id__gt=last_id)
+            employee_ids = list(employees.values_list('id', flat=True)[:chunk_size])
+            if not employee_ids:
+                break
+            drift += recompute_chunk(employee_ids, dry_run)
+            chunks += 1
+            last_id = employee_ids[-1]
+
+        if options['verbosity'] >= 1:
+            for employee_id, old, new in drift:
+                before = 'missing' if old is None else 'tasks %d, sales %d, points %d' % old
+                self.stdout.write(f'Employee {employee_id}: {before} -> tasks %d, sales %d, points %d' % new)
+
+        if drift and not dry_run:
+            bump_version('dashboard')
+
+        elapsed = time.monotonic() - started
+        action = 'Found' if dry_run else 'Fixed'
+        note = ' (counts exclude the missing events)' if dry_run and added else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {added} events missing from the ledger and drift for {len(drift)} agents '
+            f'in {chunks} chunks in {elapsed:.2f}s{note}'
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from base.models import PerformanceMetrics
+
+
+class Command(BaseCommand):
+    help = 'Rebuild PerformanceMetrics counters by replaying the performance event ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employee', type=int, action='append', dest='employee_ids',
+                            help='Only rebuild this employee id (may be repeated)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuilt = PerformanceMetrics.rebuild_from_ledger(options['employee_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt performance metrics for {rebuilt} employees'))
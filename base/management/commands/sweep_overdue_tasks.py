@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from base.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Mark past-due Pending tasks Overdue (and rescheduled Overdue tasks Pending) in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, default=None, metavar='SECONDS',
+                            help='Keep running and sweep at this interval instead of once (for hosts without cron)')
+
+    def sweep(self):
+        started = time.monotonic()
+        overdue, reopened = Task.sweep_overdue()
+        self.stdout.write(self.style.SUCCESS(
+            f'Marked {overdue} tasks overdue and {reopened} back to pending in {time.monotonic() - started:.2f}s'
+        ))
+
+    def handle(self, *args, **options):
+        self.sweep()
+        while options['every']:
+            time.sleep(options['every'])
+            self.sweep()
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from base import pricing
+
+
+class Command(BaseCommand):
+    help = 'Train the property price model and make it the one served to predictions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-stale', action='store_true',
+                            help='Only retrain when enough listings changed since the last model (for cron)')
+        parser.add_argument('--threshold', type=int, default=None,
+                            help='Listing writes that make a model stale (default: PRICE_MODEL_RETRAIN_THRESHOLD)')
+
+    def handle(self, *args, **options):
+        if options['if_stale'] and not pricing.is_stale(options['threshold']):
+            self.stdout.write('Price model is up to date, not retraining')
+            return
+
+        started = time.monotonic()
+        price_model = pricing.train()
+        if price_model is None:
+            self.stdout.write(self.style.WARNING('Not enough priced listings with a covered area to train on'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Trained {price_model} on {price_model.sample_count} listings, '
+            f'{price_model.location_count} with a per-location model, '
+            f'R² {price_model.metrics["r2"]:.3f} in {time.monotonic() - started:.2f}s'
+        ))
@@ -0,0 +1,25 @@
+from . import activity
+from .models import Employee
+
+
+class ActivityMiddleware:
+    """Treat every authenticated employee request as an activity heartbeat."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            employee_id = request.session.get('employee_id')
+            if employee_id is None:
+                # Sessions started before login tracking stored the id; look it up once
+                employee_id = Employee.objects.filter(user=user).values_list('id', flat=True).first()
+                request.session['employee_id'] = employee_id or 0
+            if employee_id:
+                activity.heartbeat(employee_id)
+
+        activity.flush()
+        return response
@@ -0,0 +1,90 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:34
+
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    Sale = apps.get_model('base', 'Sale')
+    AgentProfit = apps.get_model('base', 'AgentProfit')
+    DailySalesRollup = apps.get_model('base', 'DailySalesRollup')
+    MonthlySalesRollup = apps.get_model('base', 'MonthlySalesRollup')
+
+    daily = {}
+    sales = (
+        Sale.objects.filter(sale_date__isnull=False)
+        .values('sale_date', 'agent_id')
+        .annotate(count=Count('id'), total=Sum('sale_price'))
+        .order_by()
+    )
+    for row in sales:
+        bucket = daily.setdefault((row['sale_date'], row['agent_id']), [0, Decimal('0'), Decimal('0')])
+        bucket[0] = row['count']
+        bucket[1] = Decimal(row['total'] or 0)
+    profits = (
+        AgentProfit.objects.filter(sale__sale_date__isnull=False)
+        .values('sale__sale_date', 'agent_id')
+        .annotate(total=Sum('profit_amount'))
+        .order_by()
+    )
+    for row in profits:
+        bucket = daily.setdefault((row['sale__sale_date'], row['agent_id']), [0, Decimal('0'), Decimal('0')])
+        bucket[2] = Decimal(row['total'] or 0)
+
+    monthly = {}
+    for (day, _agent_id), (count, total, profit) in daily.items():
+        bucket = monthly.setdefault((day.year, day.month), [0, Decimal('0'), Decimal('0')])
+        bucket[0] += count
+        bucket[1] += total
+        bucket[2] += profit
+
+    DailySalesRollup.objects.bulk_create([
+        DailySalesRollup(date=day, agent_id=agent_id, sales_count=count, sales_total=total, profit_total=profit)
+        for (day, agent_id), (count, total, profit) in daily.items()
+    ], batch_size=1000)
+    MonthlySalesRollup.objects.bulk_create([
+        MonthlySalesRollup(year=year, month=month, sales_count=count, sales_total=total, profit_total=profit)
+        for (year, month), (count, total, profit) in monthly.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0008_alter_employee_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sales_count', models.IntegerField(default=0)),
+                ('sales_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('profit_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('year', models.PositiveIntegerField()),
+                ('month', models.PositiveIntegerField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('year', 'month'), name='unique_monthly_sales_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sales_count', models.IntegerField(default=0)),
+                ('sales_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('profit_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('date', models.DateField()),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='base.employee')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'agent'), name='unique_daily_sales_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:36
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def backfill_events(apps, schema_editor):
+    """
+    Seed the ledger with every completed task and closed sale recorded so far.
+
+    The PerformanceMetrics counters are left as they are: they also include
+    tasks that have since been deleted, which 0024 records as opening balances.
+    """
+    Task = apps.get_model('base', 'Task')
+    Sale = apps.get_model('base', 'Sale')
+    PerformanceEvent = apps.get_model('base', 'PerformanceEvent')
+
+    events = [
+        PerformanceEvent(employee_id=employee_id, kind='task_completed', points=5, task_id=task_id)
+        for task_id, employee_id in Task.objects.filter(
+            status='Completed', assigned_to__isnull=False,
+        ).values_list('id', 'assigned_to_id').iterator()
+    ]
+    events += [
+        PerformanceEvent(employee_id=employee_id, kind='sale_closed', points=10, sale_id=sale_id)
+        for sale_id, employee_id in Sale.objects.filter(
+            agent__isnull=False,
+        ).values_list('id', 'agent_id').iterator()
+    ]
+    PerformanceEvent.objects.bulk_create(events, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0009_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerformanceEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('task_completed', 'Task completed'), ('sale_closed', 'Sale closed')], max_length=20)),
+                ('points', models.PositiveIntegerField()),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.employee')),
+                ('sale', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='base.sale')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='base.task')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kind', 'task_completed')), fields=('task',), name='unique_task_completed_event'), models.UniqueConstraint(condition=models.Q(('kind', 'sale_closed')), fields=('sale',), name='unique_sale_closed_event')],
+            },
+        ),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0010_performance_event_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='performancemetrics',
+            index=models.Index(fields=['-aggregate_points', 'id'], name='metrics_leaderboard_idx'),
+        ),
+    ]
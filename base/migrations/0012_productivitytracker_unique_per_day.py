@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:41
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_days(apps, schema_editor):
+    """Fold duplicate (employee, date) rows into one so the constraint can be added."""
+    ProductivityTracker = apps.get_model('base', 'ProductivityTracker')
+    duplicates = (
+        ProductivityTracker.objects.values('employee_id', 'date')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for duplicate in duplicates:
+        trackers = list(ProductivityTracker.objects.filter(
+            employee_id=duplicate['employee_id'], date=duplicate['date'],
+        ))
+        keep, extra = trackers[0], trackers[1:]
+        keep.hours_worked = sum((tracker.hours_worked for tracker in trackers), 0)
+        keep.tasks_completed = sum(tracker.tasks_completed for tracker in trackers)
+        keep.save(update_fields=['hours_worked', 'tasks_completed'])
+        ProductivityTracker.objects.filter(id__in=[tracker.id for tracker in extra]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0011_performancemetrics_leaderboard_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_days, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='productivitytracker',
+            constraint=models.UniqueConstraint(fields=('employee', 'date'), name='unique_productivity_per_day'),
+        ),
+    ]
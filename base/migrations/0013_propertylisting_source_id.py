@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0012_productivitytracker_unique_per_day'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertylisting',
+            name='source_id',
+            field=models.CharField(blank=True, max_length=30, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+TABLE = 'base_propertylisting_fts'
+
+
+def create_search_index(apps, schema_editor):
+    """Create and fill the FTS5 property search table (SQLite only)."""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    PropertyListing = apps.get_model('base', 'PropertyListing')
+    pk_field = PropertyListing._meta.pk
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+            f'listing_id UNINDEXED, location, propertyType, address, tokenize="unicode61")'
+        )
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, listing_id, location, propertyType, address) VALUES (%s, %s, %s, %s, %s)',
+            (
+                [pk.int >> 65, pk_field.get_db_prep_value(pk, connection), location, property_type, address]
+                for pk, location, property_type, address in PropertyListing.objects.values_list(
+                    'pk', 'location', 'propertyType', 'address',
+                ).iterator()
+            ),
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0013_propertylisting_source_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0014_propertylisting_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='propertylisting',
+            index=models.Index(fields=['status', 'id'], name='listing_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['agent', '-sale_date', '-id'], name='sale_agent_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-due_date', '-id'], name='task_due_date_idx'),
+        ),
+    ]
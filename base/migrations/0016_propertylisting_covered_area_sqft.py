@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:50
+
+from django.db import migrations, models
+
+from base.areas import parse_area_sqft
+
+CHUNK_SIZE = 2000
+
+
+def backfill_covered_area_sqft(apps, schema_editor):
+    """Parse coveredArea for existing listings, a primary-key range at a time."""
+    PropertyListing = apps.get_model('base', 'PropertyListing')
+    last_pk = None
+    while True:
+        chunk = PropertyListing.objects.order_by('pk').only('pk', 'coveredArea')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        chunk = list(chunk[:CHUNK_SIZE])
+        if not chunk:
+            break
+        for listing in chunk:
+            listing.covered_area_sqft = parse_area_sqft(listing.coveredArea)
+        PropertyListing.objects.bulk_update(chunk, ['covered_area_sqft'])
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0015_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertylisting',
+            name='covered_area_sqft',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.RunPython(backfill_covered_area_sqft, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:52
+
+from collections import Counter
+
+from django.db import migrations, models
+
+FIELD_FACETS = {
+    'location': 'location',
+    'type': 'propertyType',
+    'bedrooms': 'bedroomCount',
+    'bathrooms': 'bathroomCount',
+    'status': 'status',
+}
+PRICE_BANDS = [
+    ('under-50l', 0, 5_000_000),
+    ('50l-1cr', 5_000_000, 10_000_000),
+    ('1cr-2cr', 10_000_000, 20_000_000),
+    ('2cr-5cr', 20_000_000, 50_000_000),
+    ('5cr-plus', 50_000_000, None),
+]
+
+
+def price_band(price):
+    if price:
+        for value, low, high in PRICE_BANDS:
+            if price >= low and (high is None or price < high):
+                return value
+    return 'unpriced'
+
+
+def count_facets(apps, schema_editor):
+    """Seed the facet counts from the existing listings."""
+    PropertyListing = apps.get_model('base', 'PropertyListing')
+    PropertyFacetCount = apps.get_model('base', 'PropertyFacetCount')
+    counts = Counter()
+    for listing in PropertyListing.objects.values(*FIELD_FACETS.values(), 'price').iterator(chunk_size=2000):
+        counts.update((facet, str(listing[field])) for facet, field in FIELD_FACETS.items())
+        counts[('price', price_band(listing['price']))] += 1
+    PropertyFacetCount.objects.bulk_create(
+        [PropertyFacetCount(facet=facet, value=value, count=count) for (facet, value), count in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0016_propertylisting_covered_area_sqft'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('facet', 'value'), name='unique_property_facet_value')],
+            },
+        ),
+        migrations.RunPython(count_facets, migrations.RunPython.noop),
+    ]
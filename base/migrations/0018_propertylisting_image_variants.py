@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0017_property_facet_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertylisting',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
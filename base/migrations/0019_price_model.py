@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0018_propertylisting_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trained_at', models.DateTimeField(auto_now_add=True)),
+                ('data_version', models.BigIntegerField()),
+                ('sample_count', models.PositiveIntegerField()),
+                ('location_count', models.PositiveIntegerField(default=0)),
+                ('metrics', models.JSONField(blank=True, default=dict)),
+                ('artifact', models.BinaryField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-17 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0020_task_status_due_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('namespace', models.CharField(max_length=50, unique=True)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-17 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0021_snapshot_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChartSpec',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=16, unique=True)),
+                ('spec', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
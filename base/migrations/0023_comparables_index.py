@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-17 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0022_chart_spec'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComparablesIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('built_at', models.DateTimeField(auto_now_add=True)),
+                ('data_version', models.BigIntegerField()),
+                ('listing_count', models.PositiveIntegerField()),
+                ('location_count', models.PositiveIntegerField(default=0)),
+                ('artifact', models.BinaryField()),
+            ],
+        ),
+    ]
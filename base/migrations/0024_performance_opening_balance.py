@@ -0,0 +1,72 @@
+# Generated by Django 5.1.6 on 2026-10-17 13:32
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def record_opening_balances(apps, schema_editor):
+    """
+    Give every agent whose counters hold more (or less) than their ledger
+    explains one opening-balance event for the difference, so the counters
+    are kept and replaying the ledger reproduces them. Tasks deleted before
+    the ledger existed left no event behind, and their points would
+    otherwise be lost on the next rebuild.
+    """
+    PerformanceEvent = apps.get_model('base', 'PerformanceEvent')
+    PerformanceMetrics = apps.get_model('base', 'PerformanceMetrics')
+
+    totals = {
+        row['employee_id']: row
+        for row in PerformanceEvent.objects.values('employee_id').annotate(
+            tasks=Count('id', filter=Q(kind='task_completed')) + Sum('tasks_adjustment'),
+            sales=Count('id', filter=Q(kind='sale_closed')) + Sum('sales_adjustment'),
+            points=Sum('points'),
+        ).order_by()
+    }
+    balances = []
+    for employee_id, tasks, sales, points in PerformanceMetrics.objects.filter(
+        employee__isnull=False,
+    ).values_list('employee_id', 'tasks_completed', 'sales_closed', 'aggregate_points').iterator():
+        ledger = totals.get(employee_id, {'tasks': 0, 'sales': 0, 'points': 0})
+        difference = (tasks - ledger['tasks'], sales - ledger['sales'], points - (ledger['points'] or 0))
+        if any(difference):
+            balances.append(PerformanceEvent(
+                employee_id=employee_id, kind='opening_balance', tasks_adjustment=difference[0],
+                sales_adjustment=difference[1], points=difference[2],
+            ))
+    PerformanceEvent.objects.bulk_create(balances, batch_size=1000)
+
+
+def remove_opening_balances(apps, schema_editor):
+    apps.get_model('base', 'PerformanceEvent').objects.filter(kind='opening_balance').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0023_comparables_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='performanceevent',
+            name='sales_adjustment',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='performanceevent',
+            name='tasks_adjustment',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='performanceevent',
+            name='kind',
+            field=models.CharField(choices=[('task_completed', 'Task completed'), ('sale_closed', 'Sale closed'), ('opening_balance', 'Opening balance')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='performanceevent',
+            name='points',
+            field=models.IntegerField(),
+        ),
+        migrations.RunPython(record_opening_balances, remove_opening_balances),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-17 13:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0024_performance_opening_balance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chartspec',
+            name='last_used_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.1.6 on 2026-10-17 13:35
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def date_undated_sales(apps, schema_editor):
+    """
+    Give every undated sale its closing date (or today), and add it to the
+    sales rollups it was left out of while it had no date.
+    """
+    Sale = apps.get_model('base', 'Sale')
+    AgentProfit = apps.get_model('base', 'AgentProfit')
+    DailySalesRollup = apps.get_model('base', 'DailySalesRollup')
+    MonthlySalesRollup = apps.get_model('base', 'MonthlySalesRollup')
+
+    today = django.utils.timezone.localdate()
+    daily = defaultdict(lambda: {'sales_count': 0, 'sales_total': Decimal('0'), 'profit_total': Decimal('0')})
+    for sale_id, agent_id, closing_date, price in Sale.objects.filter(sale_date__isnull=True).values_list(
+        'id', 'agent_id', 'closing_date', 'sale_price',
+    ):
+        sale_date = closing_date or today
+        Sale.objects.filter(pk=sale_id).update(sale_date=sale_date)
+        daily[(sale_date, agent_id)]['sales_count'] += 1
+        daily[(sale_date, agent_id)]['sales_total'] += price
+        for profit_agent_id, amount in AgentProfit.objects.filter(sale_id=sale_id).values_list(
+            'agent_id', 'profit_amount',
+        ):
+            daily[(sale_date, profit_agent_id)]['profit_total'] += amount
+
+    monthly = defaultdict(lambda: dict.fromkeys(('sales_count', 'sales_total', 'profit_total'), 0))
+    for (sale_date, agent_id), deltas in daily.items():
+        bucket = DailySalesRollup.objects.filter(date=sale_date, agent_id=agent_id).first()
+        if bucket is None:
+            DailySalesRollup.objects.create(date=sale_date, agent_id=agent_id, **deltas)
+        else:
+            DailySalesRollup.objects.filter(pk=bucket.pk).update(**{f: F(f) + v for f, v in deltas.items()})
+        for field, value in deltas.items():
+            monthly[(sale_date.year, sale_date.month)][field] += value
+    for (year, month), deltas in monthly.items():
+        updated = MonthlySalesRollup.objects.filter(year=year, month=month).update(
+            **{f: F(f) + v for f, v in deltas.items()}
+        )
+        if not updated:
+            MonthlySalesRollup.objects.create(year=year, month=month, **deltas)
+
+
+def merge_unassigned_rollups(apps, schema_editor):
+    """Fold duplicate (date, no agent) daily buckets, left by deleted agents, into one per date."""
+    DailySalesRollup = apps.get_model('base', 'DailySalesRollup')
+
+    duplicated = (
+        DailySalesRollup.objects.filter(agent__isnull=True).values('date')
+        .annotate(n=Count('id')).filter(n__gt=1).values_list('date', flat=True)
+    )
+    for day in list(duplicated):
+        rows = DailySalesRollup.objects.filter(date=day, agent__isnull=True)
+        totals = rows.aggregate(
+            sales_count=Sum('sales_count'), sales_total=Sum('sales_total'), profit_total=Sum('profit_total'),
+        )
+        keep = rows.order_by('pk').first()
+        rows.exclude(pk=keep.pk).delete()
+        DailySalesRollup.objects.filter(pk=keep.pk).update(**totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0025_chart_spec_last_used'),
+    ]
+
+    operations = [
+        migrations.RunPython(date_undated_sales, migrations.RunPython.noop),
+        migrations.RunPython(merge_unassigned_rollups, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='sale',
+            name='sale_date',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('agent__isnull', True)), fields=('date',), name='unique_daily_sales_rollup_unassigned'),
+        ),
+    ]
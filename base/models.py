@@ -1,18 +1,50 @@
 from django.db import models
 from django.contrib.auth.models import User
 import uuid
+from collections import Counter
 
-from django.db.models.signals import post_save
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
+
+from .areas import parse_area_sqft
+from .deferred import defer, handler
+from .images import generate_variants
+from .snapshots import bump_version_on_commit
+from .upsert import upsert_increment
 # views.py
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
-from django.utils.timezone import now
+from django.utils.timezone import localdate, now
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 
+class PropertyListingQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """Bulk updates skip the listing signals, so move the facet counts and reindex here."""
+        if kwargs.keys() <= {'image_variants'}:
+            # Derived from the image alone: no facet, search or data-version change
+            return super().update(**kwargs)
+        tracked = set(PropertyFacetCount.SOURCE_FIELDS) & kwargs.keys()
+        with transaction.atomic(using=self.db):
+            before = list(self.values('pk', *PropertyFacetCount.SOURCE_FIELDS)) if tracked else []
+            ids = [listing['pk'] for listing in before] or list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            if before:
+                PropertyFacetCount.count_listings(before, sign=-1)
+                PropertyFacetCount.count_listings(
+                    PropertyListing.objects.filter(pk__in=ids).values(*PropertyFacetCount.SOURCE_FIELDS)
+                )
+            for pk in ids:
+                defer('search_index', pk)
+            if rows:
+                bump_version_on_commit('listings', changes=rows)
+        return rows
+
+
 class PropertyListing(models.Model):
     STATUS_CHOICES = [
         ('Available', 'Available'),
@@ -21,11 +53,14 @@ class PropertyListing(models.Model):
     ]
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    source_id = models.CharField(max_length=30, null=True, blank=True, unique=True)  # ID in the imported listings CSV
     propertyType = models.CharField(max_length=30)
     location = models.CharField(max_length=30)
     address = models.CharField(max_length=100)
     floors = models.PositiveIntegerField()
     coveredArea = models.CharField(max_length=30)
+    covered_area_sqft = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True,
+                                            db_index=True, editable=False)  # Parsed from coveredArea
     electricityStatus = models.CharField(max_length=30)
     bathroomCount = models.PositiveIntegerField()
     bedroomCount = models.PositiveIntegerField()
@@ -33,10 +68,33 @@ class PropertyListing(models.Model):
     price = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Available')
     image = models.ImageField(upload_to='property_images/', null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # See base.images
+
+    objects = PropertyListingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of listings filtered by status
+            models.Index(fields=['status', 'id'], name='listing_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.propertyType} - {self.location}"
 
+    def save(self, *args, **kwargs):
+        """Keep covered_area_sqft and the image variants in step with coveredArea and image."""
+        self.covered_area_sqft = parse_area_sqft(self.coveredArea)
+        if not self.image:
+            self.image_variants = {}
+        elif not self.image._committed:
+            # A fresh upload: render its resized copies before the original is stored
+            self.image_variants = generate_variants(self.image)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            derived = {'coveredArea': 'covered_area_sqft', 'image': 'image_variants'}
+            kwargs['update_fields'] = {*update_fields, *(derived[f] for f in update_fields if f in derived)}
+        super().save(*args, **kwargs)
+
 
 class Employee(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -67,14 +125,59 @@ class PerformanceMetrics(models.Model):
     sales_closed = models.PositiveIntegerField(default=0)
     aggregate_points = models.PositiveIntegerField(default=0)  # New field
 
+    class Meta:
+        indexes = [
+            # Serves leaderboard top-K, rank counts and keyset windows
+            models.Index(fields=['-aggregate_points', 'id'], name='metrics_leaderboard_idx'),
+        ]
+
     def __str__(self):
         return f"Performance Metrics (Employee: {self.employee})"
 
+    SALE_POINTS = 10
+    TASK_POINTS = 5
+
     def update_aggregate_points(self):
         """Updates the aggregate points based on sales and tasks completed."""
-        self.aggregate_points = (self.sales_closed * 10) + (self.tasks_completed * 5)
+        self.aggregate_points = (self.sales_closed * self.SALE_POINTS) + (self.tasks_completed * self.TASK_POINTS)
         self.save()
 
+    @classmethod
+    def add_points(cls, employee_id, tasks_completed=0, sales_closed=0):
+        """Atomically add to an employee's counters with a single UPDATE (no read-modify-write)."""
+        points = (sales_closed * cls.SALE_POINTS) + (tasks_completed * cls.TASK_POINTS)
+        updated = cls.objects.filter(employee_id=employee_id).update(
+            tasks_completed=F('tasks_completed') + tasks_completed,
+            sales_closed=F('sales_closed') + sales_closed,
+            aggregate_points=F('aggregate_points') + points,
+        )
+        if not updated:
+            cls.objects.create(
+                employee_id=employee_id,
+                tasks_completed=tasks_completed,
+                sales_closed=sales_closed,
+                aggregate_points=points,
+            )
+        # update() skips post_save, so invalidate the dashboards explicitly
+        bump_version_on_commit('dashboard')
+
+    @classmethod
+    def rebuild_from_ledger(cls, employee_ids=None):
+        """Recompute counters from PerformanceEvent rows. Returns the number of metrics rewritten."""
+        metrics = cls.objects.filter(employee__isnull=False)
+        if employee_ids is not None:
+            metrics = metrics.filter(employee_id__in=employee_ids)
+        totals = PerformanceEvent.totals(employee_ids)
+
+        changed = []
+        for metric in metrics:
+            counters = totals.get(metric.employee_id, (0, 0, 0))
+            metric.tasks_completed, metric.sales_closed, metric.aggregate_points = counters
+            changed.append(metric)
+        cls.objects.bulk_update(changed, ['tasks_completed', 'sales_closed', 'aggregate_points'], batch_size=1000)
+        bump_version_on_commit('dashboard')
+        return len(changed)
+
 
 # ✅ Signal to create PerformanceMetrics when a new Employee is added
 @receiver(post_save, sender=Employee)
@@ -90,9 +193,30 @@ class ProductivityTracker(models.Model):
     hours_worked = models.DecimalField(max_digits=5, decimal_places=2)
     tasks_completed = models.PositiveIntegerField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'date'], name='unique_productivity_per_day'),
+        ]
+
     def __str__(self):
         return f"Productivity for {self.employee} on {self.date}"
 
+    @classmethod
+    def increment(cls, batch):
+        """
+        Add to the daily rows in `batch` ({(employee_id, date): {field: delta}})
+        with a single INSERT ... ON CONFLICT DO UPDATE, creating missing days.
+        """
+        upsert_increment(cls, ['employee_id', 'date'], [
+            {
+                'employee_id': employee_id,
+                'date': day,
+                'hours_worked': deltas.get('hours_worked', 0),
+                'tasks_completed': deltas.get('tasks_completed', 0),
+            }
+            for (employee_id, day), deltas in batch.items()
+        ])
+
 
 class PredefinedTask(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -121,12 +245,7 @@ def update_task_status(request, task_id):
             task.status = new_status
             if new_status == "Completed" and task_document:
                 task.document = task_document
-                task.save()
-                
-                # Update performance metrics
-                performance_metrics, _ = PerformanceMetrics.objects.get_or_create(employee=request.user)
-                performance_metrics.tasks_completed += 1
-                performance_metrics.save()
+                task.save()  # Completion is recorded by the performance ledger signal
             else:
                 task.save()
 
@@ -153,6 +272,44 @@ def clear_completed_tasks(request):
     return JsonResponse({'error': 'Invalid request method'}, status=400)
 
 
+class TaskQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create skips Task.save and post_save, so apply their effects here for the whole batch."""
+        objs = list(objs)
+        predefined = PredefinedTask.objects.in_bulk({task.predefined_task_id for task in objs})
+        for task in objs:
+            # Same defaults as Task.save, from one query instead of one per task
+            template = predefined.get(task.predefined_task_id)
+            if template is not None:
+                task.priority = template.priority
+                task.description = task.description or template.description
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            PerformanceEvent.record_many(
+                PerformanceEvent.TASK_COMPLETED,
+                [(task.assigned_to_id, task.id) for task in objs if task.status == 'Completed' and task.assigned_to_id],
+            )
+            bump_version_on_commit('dashboard')
+        return objs
+
+    def update(self, **kwargs):
+        """Bulk updates skip post_save, so record completions and invalidations here."""
+        with transaction.atomic(using=self.db):
+            completing = []
+            if kwargs.get('status') == 'Completed':
+                completing = list(self.exclude(status='Completed').values_list('id', flat=True))
+            rows = super().update(**kwargs)
+            if completing:
+                assigned = Task.objects.filter(id__in=completing, assigned_to__isnull=False)
+                PerformanceEvent.record_many(
+                    PerformanceEvent.TASK_COMPLETED,
+                    [(employee_id, task_id) for task_id, employee_id in assigned.values_list('id', 'assigned_to_id')],
+                )
+            if rows:
+                bump_version_on_commit('dashboard')
+        return rows
+
+
 class Task(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     predefined_task = models.ForeignKey('PredefinedTask', on_delete=models.CASCADE)
@@ -166,9 +323,60 @@ class Task(models.Model):
     )
     document = models.FileField(upload_to='task_documents/', null=True, blank=True)
 
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of task listings, most recent due date first
+            models.Index(fields=['-due_date', '-id'], name='task_due_date_idx'),
+            # Overdue sweeps: status equality, then a due_date range
+            models.Index(fields=['status', 'due_date'], name='task_status_due_idx'),
+        ]
+
     def __str__(self):
         return f"{self.predefined_task.title} ({self.status})"
 
+    @classmethod
+    def assign_many(cls, predefined_task, employees, due_date, description='', skip_existing=False):
+        """
+        Give `predefined_task` to every employee in `employees` (a queryset or ids)
+        with one bulk insert. With `skip_existing`, employees who already have an
+        unfinished task of this type are left out. Returns the created tasks.
+        """
+        employee_ids = employees.values_list('id', flat=True) if isinstance(employees, models.QuerySet) else employees
+        employee_ids = set(employee_ids)
+        if skip_existing:
+            employee_ids -= set(cls.objects.filter(
+                predefined_task=predefined_task, assigned_to_id__in=employee_ids,
+            ).exclude(status='Completed').values_list('assigned_to_id', flat=True))
+        return cls.objects.bulk_create([
+            cls(predefined_task=predefined_task, assigned_to_id=employee_id, description=description,
+                due_date=due_date, status='Pending')
+            for employee_id in sorted(employee_ids)
+        ], batch_size=500)
+
+    @classmethod
+    def sweep_overdue(cls, today=None):
+        """
+        Mark every past-due Pending task Overdue, and return Overdue tasks whose
+        due date was moved out again to Pending, with one UPDATE each. Tasks
+        with a submitted document are awaiting review and are left alone.
+        Returns (marked overdue, reopened).
+        """
+        today = today or now().date()
+        without_document = cls.objects.filter(Q(document__isnull=True) | Q(document=''))
+        with transaction.atomic():
+            overdue = without_document.filter(status='Pending', due_date__lt=today).update(status='Overdue')
+            reopened = without_document.filter(status='Overdue', due_date__gte=today).update(status='Pending')
+        return overdue, reopened
+
+    @property
+    def display_status(self):
+        """Status as of today, including a past-due task the sweeper has not reached yet."""
+        if self.status == 'Pending' and not self.document and self.due_date < now().date():
+            return 'Overdue'
+        return self.status
+
     def save(self, *args, **kwargs):
         """Ensure priority is updated from predefined task but preserve custom description."""
         if self.predefined_task:
@@ -180,39 +388,53 @@ class Task(models.Model):
 
 
 
-# ✅ Signal to update task points
+# ✅ Signal to record task completions in the performance ledger
+# (points and the productivity tracker are updated once the transaction commits)
 @receiver(post_save, sender=Task)
 def update_task_points(sender, instance, **kwargs):
-    if instance.status == "Completed" and instance.assigned_to:
-        performance_metrics, _ = PerformanceMetrics.objects.get_or_create(employee=instance.assigned_to)
-        performance_metrics.tasks_completed += 1
-        performance_metrics.update_aggregate_points()
-from django.utils.timezone import now
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-
-# ✅ Signal to update task points
-@receiver(post_save, sender=Task)
-def update_task_points(sender, instance, **kwargs):
-    if instance.status == "Completed" and instance.assigned_to:
-        performance_metrics, _ = PerformanceMetrics.objects.get_or_create(employee=instance.assigned_to)
-        performance_metrics.tasks_completed += 1
-        performance_metrics.update_aggregate_points()
-
-# ✅ Signal to update productivity tracker
-@receiver(post_save, sender=Task)
-def update_task_productivity(sender, instance, **kwargs):
-    if instance.status == "Completed" and instance.assigned_to:
-        today = now().date()
-        employee = instance.assigned_to
-
-        # Update the productivity tracker
-        tracker, _ = ProductivityTracker.objects.get_or_create(
-            employee=employee, date=today,
-            defaults={'hours_worked': 0, 'tasks_completed': 0}
-        )
-        tracker.tasks_completed += 1
-        tracker.save()
+    if instance.status == "Completed" and instance.assigned_to_id:
+        PerformanceEvent.record(PerformanceEvent.TASK_COMPLETED, instance.assigned_to_id, task=instance)
+
+
+# ✅ Deferred handler applying a transaction's productivity increments per (employee, day)
+@handler('productivity')
+def apply_productivity(batch):
+    ProductivityTracker.increment(batch)
+
+
+class SaleQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create skips post_save, so apply the ledger and rollup side effects here."""
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            for sale in objs:
+                apply_to_sales_rollups(sale.sale_date, sale.agent_id, sales_count=1, sales_total=sale.sale_price)
+            PerformanceEvent.record_many(
+                PerformanceEvent.SALE_CLOSED,
+                [(sale.agent_id, sale.id) for sale in objs if sale.agent_id],
+            )
+            bump_version_on_commit('dashboard')
+        return objs
+
+    def update(self, **kwargs):
+        """Bulk updates skip the rollup signals, so move the affected totals here."""
+        tracked = {'sale_date', 'sale_price', 'agent', 'agent_id'} & kwargs.keys()
+        columns = ('id', 'sale_date', 'agent_id', 'sale_price')
+        with transaction.atomic(using=self.db):
+            before = list(self.values_list(*columns)) if tracked else []
+            rows = super().update(**kwargs)
+            if before:
+                after = dict(
+                    (row[0], row) for row in Sale.objects.filter(id__in=[row[0] for row in before]).values_list(*columns)
+                )
+                for sale_id, sale_date, agent_id, sale_price in before:
+                    _, new_date, new_agent_id, new_price = after[sale_id]
+                    apply_to_sales_rollups(sale_date, agent_id, sales_count=-1, sales_total=-sale_price)
+                    apply_to_sales_rollups(new_date, new_agent_id, sales_count=1, sales_total=new_price)
+                    if sale_date != new_date:
+                        move_sale_profits(sale_id, sale_date, new_date)
+            bump_version_on_commit('dashboard')
+        return rows
 
 
 class Sale(models.Model):
@@ -230,24 +452,30 @@ class Sale(models.Model):
     seller_email = models.EmailField(null=True, blank=True, default="notprovided@example.com")
     seller_address = models.TextField(default="Not Provided")
     ownership_verification = models.CharField(max_length=100, default="Pending Verification")
-    sale_date = models.DateField(null=True, blank=True)
+    sale_date = models.DateField(default=localdate)  # Required: the sales rollups bucket by it
     sale_price = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
     title_insurance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     legal_fees = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     deposit = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     closing_date = models.DateField(null=True, blank=True)
 
+    objects = SaleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of an agent's sales, newest first
+            models.Index(fields=['agent', '-sale_date', '-id'], name='sale_agent_date_idx'),
+        ]
+
     def __str__(self):
         return f"Sale of {self.property_listing} to {self.buyer_name}"
 
 
-# ✅ Signal to update sales points
+# ✅ Signal to record closed sales in the performance ledger
 @receiver(post_save, sender=Sale)
 def update_sales_points(sender, instance, created, **kwargs):
-    if created and instance.agent:
-        performance_metrics, _ = PerformanceMetrics.objects.get_or_create(employee=instance.agent)
-        performance_metrics.sales_closed += 1
-        performance_metrics.update_aggregate_points()
+    if created and instance.agent_id:
+        PerformanceEvent.record(PerformanceEvent.SALE_CLOSED, instance.agent_id, sale=instance)
 
 
 
@@ -262,3 +490,517 @@ class AgentProfit(models.Model):
 
     def __str__(self):
         return f"Profit: {self.profit_amount} (Agent: {self.agent})"
+
+
+class PerformanceEvent(models.Model):
+    """
+    Append-only record of everything that earns performance points.
+
+    PerformanceMetrics is a projection of these rows: each new event is added to
+    the counters with a single UPDATE, and the counters can be rebuilt from the
+    ledger at any time with PerformanceMetrics.rebuild_from_ledger().
+
+    An opening balance carries whatever an agent's counters held before the
+    ledger existed beyond what their surviving tasks and sales explain (tasks
+    deleted since, or drift); its adjustments and points may be negative.
+    """
+    TASK_COMPLETED = 'task_completed'
+    SALE_CLOSED = 'sale_closed'
+    OPENING_BALANCE = 'opening_balance'
+    KIND_CHOICES = [
+        (TASK_COMPLETED, 'Task completed'),
+        (SALE_CLOSED, 'Sale closed'),
+        (OPENING_BALANCE, 'Opening balance'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    points = models.IntegerField()
+    # Opening balances only: counts added to tasks_completed and sales_closed
+    tasks_adjustment = models.IntegerField(default=0)
+    sales_adjustment = models.IntegerField(default=0)
+    task = models.ForeignKey('Task', on_delete=models.SET_NULL, null=True, blank=True)
+    sale = models.ForeignKey('Sale', on_delete=models.SET_NULL, null=True, blank=True)
+    recorded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # A task or sale can only ever earn points once
+            models.UniqueConstraint(fields=['task'], condition=Q(kind='task_completed'),
+                                    name='unique_task_completed_event'),
+            models.UniqueConstraint(fields=['sale'], condition=Q(kind='sale_closed'),
+                                    name='unique_sale_closed_event'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} (Employee: {self.employee_id}, {self.points} pts)"
+
+    @classmethod
+    def points_for(cls, kind):
+        return PerformanceMetrics.TASK_POINTS if kind == cls.TASK_COMPLETED else PerformanceMetrics.SALE_POINTS
+
+    @classmethod
+    def totals(cls, employee_ids=None):
+        """{employee_id: (tasks completed, sales closed, points)} summed over the ledger."""
+        events = cls.objects.all()
+        if employee_ids is not None:
+            events = events.filter(employee_id__in=employee_ids)
+        return {
+            row['employee_id']: (
+                row['tasks'] + (row['tasks_adjustment'] or 0),
+                row['sales'] + (row['sales_adjustment'] or 0),
+                row['points'] or 0,
+            )
+            for row in events.values('employee_id').annotate(
+                tasks=Count('id', filter=Q(kind=cls.TASK_COMPLETED)),
+                sales=Count('id', filter=Q(kind=cls.SALE_CLOSED)),
+                tasks_adjustment=Sum('tasks_adjustment'),
+                sales_adjustment=Sum('sales_adjustment'),
+                points=Sum('points'),
+            ).order_by()
+        }
+
+    @classmethod
+    def record(cls, kind, employee_id, task=None, sale=None):
+        """
+        Append an event and project it onto PerformanceMetrics.
+
+        Returns None when the task or sale has already been recorded, so
+        re-saving a completed task no longer counts it twice.
+        """
+        try:
+            with transaction.atomic():
+                event = cls.objects.create(
+                    employee_id=employee_id, kind=kind, points=cls.points_for(kind), task=task, sale=sale,
+                )
+        except IntegrityError:
+            return None
+        cls.defer_projection(kind, employee_id)
+        return event
+
+    @classmethod
+    def record_many(cls, kind, rows):
+        """
+        Bulk version of record() for QuerySet.update/bulk_create.
+
+        `rows` are (employee_id, task_or_sale_id) pairs; ones already in the
+        ledger are skipped. Returns the events created.
+        """
+        target = 'task_id' if kind == cls.TASK_COMPLETED else 'sale_id'
+        existing = set(
+            cls.objects.filter(kind=kind, **{f'{target}__in': [object_id for _, object_id in rows]})
+            .values_list(target, flat=True)
+        )
+        events = [
+            cls(employee_id=employee_id, kind=kind, points=cls.points_for(kind), **{target: object_id})
+            for employee_id, object_id in rows
+            if object_id not in existing
+        ]
+        cls.objects.bulk_create(events, batch_size=1000)
+        for event in events:
+            cls.defer_projection(kind, event.employee_id)
+        return events
+
+    @classmethod
+    def defer_projection(cls, kind, employee_id):
+        """Queue the counter updates for one new event until the transaction commits."""
+        if kind == cls.TASK_COMPLETED:
+            defer('performance_metrics', employee_id, tasks_completed=1)
+            defer('productivity', (employee_id, now().date()), tasks_completed=1)
+        else:
+            defer('performance_metrics', employee_id, sales_closed=1)
+
+
+# ✅ Deferred handler projecting a transaction's ledger events onto PerformanceMetrics
+@handler('performance_metrics')
+def apply_performance_metrics(batch):
+    for employee_id, deltas in batch.items():
+        PerformanceMetrics.add_points(employee_id, **deltas)
+
+
+class SalesRollup(models.Model):
+    """Pre-aggregated sales totals, kept current by the Sale/AgentProfit signals below."""
+    sales_count = models.IntegerField(default=0)
+    sales_total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    profit_total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def bump(cls, deltas, **keys):
+        """Add `deltas` to the bucket identified by `keys`, creating it if needed."""
+        updates = {field: F(field) + value for field, value in deltas.items()}
+        if cls.objects.filter(**keys).update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**keys, **deltas)
+        except IntegrityError:
+            # Another writer created the bucket first
+            cls.objects.filter(**keys).update(**updates)
+
+
+class DailySalesRollup(SalesRollup):
+    date = models.DateField()
+    agent = models.ForeignKey('Employee', on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'agent'], name='unique_daily_sales_rollup'),
+            # NULLs never collide in the constraint above, so sales without an agent need their own
+            models.UniqueConstraint(fields=['date'], condition=Q(agent__isnull=True),
+                                    name='unique_daily_sales_rollup_unassigned'),
+        ]
+
+    def __str__(self):
+        return f"Sales on {self.date} (Agent: {self.agent}): {self.sales_count}"
+
+    @classmethod
+    def release_agent(cls, agent_id):
+        """Fold an agent's buckets into the unassigned ones, before the agent is deleted."""
+        rows = cls.objects.filter(agent_id=agent_id)
+        for row in rows.values('date', 'sales_count', 'sales_total', 'profit_total'):
+            cls.bump({field: row[field] for field in ('sales_count', 'sales_total', 'profit_total')},
+                     date=row['date'], agent_id=None)
+        rows.delete()
+
+
+class MonthlySalesRollup(SalesRollup):
+    year = models.PositiveIntegerField()
+    month = models.PositiveIntegerField()  # 1 (January) to 12 (December)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'month'], name='unique_monthly_sales_rollup'),
+        ]
+
+    def __str__(self):
+        return f"Sales for {self.year}-{self.month:02d}: {self.sales_count}"
+
+
+def apply_to_sales_rollups(sale_date, agent_id, **deltas):
+    """Queue `deltas` for the daily and monthly buckets a sale on `sale_date` falls in."""
+    if sale_date is None or not any(deltas.values()):
+        return
+    defer('sales_rollups', (sale_date, agent_id), **deltas)
+
+
+def move_sale_profits(sale_id, old_date, new_date):
+    """Profits are bucketed by sale date, so they follow a sale whose date changes."""
+    for profit in AgentProfit.objects.filter(sale_id=sale_id).values('agent_id', 'profit_amount'):
+        apply_to_sales_rollups(old_date, profit['agent_id'], profit_total=-profit['profit_amount'])
+        apply_to_sales_rollups(new_date, profit['agent_id'], profit_total=profit['profit_amount'])
+
+
+# ✅ Deferred handler writing a transaction's rollup deltas as one UPSERT per table
+@handler('sales_rollups')
+def apply_sales_rollups(batch):
+    fields = ('sales_count', 'sales_total', 'profit_total')
+    # Deltas of an agent deleted in the meantime belong to the unassigned buckets, like their sales
+    agent_ids = {agent_id for _, agent_id in batch if agent_id is not None}
+    live = set(Employee.objects.filter(id__in=agent_ids).values_list('id', flat=True)) if agent_ids else set()
+    daily = {}
+    monthly = {}
+    for (sale_date, agent_id), deltas in batch.items():
+        bucket = daily.setdefault((sale_date, agent_id if agent_id in live else None), dict.fromkeys(fields, 0))
+        month = monthly.setdefault((sale_date.year, sale_date.month), dict.fromkeys(fields, 0))
+        for field in fields:
+            bucket[field] += deltas[field]
+            month[field] += deltas[field]
+    unassigned = [(sale_date, deltas) for (sale_date, agent_id), deltas in daily.items() if agent_id is None]
+    for sale_date, deltas in unassigned:
+        # The unassigned buckets' constraint is partial, which ON CONFLICT (date, agent_id) cannot target
+        DailySalesRollup.bump(deltas, date=sale_date, agent_id=None)
+    upsert_increment(DailySalesRollup, ['date', 'agent_id'], [
+        {'date': sale_date, 'agent_id': agent_id, **deltas}
+        for (sale_date, agent_id), deltas in daily.items() if agent_id is not None
+    ])
+    upsert_increment(MonthlySalesRollup, ['year', 'month'], [
+        {'year': year, 'month': month, **deltas} for (year, month), deltas in monthly.items()
+    ])
+
+
+# ✅ Signals to keep the sales rollups in step with Sale and AgentProfit writes
+@receiver(pre_save, sender=Sale)
+def remember_previous_sale(sender, instance, **kwargs):
+    instance._rollup_previous = None
+    if not instance._state.adding:
+        instance._rollup_previous = Sale.objects.filter(pk=instance.pk).values(
+            'sale_date', 'agent_id', 'sale_price'
+        ).first()
+
+
+@receiver(post_save, sender=Sale)
+def update_sales_rollups(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        unchanged = (
+            previous['sale_date'] == instance.sale_date
+            and previous['agent_id'] == instance.agent_id
+            and previous['sale_price'] == instance.sale_price
+        )
+        if unchanged:
+            return
+        apply_to_sales_rollups(
+            previous['sale_date'], previous['agent_id'],
+            sales_count=-1, sales_total=-previous['sale_price'],
+        )
+        if previous['sale_date'] != instance.sale_date:
+            move_sale_profits(instance.pk, previous['sale_date'], instance.sale_date)
+    apply_to_sales_rollups(
+        instance.sale_date, instance.agent_id,
+        sales_count=1, sales_total=instance.sale_price,
+    )
+
+
+@receiver(post_delete, sender=Sale)
+def remove_sale_from_rollups(sender, instance, **kwargs):
+    apply_to_sales_rollups(
+        instance.sale_date, instance.agent_id,
+        sales_count=-1, sales_total=-instance.sale_price,
+    )
+
+
+@receiver(pre_save, sender=AgentProfit)
+def remember_previous_profit(sender, instance, **kwargs):
+    instance._rollup_previous = None
+    if not instance._state.adding:
+        instance._rollup_previous = AgentProfit.objects.filter(pk=instance.pk).values(
+            'sale__sale_date', 'agent_id', 'profit_amount'
+        ).first()
+
+
+@receiver(post_save, sender=AgentProfit)
+def update_profit_rollups(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        apply_to_sales_rollups(
+            previous['sale__sale_date'], previous['agent_id'],
+            profit_total=-previous['profit_amount'],
+        )
+    sale_date = Sale.objects.filter(pk=instance.sale_id).values_list('sale_date', flat=True).first()
+    apply_to_sales_rollups(sale_date, instance.agent_id, profit_total=instance.profit_amount)
+
+
+@receiver(post_delete, sender=AgentProfit)
+def remove_profit_from_rollups(sender, instance, **kwargs):
+    sale_date = Sale.objects.filter(pk=instance.sale_id).values_list('sale_date', flat=True).first()
+    apply_to_sales_rollups(sale_date, instance.agent_id, profit_total=-instance.profit_amount)
+
+
+# ✅ Signal to fold a deleted agent's daily sales rollups into the unassigned buckets
+# (their sales keep counting, now without an agent, and NULL buckets must stay unique)
+@receiver(pre_delete, sender=Employee)
+def release_sales_rollups(sender, instance, **kwargs):
+    DailySalesRollup.release_agent(instance.pk)
+
+
+class SnapshotVersion(models.Model):
+    """
+    Version counter of a snapshot namespace (see base.snapshots). Kept in the
+    database rather than the cache so every worker on every host sees the same
+    value, bumps are atomic, and a counter is never evicted or reset.
+    """
+    namespace = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.namespace} v{self.version}"
+
+
+# ✅ Signal to invalidate cached dashboard snapshots when their source data changes
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+@receiver(post_save, sender=Revenue)
+@receiver(post_delete, sender=Revenue)
+@receiver(post_save, sender=PerformanceMetrics)
+@receiver(post_delete, sender=PerformanceMetrics)
+@receiver(post_save, sender=PropertyListing)
+@receiver(post_delete, sender=PropertyListing)
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_dashboard_snapshots(sender, **kwargs):
+    bump_version_on_commit('dashboard')
+
+
+# ✅ Signal to expire cached revenue forecasts once the revenue history changes
+@receiver(post_save, sender=Revenue)
+@receiver(post_delete, sender=Revenue)
+def invalidate_revenue_forecasts(sender, **kwargs):
+    bump_version_on_commit('revenue')
+
+
+# ✅ Signal to keep the property search index in step with listing writes
+@receiver(post_save, sender=PropertyListing)
+@receiver(post_delete, sender=PropertyListing)
+def reindex_property_listing(sender, instance, **kwargs):
+    defer('search_index', instance.pk)
+
+
+class PropertyFacetCount(models.Model):
+    """
+    Number of listings per facet value (location, type, bedrooms, bathrooms,
+    price band, status), kept current by the PropertyListing signals below so
+    the unfiltered property browser never has to GROUP BY the listings table.
+    """
+    # URL parameter -> PropertyListing field, for the facets that are plain columns
+    FIELD_FACETS = {
+        'location': 'location',
+        'type': 'propertyType',
+        'bedrooms': 'bedroomCount',
+        'bathrooms': 'bathroomCount',
+        'status': 'status',
+    }
+    # (value, label, lower bound inclusive, upper bound exclusive) in rupees
+    PRICE_BANDS = [
+        ('under-50l', 'Under ₹50L', 0, 5_000_000),
+        ('50l-1cr', '₹50L – ₹1Cr', 5_000_000, 10_000_000),
+        ('1cr-2cr', '₹1Cr – ₹2Cr', 10_000_000, 20_000_000),
+        ('2cr-5cr', '₹2Cr – ₹5Cr', 20_000_000, 50_000_000),
+        ('5cr-plus', '₹5Cr and above', 50_000_000, None),
+    ]
+    UNPRICED = 'unpriced'
+    SOURCE_FIELDS = [*FIELD_FACETS.values(), 'price']
+
+    facet = models.CharField(max_length=20)
+    value = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='unique_property_facet_value'),
+        ]
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
+
+    @classmethod
+    def price_band(cls, price):
+        if not price:
+            return cls.UNPRICED
+        for value, _, low, high in cls.PRICE_BANDS:
+            if price >= low and (high is None or price < high):
+                return value
+        return cls.UNPRICED
+
+    @classmethod
+    def facet_values(cls, listing):
+        """{facet: value} for a listing given as a model instance or a values() dict."""
+        get = listing.get if isinstance(listing, dict) else lambda field: getattr(listing, field)
+        values = {facet: str(get(field)) for facet, field in cls.FIELD_FACETS.items()}
+        values['price'] = cls.price_band(get('price'))
+        return values
+
+    @classmethod
+    def count_listings(cls, listings, sign=1):
+        """Queue +1 (or -1 with `sign=-1`) on every facet value of each of `listings`."""
+        for listing in listings:
+            for facet, value in cls.facet_values(listing).items():
+                defer('property_facets', (facet, value), count=sign)
+
+    @classmethod
+    def rebuild(cls):
+        """Recount every facet from PropertyListing; returns the number of facet values."""
+        counts = Counter()
+        for listing in PropertyListing.objects.values(*cls.SOURCE_FIELDS).iterator(chunk_size=2000):
+            counts.update(cls.facet_values(listing).items())
+        cls.objects.all().delete()
+        cls.objects.bulk_create(
+            [cls(facet=facet, value=value, count=count) for (facet, value), count in counts.items()],
+            batch_size=1000,
+        )
+        return len(counts)
+
+
+# ✅ Deferred handler writing a transaction's facet count changes as one UPSERT
+@handler('property_facets')
+def apply_property_facets(batch):
+    upsert_increment(PropertyFacetCount, ['facet', 'value'], [
+        {'facet': facet, 'value': value, 'count': deltas['count']}
+        for (facet, value), deltas in batch.items() if deltas['count']
+    ])
+
+
+# ✅ Signals to keep the facet counts in step with listing saves, status changes and deletes
+@receiver(pre_save, sender=PropertyListing)
+def remember_previous_facets(sender, instance, **kwargs):
+    instance._facets_previous = None
+    if not instance._state.adding:
+        instance._facets_previous = PropertyListing.objects.filter(pk=instance.pk).values(
+            *PropertyFacetCount.SOURCE_FIELDS
+        ).first()
+
+
+@receiver(post_save, sender=PropertyListing)
+def update_facet_counts(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_facets_previous', None)
+    new_values = PropertyFacetCount.facet_values(instance)
+    old_values = PropertyFacetCount.facet_values(previous) if previous else {}
+    for facet, value in new_values.items():
+        if old_values.get(facet) != value:
+            if facet in old_values:
+                defer('property_facets', (facet, old_values[facet]), count=-1)
+            defer('property_facets', (facet, value), count=1)
+
+
+@receiver(post_delete, sender=PropertyListing)
+def remove_from_facet_counts(sender, instance, **kwargs):
+    PropertyFacetCount.count_listings([instance], sign=-1)
+
+
+class PriceModel(models.Model):
+    """
+    A fitted property price model (see base.pricing). Each training run adds a
+    row; the newest one is served. `data_version` is the 'listings' snapshot
+    version at training time, which advances by one per listing write.
+    """
+    trained_at = models.DateTimeField(auto_now_add=True)
+    data_version = models.BigIntegerField()
+    sample_count = models.PositiveIntegerField()
+    location_count = models.PositiveIntegerField(default=0)
+    metrics = models.JSONField(default=dict, blank=True)
+    artifact = models.BinaryField()
+
+    def __str__(self):
+        return f"Price model #{self.pk} ({self.sample_count} listings, {self.trained_at:%Y-%m-%d %H:%M})"
+
+
+class ComparablesIndex(models.Model):
+    """
+    A built comparable-properties index (see base.comps). Each rebuild adds a
+    row; the newest one is served. `data_version` is the 'listings' snapshot
+    version at build time, which advances by one per listing write.
+    """
+    built_at = models.DateTimeField(auto_now_add=True)
+    data_version = models.BigIntegerField()
+    listing_count = models.PositiveIntegerField()
+    location_count = models.PositiveIntegerField(default=0)
+    artifact = models.BinaryField()
+
+    def __str__(self):
+        return f"Comparables index #{self.pk} ({self.listing_count} listings, {self.built_at:%Y-%m-%d %H:%M})"
+
+
+# ✅ Signal to count listing writes, the data-version stamp the price model and comparables index are built against
+@receiver(post_save, sender=PropertyListing)
+@receiver(post_delete, sender=PropertyListing)
+def count_listing_change(sender, **kwargs):
+    bump_version_on_commit('listings')
+
+
+class ChartSpec(models.Model):
+    """
+    The input of a server-rendered chart (see base.charts), keyed by the hash
+    in its URL. Kept in the database so a chart URL handed out once can be
+    rendered again however long the page that links it stays cached; specs
+    unused for longer than that are pruned by the prune_chart_specs command.
+    """
+    digest = models.CharField(max_length=16, unique=True)
+    spec = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=now, db_index=True)  # Refreshed as pages keep linking it
+
+    def __str__(self):
+        return f"Chart {self.digest} ({self.spec.get('title', '')})"
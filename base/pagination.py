@@ -0,0 +1,185 @@
+"""
+Keyset (cursor) pagination.
+
+`paginate()` walks a queryset in a fixed order that ends in a unique column
+(normally the primary key) and resumes after the last row seen, so every page
+costs one indexed range scan no matter how deep it is. Page positions travel
+as opaque, signed tokens. Totals are optional and only estimated, because an
+exact COUNT(*) on every page view is what this replaces.
+"""
+import hashlib
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q
+
+TOKEN_SALT = 'base.pagination'
+
+
+class TokenSerializer:
+    def dumps(self, obj):
+        return json.dumps(obj, cls=DjangoJSONEncoder, separators=(',', ':')).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+
+def encode_token(payload):
+    return signing.dumps(payload, salt=TOKEN_SALT, serializer=TokenSerializer, compress=True)
+
+
+def decode_token(token):
+    """Payload of `token`, or None for a missing, tampered or malformed token."""
+    if not token:
+        return None
+    try:
+        return signing.loads(token, salt=TOKEN_SALT, serializer=TokenSerializer)
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+class CursorPage:
+    """One page of results plus the tokens for its neighbours."""
+
+    def __init__(self, object_list, next_token=None, previous_token=None, estimated_total=None):
+        self.object_list = object_list
+        self.next_token = next_token
+        self.previous_token = previous_token
+        self.estimated_total = estimated_total
+
+    @property
+    def has_next(self):
+        return self.next_token is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_token is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def _sort_keys(model, ordering):
+    keys = []
+    for name in ordering:
+        field = name.lstrip('-')
+        keys.append((model._meta.pk.name if field == 'pk' else field, name.startswith('-')))
+    return keys
+
+
+def _order_by(keys, backwards):
+    """Order expressions for `keys`, with NULLs after every value when walking forwards."""
+    nulls = {'nulls_first': True} if backwards else {'nulls_last': True}
+    return [
+        F(name).desc(**nulls) if descending != backwards else F(name).asc(**nulls)
+        for name, descending in keys
+    ]
+
+
+def _beyond(name, descending, value, backwards):
+    """Rows strictly past `value` on one column, in the walking direction."""
+    if value is None:
+        # NULLs sort last, so only non-NULL rows precede them and nothing follows
+        return Q(**{f'{name}__isnull': False}) if backwards else Q(pk__in=[])
+    lookup = 'lt' if descending != backwards else 'gt'
+    condition = Q(**{f'{name}__{lookup}': value})
+    return condition if backwards else condition | Q(**{f'{name}__isnull': True})
+
+
+def _keyset_filter(keys, values, backwards):
+    """(a, b, c) > (x, y, z) in the walking direction, spelled out column by column."""
+    conditions = []
+    equal = Q()
+    for (name, descending), value in zip(keys, values):
+        conditions.append(equal & _beyond(name, descending, value, backwards))
+        equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+    return reduce(or_, conditions)
+
+
+def _row_values(obj, keys):
+    return [getattr(obj, obj._meta.get_field(name).attname) for name, _ in keys]
+
+
+def estimated_count(queryset):
+    """
+    Approximate row count for `queryset`: the planner's estimate on PostgreSQL,
+    elsewhere an exact count cached for PAGINATION_COUNT_CACHE_TIMEOUT seconds.
+    """
+    connection = connections[queryset.db]
+    sql, params = queryset.order_by().query.sql_with_params()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return int(plan[0]['Plan']['Plan Rows'])
+    digest = hashlib.sha1(f'{sql}|{params!r}'.encode()).hexdigest()
+    key = f'pagination:count:{digest}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout=getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 5 * 60))
+    return count
+
+
+def paginate(queryset, token=None, ordering=('pk',), per_page=10, with_total=False):
+    """
+    Return the CursorPage of `queryset` that `token` points at (the first page
+    without one). `ordering` must end in a unique field, and should match an
+    index for deep pages to stay cheap.
+
+    A sliceable sequence with its own order (such as search results ranked by
+    relevance) is paged by offset instead, behind the same tokens.
+    """
+    payload = decode_token(token) or {}
+    if not hasattr(queryset, 'query'):
+        return _paginate_sequence(queryset, payload, per_page, with_total)
+
+    keys = _sort_keys(queryset.model, ordering)
+    backwards = payload.get('dir') == 'prev'
+    rows = queryset
+    if 'after' in payload and len(payload['after']) == len(keys):
+        rows = rows.filter(_keyset_filter(keys, payload['after'], backwards))
+    else:
+        backwards = False
+    rows = list(rows.order_by(*_order_by(keys, backwards))[:per_page + 1])
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    next_token = previous_token = None
+    if rows:
+        if more or backwards:
+            next_token = encode_token({'after': _row_values(rows[-1], keys), 'dir': 'next'})
+        if (more and backwards) or (not backwards and 'after' in payload):
+            previous_token = encode_token({'after': _row_values(rows[0], keys), 'dir': 'prev'})
+
+    total = estimated_count(queryset) if with_total else None
+    return CursorPage(rows, next_token, previous_token, total)
+
+
+def _paginate_sequence(sequence, payload, per_page, with_total):
+    offset = max(int(payload.get('offset', 0)), 0)
+    rows = list(sequence[offset:offset + per_page + 1])
+    next_token = encode_token({'offset': offset + per_page}) if len(rows) > per_page else None
+    previous_token = encode_token({'offset': max(offset - per_page, 0)}) if offset else None
+    total = len(sequence) if with_total else None
+    return CursorPage(rows[:per_page], next_token, previous_token, total)
@@ -0,0 +1,199 @@
+"""
+Property price model registry.
+
+`train()` fits a LinearRegression on floors, covered area, bedrooms and
+bathrooms for all listings, plus one per location with enough listings, and
+stores the fitted estimators as a new PriceModel row stamped with the
+'listings' data version. The newest row is the active model: each worker
+looks up its id (one indexed query), unpickles that model once and keeps it
+in memory, so a prediction is a dot product rather than a table scan and a
+fit, and every host switches to a new model as soon as it is committed. Models are only ever trained by the train_price_model command (run on a
+schedule, or by hand): until it has run, predictions return None. `is_stale()`
+tells the command when enough listings have changed to be worth retraining.
+"""
+import pickle
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from sklearn.linear_model import LinearRegression
+
+from .analytics import columns
+from .models import PriceModel, PropertyListing
+from .snapshots import get_version
+
+FEATURES = ['floors', 'covered_area_sqft', 'bedroomCount', 'bathroomCount']
+# Column names accepted by the batch prediction API, in FEATURES order
+INPUT_COLUMNS = ['floors', 'area', 'bedrooms', 'bathrooms']
+KEEP_VERSIONS = 5  # Older PriceModel rows are pruned after each training run
+
+_lock = threading.Lock()
+_loaded = None  # (PriceModel id, artifact) held by this worker
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def training_data():
+    """(locations, X, y) for every listing with a price and a parsed covered area."""
+    queryset = PropertyListing.objects.filter(price__gt=0, covered_area_sqft__isnull=False)
+    locations, *data = columns(queryset, 'location', *FEATURES, 'price', dtype=object)
+    data = np.column_stack(data).astype(float) if len(locations) else np.empty((0, len(FEATURES) + 1))
+    return locations, data[:, :-1], data[:, -1]
+
+
+def _fit(X, y):
+    model = LinearRegression()
+    model.fit(X, y)
+    return {'coef': model.coef_, 'intercept': float(model.intercept_), 'r2': float(model.score(X, y))}
+
+
+def train(min_location_samples=None):
+    """Fit and store a new PriceModel from the current listings; returns it, or None without data."""
+    min_location_samples = min_location_samples or _setting('PRICE_MODEL_MIN_LOCATION_SAMPLES', 30)
+    # Read the stamp first, so changes made while training count towards the next run
+    data_version = get_version('listings')
+    locations, X, y = training_data()
+    if len(y) < 2:
+        return None
+
+    artifact = {
+        'features': FEATURES,
+        # Missing inputs at prediction time fall back to the training medians
+        'medians': dict(zip(FEATURES, np.median(X, axis=0).tolist())),
+        'global': _fit(X, y),
+        'locations': {},
+    }
+    names, counts = np.unique(locations, return_counts=True)
+    for name, count in zip(names, counts):
+        if count >= min_location_samples:
+            mask = locations == name
+            artifact['locations'][name] = _fit(X[mask], y[mask])
+
+    with transaction.atomic():
+        price_model = PriceModel.objects.create(
+            data_version=data_version,
+            sample_count=len(y),
+            location_count=len(artifact['locations']),
+            metrics={'r2': artifact['global']['r2']},
+            artifact=pickle.dumps(artifact, protocol=pickle.HIGHEST_PROTOCOL),
+        )
+        stale = PriceModel.objects.order_by('-pk').values_list('pk', flat=True)[KEEP_VERSIONS:]
+        PriceModel.objects.filter(pk__in=list(stale)).delete()
+    return price_model
+
+
+def changes_since(price_model):
+    """
+    Listing writes since `price_model` was trained, or None when its stamp is
+    ahead of the counter (a model stamped before the counter was kept in the
+    database) and the number is unknown.
+    """
+    changes = get_version('listings') - price_model.data_version
+    return changes if changes >= 0 else None
+
+
+def is_stale(threshold=None):
+    """True when there is no model yet or more than `threshold` listing writes happened since."""
+    threshold = _setting('PRICE_MODEL_RETRAIN_THRESHOLD', 500) if threshold is None else threshold
+    price_model = PriceModel.objects.order_by('-pk').only('pk', 'data_version').first()
+    if price_model is None:
+        return True
+    changes = changes_since(price_model)
+    return changes is None or changes > threshold
+
+
+def current():
+    """This worker's copy of the newest model's artifact, or None until one has been trained."""
+    global _loaded
+    active_id = PriceModel.objects.order_by('-pk').values_list('pk', flat=True).first()
+    if active_id is None:
+        return None
+    if _loaded is not None and _loaded[0] == active_id:
+        return _loaded[1]
+    with _lock:
+        if _loaded is None or _loaded[0] != active_id:
+            artifact = PriceModel.objects.filter(pk=active_id).values_list('artifact', flat=True).first()
+            if artifact is None:
+                return None  # Pruned by a training run in the meantime; the next call finds its successor
+            _loaded = (active_id, pickle.loads(artifact))
+        return _loaded[1]
+
+
+def predict_many(locations, X):
+    """
+    Predicted prices for a batch: `locations` is a sequence of location names
+    (None for any) and `X` an (n, len(FEATURES)) array in FEATURES order, with
+    NaN for missing values. Every row is priced in one vectorized step, each
+    with its location's own model when there is one. Returns None when no
+    model has been trained yet.
+    """
+    artifact = current()
+    if artifact is None:
+        return None
+    X = np.array(X, dtype=float).reshape(-1, len(artifact['features']))
+    medians = np.array([artifact['medians'][name] for name in artifact['features']])
+    X = np.where(np.isnan(X), medians, X)
+    fitted = [artifact['locations'].get(location, artifact['global']) for location in locations]
+    coef = np.array([model['coef'] for model in fitted]).reshape(X.shape)
+    intercept = np.array([model['intercept'] for model in fitted])
+    return (X * coef).sum(axis=1) + intercept
+
+
+def parse_rows(rows):
+    """
+    (locations, X, errors) for predict_many from `rows`, dicts keyed by
+    'location' and INPUT_COLUMNS. Blank or missing values become NaN. Rows
+    that cannot be read are left all NaN and described in `errors`, a dict
+    of row index -> message, so the rest of the batch can still be priced.
+    """
+    locations, X, errors = [], np.full((len(rows), len(INPUT_COLUMNS)), np.nan), {}
+    for index, row in enumerate(rows):
+        locations.append(None)
+        if not isinstance(row, dict):
+            errors[index] = f'expected an object with {", ".join(["location"] + INPUT_COLUMNS)}'
+            continue
+        location = row.get('location') or None
+        if location is not None and not isinstance(location, str):
+            errors[index] = f'location must be text, got {location!r}'
+            continue
+        values = np.full(len(INPUT_COLUMNS), np.nan)
+        for column, name in enumerate(INPUT_COLUMNS):
+            value = row.get(name)
+            if value is None or value == '':
+                continue
+            try:
+                if isinstance(value, bool):
+                    raise TypeError
+                values[column] = float(value)
+            except (TypeError, ValueError):
+                errors[index] = f'{name} must be a number, got {value!r}'
+                break
+            if not np.isfinite(values[column]):
+                errors[index] = f'{name} must be a finite number, got {value!r}'
+                break
+        else:
+            locations[index] = location
+            X[index] = values
+    return locations, X, errors
+
+
+def batch_features(rows):
+    """(locations, X) for predict_many from `rows`, raising ValueError naming the first unreadable row."""
+    locations, X, errors = parse_rows(rows)
+    if errors:
+        index = min(errors)
+        raise ValueError(f'Row {index}: {errors[index]}')
+    return locations, X
+
+
+def predict(location=None, **features):
+    """
+    Predicted price for one listing. `features` are FEATURES values; missing
+    ones use the training medians. Returns None when no model has been trained yet.
+    """
+    x = [np.nan if features.get(name) is None else float(features[name]) for name in FEATURES]
+    prices = predict_many([location], [x])
+    return None if prices is None else float(prices[0])
@@ -0,0 +1,186 @@
+"""
+Full-text search over PropertyListing.
+
+`get_backend()` returns the backend named by settings.PROPERTY_SEARCH_BACKEND.
+SQLiteFTS5Backend keeps an FTS5 table of each listing's location, type and
+address, ranked with bm25; DatabaseBackend is the portable `icontains`
+fallback. Listing writes reach the index through the 'search_index' deferred
+handler, so a transaction that touches many listings reindexes them in one go.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .deferred import handler
+from .models import PropertyListing
+
+SEARCH_FIELDS = ('location', 'propertyType', 'address')
+
+
+def tokenize(query):
+    return re.findall(r'\w+', query or '')
+
+
+class DatabaseBackend:
+    """Plain ORM search; needs no index, but scans the whole table."""
+
+    def search(self, query, queryset=None):
+        queryset = PropertyListing.objects.all() if queryset is None else queryset
+        for term in tokenize(query):
+            queryset = queryset.filter(
+                Q(location__icontains=term) | Q(propertyType__icontains=term) | Q(address__icontains=term)
+            )
+        return queryset
+
+    def filter(self, query, queryset=None):
+        return self.search(query, queryset)
+
+    def update(self, listing_ids):
+        pass
+
+    def rebuild(self):
+        return PropertyListing.objects.count()
+
+
+class SQLiteFTS5Backend:
+    """SQLite FTS5 index with prefix matching and bm25 relevance ranking."""
+
+    table = 'base_propertylisting_fts'
+    # bm25 column weights: listing_id (unindexed), location, propertyType, address
+    weights = (0.0, 5.0, 3.0, 1.0)
+
+    def match_expression(self, query):
+        # Quote every term so user input can never be read as FTS5 syntax
+        return ' '.join(f'"{term}"*' for term in tokenize(query))
+
+    def search(self, query, queryset=None):
+        expression = self.match_expression(query)
+        if not expression:
+            return PropertyListing.objects.all() if queryset is None else queryset
+        return SearchResults(self, expression, queryset)
+
+    def filter(self, query, queryset=None):
+        """`queryset` narrowed to the listings matching `query`, unranked."""
+        queryset = PropertyListing.objects.all() if queryset is None else queryset
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT listing_id FROM {self.table} WHERE {self.table} MATCH %s', [expression],
+        ))
+
+    def ranked_ids(self, expression, within=None, limit=-1, offset=0):
+        restrict, params = self._restrict(within)
+        weights = ', '.join(str(weight) for weight in self.weights)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT listing_id FROM {self.table} WHERE {self.table} MATCH %s{restrict} '
+                f'ORDER BY bm25({self.table}, {weights}) LIMIT %s OFFSET %s',
+                [expression, *params, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, expression, within=None):
+        restrict, params = self._restrict(within)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {self.table} WHERE {self.table} MATCH %s{restrict}',
+                [expression, *params],
+            )
+            return cursor.fetchone()[0]
+
+    def _restrict(self, queryset):
+        """SQL limiting matches to the rows of `queryset`, if it is given."""
+        if queryset is None:
+            return '', []
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        return f' AND listing_id IN ({sql})', list(params)
+
+    def create_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5('
+                f'listing_id UNINDEXED, {", ".join(SEARCH_FIELDS)}, tokenize="unicode61")'
+            )
+
+    def _rowid(self, pk):
+        # FTS5 rowids are 64-bit signed; the top 63 bits of the UUID keep lookups by listing indexed
+        return PropertyListing._meta.pk.to_python(pk).int >> 65
+
+    def update(self, listing_ids):
+        """Reindex `listing_ids`, dropping the ones that no longer exist."""
+        listing_ids = list(listing_ids)
+        if not listing_ids:
+            return
+        rows = PropertyListing.objects.filter(pk__in=listing_ids).values_list('pk', *SEARCH_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid IN ({", ".join(["%s"] * len(listing_ids))})',
+                [self._rowid(pk) for pk in listing_ids],
+            )
+            self._insert(cursor, rows)
+
+    def rebuild(self):
+        self.create_table()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            self._insert(cursor, PropertyListing.objects.values_list('pk', *SEARCH_FIELDS).iterator())
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('optimize')")
+            cursor.execute(f'SELECT COUNT(*) FROM {self.table}')
+            return cursor.fetchone()[0]
+
+    def _insert(self, cursor, rows):
+        pk_field = PropertyListing._meta.pk
+        placeholders = ', '.join(['%s'] * (len(SEARCH_FIELDS) + 2))
+        cursor.executemany(
+            f'INSERT INTO {self.table} (rowid, listing_id, {", ".join(SEARCH_FIELDS)}) VALUES ({placeholders})',
+            ([self._rowid(pk), pk_field.get_db_prep_value(pk, connection), *values] for pk, *values in rows),
+        )
+
+
+class SearchResults:
+    """
+    Lazily evaluated, rank-ordered FTS5 matches, optionally limited to the rows
+    of `queryset`. Supports count(), len() and slicing like a queryset, so it
+    can be handed straight to a paginator.
+    """
+
+    def __init__(self, backend, expression, queryset=None):
+        self.backend = backend
+        self.expression = expression
+        self.queryset = queryset
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.expression, within=self.queryset)
+        return self._count
+
+    __len__ = count
+
+    def __getitem__(self, index):
+        if isinstance(index, int):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        limit = -1 if index.stop is None else max(index.stop - start, 0)
+        to_python = PropertyListing._meta.pk.to_python
+        ids = [to_python(pk) for pk in self.backend.ranked_ids(
+            self.expression, within=self.queryset, limit=limit, offset=start)]
+        queryset = PropertyListing.objects.all() if self.queryset is None else self.queryset
+        listings = queryset.in_bulk(ids)
+        return [listings[pk] for pk in ids if pk in listings]
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(getattr(settings, 'PROPERTY_SEARCH_BACKEND', 'base.search.DatabaseBackend'))()
+
+
+@handler('search_index')
+def apply_search_index(batch):
+    get_backend().update(batch)
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from .deferred import defer, handler
+from .upsert import upsert_increment
+
+
+def get_version(namespace='dashboard'):
+    """Current snapshot version for `namespace`, shared by every worker through the database."""
+    from .models import SnapshotVersion
+
+    version = SnapshotVersion.objects.filter(namespace=namespace).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump_version(namespace='dashboard', changes=1):
+    """
+    Invalidate every snapshot in `namespace` by moving to a new version.
+    The version advances by `changes`, so it doubles as a count of writes.
+    """
+    _bump_versions({namespace: {'changes': changes}})
+
+
+def bump_version_on_commit(namespace='dashboard', changes=1):
+    """
+    Bump once the surrounding transaction commits, so readers never cache
+    uncommitted state. Repeated calls in one transaction collapse into one
+    bump by their summed `changes`.
+    """
+    defer('snapshot_versions', namespace, changes=changes)
+
+
+@handler('snapshot_versions')
+def _bump_versions(batch):
+    from .models import SnapshotVersion
+
+    # One atomic INSERT ... ON CONFLICT DO UPDATE SET version = version + changes
+    upsert_increment(SnapshotVersion, ['namespace'], [
+        {'namespace': namespace, 'version': deltas['changes']} for namespace, deltas in batch.items()
+    ])
+
+
+def get_snapshot(name, builder, namespace='dashboard', timeout=DEFAULT_TIMEOUT):
+    """
+    Return the cached result of `builder()` for the current version of `namespace`,
+    building and storing it on a miss. `timeout` defaults to SNAPSHOT_CACHE_TIMEOUT;
+    None keeps the snapshot until the namespace version moves on.
+    """
+    key = f'snapshots:{namespace}:{name}:{get_version(namespace)}'
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = builder()
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = getattr(settings, 'SNAPSHOT_CACHE_TIMEOUT', 60 * 60)
+        cache.set(key, snapshot, timeout=timeout)
+    return snapshot
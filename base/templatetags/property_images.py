@@ -0,0 +1,42 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+def _srcset(names):
+    return ', '.join(
+        f'{default_storage.url(name)} {width}w'
+        for width, name in sorted(names.items(), key=lambda item: int(item[0]))
+    )
+
+
+@register.simple_tag
+def property_picture(listing, sizes='100vw', css_class='', alt=''):
+    """
+    <picture> for a listing's photo that lets the browser pick the smallest
+    WebP/JPEG variant for `sizes`; falls back to the original upload when the
+    variants have not been generated yet.
+    """
+    if not listing.image:
+        return ''
+    variants = listing.image_variants or {}
+    if not variants.get('jpg'):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy" decoding="async">',
+            listing.image.url, alt, css_class,
+        )
+    jpegs = variants['jpg']
+    # Mid-sized JPEG for browsers without srcset support
+    fallback = jpegs[min(jpegs, key=lambda width: abs(int(width) - 640))]
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" '
+        'loading="lazy" decoding="async">'
+        '</picture>',
+        _srcset(variants.get('webp', {})), sizes,
+        default_storage.url(fallback), _srcset(jpegs), sizes,
+        variants['width'], variants['height'], alt, css_class,
+    )
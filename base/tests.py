@@ -1,3 +1,1176 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+import zipfile
+from contextlib import suppress
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from PIL import Image
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import localdate, now
+
+from . import activity, charts, comps, facets, forecasting, images, leaderboard, pricing, search
+from .areas import parse_area_sqft
+from .dashboard import sales_totals
+from .models import (
+    ChartSpec,
+    ComparablesIndex,
+    DailySalesRollup,
+    Employee,
+    PerformanceEvent,
+    PerformanceMetrics,
+    PredefinedTask,
+    PriceModel,
+    PropertyFacetCount,
+    ProductivityTracker,
+    PropertyListing,
+    Revenue,
+    Sale,
+    Task,
+)
+from .pagination import decode_token, encode_token, paginate
+from .snapshots import bump_version, bump_version_on_commit, get_snapshot, get_version
+
+# Each test gets a private in-memory cache instead of the shared file cache
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_agent(username, role='Agent'):
+    user = User.objects.create_user(username, first_name=username.title())
+    return Employee.objects.create(user=user, role=role, join_date=date(2024, 1, 1))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class DeferredSideEffectTests(TransactionTestCase):
+    """Side effects queued by base.deferred must follow the fate of their transaction."""
+
+    def setUp(self):
+        self.agent = make_agent('agent')
+        self.template = PredefinedTask.objects.create(title='Call', description='Call the client', priority='Low')
+
+    def complete_task(self):
+        return Task.objects.create(
+            predefined_task=self.template, assigned_to=self.agent, due_date=date(2024, 2, 1), status='Completed',
+        )
+
+    def counters(self):
+        metrics = PerformanceMetrics.objects.get(employee=self.agent)
+        tracked = ProductivityTracker.objects.filter(employee=self.agent).values_list('tasks_completed', flat=True)
+        return metrics.tasks_completed, metrics.aggregate_points, list(tracked)
+
+    def test_rollback_does_not_swallow_later_effects(self):
+        with suppress(RuntimeError), transaction.atomic():
+            self.complete_task()
+            raise RuntimeError
+        version = get_version('dashboard')
+
+        self.complete_task()  # Autocommit, straight after the rolled-back transaction
+
+        self.assertEqual(PerformanceEvent.objects.count(), 1)
+        self.assertEqual(self.counters(), (1, PerformanceMetrics.TASK_POINTS, [1]))
+        self.assertGreater(get_version('dashboard'), version)
+
+    def test_savepoint_rollback_discards_only_its_own_deltas(self):
+        with transaction.atomic():
+            self.complete_task()
+            with suppress(RuntimeError), transaction.atomic():
+                self.complete_task()
+                raise RuntimeError
+            self.assertEqual(self.counters(), (0, 0, []))  # Nothing applied before commit
+
+        self.assertEqual(PerformanceEvent.objects.count(), 1)
+        self.assertEqual(self.counters(), (1, PerformanceMetrics.TASK_POINTS, [1]))
+
+    def test_effects_in_one_transaction_are_coalesced(self):
+        with transaction.atomic():
+            self.complete_task()
+            self.complete_task()
+
+        self.assertEqual(self.counters(), (2, 2 * PerformanceMetrics.TASK_POINTS, [2]))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SnapshotVersionTests(TransactionTestCase):
+
+    def test_versions_survive_cache_loss(self):
+        bump_version('dashboard', 3)
+        cache.clear()
+        self.assertEqual(get_version('dashboard'), 3)
+
+    def test_bumps_in_one_transaction_add_up_on_commit(self):
+        with transaction.atomic():
+            bump_version_on_commit('listings', changes=2)
+            bump_version_on_commit('listings', changes=5)
+            self.assertEqual(get_version('listings'), 0)
+        self.assertEqual(get_version('listings'), 7)
+
+    def test_snapshot_is_rebuilt_after_a_bump(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            return len(builds)
+
+        self.assertEqual(get_snapshot('probe', build), 1)
+        self.assertEqual(get_snapshot('probe', build), 1)
+        bump_version()
+        self.assertEqual(get_snapshot('probe', build), 2)
+
+
+def add_listings(count):
+    for n in range(count):
+        PropertyListing.objects.create(
+            propertyType='House', location='Town', address=f'{n} Main St', floors=1 + n % 3,
+            coveredArea=f'{1000 + 100 * n} sqft', electricityStatus='Yes', bathroomCount=1 + n % 2,
+            bedroomCount=2 + n % 3, price=100000 + 5000 * n,
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PriceModelTests(TransactionTestCase):
+
+    def setUp(self):
+        pricing._loaded = None  # Forget any model loaded by an earlier test
+
+    def test_requests_never_train(self):
+        add_listings(5)
+        self.assertIsNone(pricing.predict('Town', floors=2))
+        self.assertFalse(PriceModel.objects.exists())
+
+        pricing.train()
+        self.assertIsNotNone(pricing.predict('Town', floors=2))
+
+    def test_every_worker_switches_to_the_newest_model(self):
+        add_listings(5)
+        first = pricing.train()
+        pricing.predict('Town', floors=2)
+        self.assertEqual(pricing._loaded[0], first.pk)
+
+        newest = pricing.train()  # As if trained on another host: no cache is shared
+        cache.clear()
+        pricing.predict('Town', floors=2)
+        self.assertEqual(pricing._loaded[0], newest.pk)
+
+    def test_staleness_counts_listing_writes(self):
+        add_listings(5)
+        pricing.train()
+        self.assertFalse(pricing.is_stale(threshold=2))
+        add_listings(3)
+        self.assertTrue(pricing.is_stale(threshold=2))
+
+    def test_model_stamped_ahead_of_the_counter_is_stale(self):
+        add_listings(5)
+        price_model = pricing.train()
+        PriceModel.objects.filter(pk=price_model.pk).update(data_version=get_version('listings') + 10 ** 18)
+        self.assertTrue(pricing.is_stale(threshold=500))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ComparablesTests(TransactionTestCase):
+
+    def setUp(self):
+        comps._loaded = None
+
+    def test_requests_never_build_the_index(self):
+        add_listings(5)
+        self.assertEqual(comps.comparables('Town', {'floors': 2}), [])
+        self.assertFalse(ComparablesIndex.objects.exists())
+
+        comps.build()
+        self.assertEqual(len(comps.comparables('Town', {'floors': 2}, count=3)), 3)
+
+    def test_workers_pick_up_a_new_build(self):
+        add_listings(3)
+        comps.build()
+        self.assertEqual(len(comps.comparables('Town', {}, count=10)), 3)
+        add_listings(2)
+        self.assertEqual(len(comps.comparables('Town', {}, count=10)), 3)
+        comps.build()  # As if built on another host: no cache is shared
+        cache.clear()
+        self.assertEqual(len(comps.comparables('Town', {}, count=10)), 5)
+        self.assertEqual(ComparablesIndex.objects.count(), comps.KEEP_VERSIONS)
+
+    def test_detail_page_loads_comparables_from_the_api(self):
+        add_listings(4)
+        comps.build()
+        listing = PropertyListing.objects.first()
+
+        response = self.client.get(reverse('property_detail', args=[listing.pk]))
+        self.assertNotIn('comparables', response.context)
+        self.assertContains(response, reverse('property_comparables', args=[listing.pk]))
+
+        found = self.client.get(reverse('property_comparables', args=[listing.pk])).json()['comparables']
+        self.assertEqual(len(found), 3)
+        self.assertNotIn(str(listing.pk), [comp['id'] for comp in found])
+
+    def test_staleness_counts_listing_writes(self):
+        self.assertTrue(comps.is_stale())
+        add_listings(2)
+        comps.build()
+        self.assertFalse(comps.is_stale(threshold=2))
+        add_listings(3)
+        self.assertTrue(comps.is_stale(threshold=2))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class OverdueSweepTests(TransactionTestCase):
+
+    def setUp(self):
+        self.agent = make_agent('agent')
+        self.template = PredefinedTask.objects.create(title='Call', description='Call the client', priority='Low')
+
+    def add_task(self, due_date, status='Pending', document=''):
+        return Task.objects.create(
+            predefined_task=self.template, assigned_to=self.agent, due_date=due_date, status=status, document=document,
+        )
+
+    def test_sweep_marks_past_due_tasks_and_reopens_moved_ones(self):
+        late = self.add_task(date(2024, 1, 1))
+        moved = self.add_task(date(2024, 3, 1), status='Overdue')
+        submitted = self.add_task(date(2024, 1, 1), document='task_documents/report.pdf')
+
+        self.assertEqual(Task.sweep_overdue(today=date(2024, 2, 1)), (1, 1))
+        statuses = dict(Task.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[late.id], 'Overdue')
+        self.assertEqual(statuses[moved.id], 'Pending')
+        self.assertEqual(statuses[submitted.id], 'Pending')  # Awaiting review, not overdue
+
+    def test_sweep_with_nothing_to_do_keeps_dashboards_cached(self):
+        self.add_task(date(2999, 1, 1))
+        version = get_version('dashboard')
+        self.assertEqual(Task.sweep_overdue(), (0, 0))
+        self.assertEqual(get_version('dashboard'), version)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RecomputeMetricsTests(TransactionTestCase):
+
+    def setUp(self):
+        self.agent = make_agent('agent')
+        template = PredefinedTask.objects.create(title='Call', description='Call the client', priority='Low')
+        self.tasks = [
+            Task.objects.create(predefined_task=template, assigned_to=self.agent, due_date=date(2024, 2, 1),
+                                status='Completed')
+            for _ in range(3)
+        ]
+
+    def recompute(self, *args):
+        call_command('recompute_performance_metrics', *args, '--chunk-size=2', verbosity=0, stdout=io.StringIO())
+
+    def test_counters_are_rebuilt_from_the_ledger(self):
+        PerformanceMetrics.objects.filter(employee=self.agent).update(tasks_completed=40, aggregate_points=7)
+        self.recompute()
+        metrics = PerformanceMetrics.objects.get(employee=self.agent)
+        self.assertEqual((metrics.tasks_completed, metrics.aggregate_points), (3, 3 * PerformanceMetrics.TASK_POINTS))
+
+    def test_opening_balances_survive_a_recompute(self):
+        PerformanceEvent.objects.create(
+            employee=self.agent, kind=PerformanceEvent.OPENING_BALANCE, tasks_adjustment=4, sales_adjustment=1,
+            points=4 * PerformanceMetrics.TASK_POINTS + PerformanceMetrics.SALE_POINTS,
+        )
+        self.recompute()
+        metrics = PerformanceMetrics.objects.get(employee=self.agent)
+        self.assertEqual(
+            (metrics.tasks_completed, metrics.sales_closed, metrics.aggregate_points),
+            (7, 1, 7 * PerformanceMetrics.TASK_POINTS + PerformanceMetrics.SALE_POINTS),
+        )
+
+    def test_completed_tasks_missing_from_the_ledger_are_recorded(self):
+        PerformanceEvent.objects.filter(task=self.tasks[0]).delete()
+        self.recompute('--dry-run')
+        self.assertEqual(PerformanceEvent.objects.count(), 2)
+
+        self.recompute()
+        self.assertEqual(PerformanceEvent.objects.count(), 3)
+        self.assertEqual(PerformanceMetrics.objects.get(employee=self.agent).tasks_completed, 3)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class DashboardQueryCountTests(TransactionTestCase):
+    """Dashboards cost the same number of queries however many agents there are."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', password='secret')
+        self.template = PredefinedTask.objects.create(title='Call', description='Call the client', priority='Low')
+        add_listings(1)
+        self.listing = PropertyListing.objects.get()
+        self.agents = 0
+
+    def add_agents(self, count):
+        for _ in range(count):
+            self.agents += 1
+            agent = make_agent(f'agent{self.agents}')
+            Task.objects.create(predefined_task=self.template, assigned_to=agent, due_date=date(2024, 2, 1),
+                                status='Completed')
+            Sale.objects.create(property_listing=self.listing, agent=agent, sale_date=date(2024, 2, 1),
+                                sale_price=100000)
+
+    def render_fresh(self, name):
+        """Render `name` with the dashboard snapshots rebuilt, returning the queries run."""
+        bump_version('dashboard')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_constant_queries(self, name):
+        self.add_agents(1)
+        self.client.get(reverse(name))  # Lets the first request settle the session
+        with_one = self.render_fresh(name)
+        self.add_agents(9)
+        bump_version('dashboard')
+        with self.assertNumQueries(with_one):
+            self.client.get(reverse(name))
+
+    def test_home(self):
+        self.assert_constant_queries('home')
+
+    def test_admin_panel(self):
+        self.client.force_login(self.admin)
+        self.assert_constant_queries('admin_panel')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ProductivityUpsertTests(TransactionTestCase):
+
+    def test_increments_for_one_day_share_a_row(self):
+        agent = make_agent('agent')
+        day = date(2024, 2, 1)
+        ProductivityTracker.increment({(agent.id, day): {'tasks_completed': 2, 'hours_worked': 3}})
+        ProductivityTracker.increment({(agent.id, day): {'tasks_completed': 1}})
+
+        row = ProductivityTracker.objects.get()
+        self.assertEqual((row.employee_id, row.date, row.tasks_completed, row.hours_worked), (agent.id, day, 3, 3))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class KeysetPaginationTests(TransactionTestCase):
+
+    def setUp(self):
+        add_listings(7)
+        self.ids = list(PropertyListing.objects.order_by('pk').values_list('pk', flat=True))
+
+    def page_ids(self, page):
+        return [listing.pk for listing in page]
+
+    def test_token_round_trip(self):
+        payload = {'after': [str(self.ids[0])], 'dir': 'next'}
+        self.assertEqual(decode_token(encode_token(payload)), payload)
+
+    def test_tampered_or_malformed_tokens_are_ignored(self):
+        token = encode_token({'after': [str(self.ids[0])], 'dir': 'next'})
+        self.assertIsNone(decode_token(token[:-1] + ('A' if token[-1] != 'A' else 'B')))
+        self.assertIsNone(decode_token('not-a-token'))
+        self.assertEqual(self.page_ids(paginate(PropertyListing.objects.all(), 'not-a-token', per_page=3)),
+                         self.ids[:3])
+
+    def test_walk_forwards_and_back(self):
+        listings = PropertyListing.objects.all()
+        first = paginate(listings, per_page=3)
+        second = paginate(listings, first.next_token, per_page=3)
+        third = paginate(listings, second.next_token, per_page=3)
+        self.assertEqual(self.page_ids(first) + self.page_ids(second) + self.page_ids(third), self.ids)
+        self.assertFalse(first.has_previous)
+        self.assertFalse(third.has_next)
+
+        self.assertEqual(self.page_ids(paginate(listings, third.previous_token, per_page=3)), self.ids[3:6])
+        back = paginate(listings, second.previous_token, per_page=3)
+        self.assertEqual(self.page_ids(back), self.ids[:3])
+        self.assertFalse(back.has_previous)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ExportSalesTests(TransactionTestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+
+    def test_malformed_dates_are_rejected(self):
+        for query in ({'start': 'abc'}, {'end': '2024-13-01'}):
+            response = self.client.get(reverse('export_sales'), query)
+            self.assertEqual(response.status_code, 400)
+
+    def test_date_range_is_applied(self):
+        add_listings(1)
+        listing = PropertyListing.objects.get()
+        for day in (date(2024, 1, 5), date(2024, 3, 5)):
+            Sale.objects.create(property_listing=listing, sale_date=day, sale_price=1000)
+
+        response = self.client.get(reverse('export_sales'), {'start': '2024-02-01', 'end': '2024-12-31'})
+        self.assertEqual(response.status_code, 200)
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), 2)  # Header and the March sale
+        self.assertIn('2024-03-05', rows[1])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AssignTaskTests(TransactionTestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+        self.template = PredefinedTask.objects.create(title='Call', description='Call the client', priority='Low')
+        self.agents = [make_agent('agent1'), make_agent('agent2')]
+        self.manager = make_agent('manager', role='Manager')
+
+    def assign(self, **data):
+        data = {'predefined_task_id': str(self.template.id), 'due_date': '2024-02-01', **data}
+        response = self.client.post(reverse('assign_task'), data, follow=True)
+        self.assertEqual(response.status_code, 200)
+        return [str(message) for message in response.context['messages']]
+
+    def test_malformed_input_is_reported_not_raised(self):
+        self.assertEqual(self.assign(employee_id=['abc']), ['Choose agents and roles from the lists.'])
+        self.assertEqual(self.assign(predefined_task_id='abc', employee_id=[str(self.agents[0].id)]),
+                         ['Choose a task and a valid due date.'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_only_agents_are_assigned(self):
+        self.assertEqual(self.assign(role='Manager'), ['Choose agents and roles from the lists.'])
+        self.assign(role='Agent', employee_id=[str(self.manager.id)])
+        self.assertEqual(
+            sorted(Task.objects.values_list('assigned_to_id', flat=True)), sorted(agent.id for agent in self.agents),
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ChartTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+
+    def chart_url(self, data=(1, 3, 2)):
+        return charts.chart_url({'Revenue': data}, 'Revenue', labels=['Jan', 'Feb', 'Mar'])
+
+    def test_chart_is_served_as_an_immutable_image(self):
+        response = self.client.get(self.chart_url())
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_chart_urls_outlive_the_cache(self):
+        url = self.chart_url()
+        cache.clear()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_chart_url_changes_with_the_data(self):
+        self.assertEqual(self.chart_url(), self.chart_url())
+        self.assertNotEqual(self.chart_url((1, 3, 4)), self.chart_url())
+
+    def test_unused_specs_are_pruned(self):
+        stale, fresh = self.chart_url((1,)), self.chart_url((2,))
+        ChartSpec.objects.filter(digest=stale.split('/')[-1].split('.')[0]).update(
+            last_used_at=now() - timedelta(days=60),
+        )
+        call_command('prune_chart_specs', '--days=30', stdout=io.StringIO())
+
+        self.assertEqual(ChartSpec.objects.count(), 1)
+        self.assertEqual(self.client.get(stale).status_code, 404)
+        self.assertEqual(self.client.get(fresh).status_code, 200)
+
+    def test_revenue_dashboard_keeps_the_interactive_chart(self):
+        Revenue.objects.create(year=2024, month=1, total_revenue=1000, total_expenses=500, net_profit=500)
+        response = self.client.get(reverse('revenue_dashboard'))
+        self.assertContains(response, 'revenueChart')
+        self.assertEqual(json.loads(response.context['revenue_chart_data'])['net_profit'], [500.0])
+
+
+@override_settings(CACHES=TEST_CACHES, ACTIVITY_MIN_HEARTBEAT=30, ACTIVITY_IDLE_TIMEOUT=15 * 60)
+class HeartbeatTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        activity._pending.clear()
+        self.addCleanup(activity._pending.clear)  # Nothing left for the exit-time flush
+        self.start = now()
+
+    def credited(self):
+        return sum(activity._pending.values())
+
+    def test_gaps_between_heartbeats_are_credited(self):
+        activity.heartbeat(1, self.start)
+        activity.heartbeat(1, self.start + timedelta(seconds=60))
+        activity.heartbeat(1, self.start + timedelta(seconds=70))  # Too soon: folded into the next credit
+        activity.heartbeat(1, self.start + timedelta(seconds=120))
+        activity.heartbeat(1, self.start + timedelta(hours=1))  # Back from a break: not credited
+        self.assertEqual(self.credited(), 120)
+
+    def test_concurrent_heartbeats_credit_a_gap_once(self):
+        activity.heartbeat(1, self.start)
+        # Both requests read the same last-seen time before either writes its own
+        with mock.patch.object(activity.cache, 'set'):
+            activity.heartbeat(1, self.start + timedelta(seconds=60))
+            activity.heartbeat(1, self.start + timedelta(seconds=61))
+        self.assertEqual(self.credited(), 60)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SalesRollupTests(TransactionTestCase):
+
+    def setUp(self):
+        add_listings(1)
+        self.listing = PropertyListing.objects.get()
+
+    def sell(self, agent=None, **fields):
+        return Sale.objects.create(property_listing=self.listing, agent=agent, sale_price=100, **fields)
+
+    def unassigned(self):
+        return list(DailySalesRollup.objects.filter(agent__isnull=True).values_list('date', 'sales_count'))
+
+    def test_deleted_agents_fold_into_one_unassigned_bucket(self):
+        day = date(2024, 2, 1)
+        agents = [make_agent('agent1'), make_agent('agent2')]
+        for agent in agents:
+            self.sell(agent, sale_date=day)
+        self.sell(sale_date=day)
+
+        for agent in agents:
+            agent.delete()
+        self.assertEqual(self.unassigned(), [(day, 3)])
+
+        self.sell(sale_date=day)
+        self.assertEqual(self.unassigned(), [(day, 4)])
+        self.assertEqual(sales_totals(), (4, 400))
+
+    def test_sales_without_a_date_are_counted(self):
+        sale = self.sell()
+        self.assertEqual(sale.sale_date, localdate())
+        self.assertEqual(sales_totals(), (1, 100))
+
+
+class ParseAreaTests(SimpleTestCase):
+
+    def assert_parses(self, cases, **kwargs):
+        for text, expected in cases:
+            with self.subTest(text=text, **kwargs):
+                parsed = parse_area_sqft(text, **kwargs)
+                self.assertEqual(parsed, None if expected is None else Decimal(expected))
+
+    def test_units(self):
+        self.assert_parses([
+            ('1500', '1500.00'),
+            (1500, '1500.00'),
+            (' 1500 ', '1500.00'),
+            ('1500 sqft', '1500.00'),
+            ('1500 Sq. Ft.', '1500.00'),
+            ('1500 square feet', '1500.00'),
+            ('110 sq m', '1184.03'),
+            ('1500 m²', '16145.85'),
+            ('200 gaj', '1800.00'),
+            ('1 acre', '43560.00'),
+            ('.5 acres', '21780.00'),
+            ('0.5 ha', '53819.55'),
+        ])
+
+    def test_ranges_give_the_midpoint(self):
+        self.assert_parses([
+            ('800-1000 Sq-ft', '900.00'),
+            ('1000 to 1200', '1100.00'),
+            ('1000 – 1200 sq.ft.', '1100.00'),
+            ('1000-1000', '1000.00'),
+            ('1000-800', None),
+        ])
+
+    def test_thousands_separators(self):
+        self.assert_parses([
+            ('1,200 sqft', '1200.00'),
+            ('1,00,000', '100000.00'),
+            ('1,200-1,400 sqft', '1300.00'),
+        ])
+
+    def test_unit_argument_applies_only_to_bare_numbers(self):
+        self.assert_parses([('100', '1076.39'), ('100 sqft', '100.00')], unit='sqm')
+        self.assert_parses([('100', None)], unit='furlong')
+
+    def test_missing_and_garbage(self):
+        self.assert_parses([
+            (None, None),
+            ('', None),
+            ('N/A', None),
+            ('none', None),
+            ('sqft', None),
+            ('abc', None),
+            ('12 bananas', None),
+            ('1.2.3', None),
+            ('0 sqft', None),
+            ('-5 sqft', None),
+        ])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SearchIndexTests(TransactionTestCase):
+
+    def setUp(self):
+        self.backend = search.get_backend()
+        self.assertIsInstance(self.backend, search.SQLiteFTS5Backend)
+        # The flush between tests leaves the FTS5 table alone
+        self.backend.rebuild()
+
+    def listing(self, **fields):
+        fields = {
+            'propertyType': 'House', 'location': 'Town', 'address': '1 Main St', 'floors': 1,
+            'coveredArea': '1000 sqft', 'electricityStatus': 'Yes', 'bathroomCount': 1, 'bedroomCount': 2,
+            **fields,
+        }
+        return PropertyListing.objects.create(**fields)
+
+    def found(self, query, queryset=None):
+        return [listing.pk for listing in self.backend.search(query, queryset)[:]]
+
+    def test_rebuild_indexes_every_listing(self):
+        add_listings(3)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.backend.table}')
+        self.assertEqual(self.found('town'), [])
+
+        self.assertEqual(self.backend.rebuild(), 3)
+        self.assertEqual(self.backend.search('town').count(), 3)
+
+    def test_prefix_terms_ranked_by_field_weight(self):
+        by_address = self.listing(address='4 Harbour Rd')
+        by_location = self.listing(location='Harbourside')
+        self.listing(location='Uptown')
+
+        self.assertEqual(self.found('harb'), [by_location.pk, by_address.pk])
+        self.assertEqual(self.found('harbour rd'), [by_address.pk])
+        self.assertEqual(self.found('HARBOUR'), [by_location.pk, by_address.pk])
+
+    def test_query_syntax_is_treated_as_text(self):
+        listing = self.listing(location='Town')
+        for query in ('"town', 'town*', '(town)', '-town', 'town^'):
+            with self.subTest(query=query):
+                self.assertEqual(self.found(query), [listing.pk])
+        # Operators are plain terms that every match must contain
+        for query in ('town OR hill', 'NEAR(town)', 'location: town'):
+            with self.subTest(query=query):
+                self.assertEqual(self.found(query), [])
+        self.assertEqual(self.found('"'), [listing.pk])  # No terms: everything
+
+    def test_search_within_a_queryset(self):
+        house = self.listing(location='Harbour')
+        flat = self.listing(location='Harbour', propertyType='Flat')
+        self.listing(location='Hill', propertyType='Flat')
+
+        flats = PropertyListing.objects.filter(propertyType='Flat')
+        self.assertEqual(self.found('harbour', flats), [flat.pk])
+        self.assertEqual(self.backend.search('harbour', flats).count(), 1)
+        self.assertEqual(
+            set(self.backend.filter('harbour').values_list('pk', flat=True)), {house.pk, flat.pk},
+        )
+
+    def test_index_follows_saves_and_deletes(self):
+        listing = self.listing(location='Harbour')
+        self.assertEqual(self.found('harbour'), [listing.pk])
+
+        listing.location = 'Hillcrest'
+        listing.save()
+        self.assertEqual(self.found('harbour'), [])
+        self.assertEqual(self.found('hillcrest'), [listing.pk])
+
+        listing.delete()
+        self.assertEqual(self.found('hillcrest'), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {self.backend.table}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_index_updates_once_the_transaction_commits(self):
+        with transaction.atomic():
+            listings = [self.listing(location='Harbour') for _ in range(3)]
+            self.assertEqual(self.found('harbour'), [])
+        self.assertEqual(set(self.found('harbour')), {listing.pk for listing in listings})
+
+        with suppress(RuntimeError), transaction.atomic():
+            self.listing(location='Seaview')
+            raise RuntimeError
+        self.assertEqual(self.found('seaview'), [])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class FacetCountTests(TransactionTestCase):
+
+    def setUp(self):
+        add_listings(6)
+
+    def stored(self):
+        return {
+            (facet, value): count
+            for facet, value, count in PropertyFacetCount.objects.filter(count__gt=0)
+            .values_list('facet', 'value', 'count')
+        }
+
+    def assert_counts_match_listings(self):
+        # The live counts are a GROUP BY over the listings table
+        live = {(facet, value): count for facet, value, count in facets._live_counts(PropertyListing.objects.all(), {})}
+        self.assertEqual(self.stored(), live)
+        self.assertFalse(PropertyFacetCount.objects.filter(count__lt=0).exists())
+
+    def test_counts_follow_a_status_change(self):
+        listing = PropertyListing.objects.first()
+        listing.status = 'Under Contract'
+        listing.save()
+
+        counts = self.stored()
+        self.assertEqual(counts[('status', 'Available')], 5)
+        self.assertEqual(counts[('status', 'Under Contract')], 1)
+        self.assert_counts_match_listings()
+
+    def test_counts_follow_a_sale(self):
+        listing = PropertyListing.objects.first()
+        self.client.force_login(make_agent('agent').user)
+        response = self.client.post(reverse('make_sale', args=[listing.pk]), {'sale_price': '100000'})
+
+        self.assertRedirects(response, reverse('sale_success'), fetch_redirect_response=False)
+        self.assertEqual(self.stored()[('status', 'Sold')], 1)
+        self.assert_counts_match_listings()
+
+    def test_counts_follow_a_delete(self):
+        PropertyListing.objects.filter(bedroomCount=2).delete()
+
+        self.assertNotIn(('bedrooms', '2'), self.stored())
+        self.assertEqual(sum(count for (facet, _), count in self.stored().items() if facet == 'status'), 4)
+        self.assert_counts_match_listings()
+
+    def test_counts_follow_a_bulk_update(self):
+        updated = PropertyListing.objects.filter(bedroomCount__gte=3).update(
+            status='Sold', location='Harbour', price=None,
+        )
+
+        counts = self.stored()
+        self.assertEqual(counts[('status', 'Sold')], updated)
+        self.assertEqual(counts[('location', 'Harbour')], updated)
+        self.assertEqual(counts[('price', PropertyFacetCount.UNPRICED)], updated)
+        self.assert_counts_match_listings()
+
+    def test_bulk_update_that_rolls_back_leaves_the_counts(self):
+        before = self.stored()
+        with suppress(RuntimeError), transaction.atomic():
+            PropertyListing.objects.update(status='Sold')
+            raise RuntimeError
+        self.assertEqual(self.stored(), before)
+
+    def test_full_recount_matches_group_by(self):
+        PropertyFacetCount.objects.update(count=99)
+        PropertyFacetCount.objects.create(facet='location', value='Nowhere', count=3)
+
+        out = io.StringIO()
+        call_command('rebuild_property_facets', stdout=out)
+
+        self.assertIn(f'Counted {PropertyFacetCount.objects.count()} facet values', out.getvalue())
+        self.assert_counts_match_listings()
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LeaderboardTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def agents_with_points(self, *points):
+        agents = []
+        for n, value in enumerate(points):
+            agent = make_agent(f'agent{n}')
+            PerformanceMetrics.objects.filter(employee=agent).update(aggregate_points=value)
+            agents.append(agent)
+        return agents
+
+    def standings(self):
+        """Employee ids in leaderboard order: points descending, then metrics id."""
+        return list(
+            PerformanceMetrics.objects.filter(employee__isnull=False)
+            .order_by('-aggregate_points', 'id').values_list('employee_id', flat=True)
+        )
+
+    def test_ties_share_a_competition_rank(self):
+        self.agents_with_points(30, 40, 50, 40, 0)
+        PerformanceMetrics.objects.create(aggregate_points=100)  # No employee: not ranked
+
+        self.assertEqual([entry['rank'] for entry in leaderboard.top()], [1, 2, 2, 4, 5])
+        self.assertEqual([entry['rank'] for entry in leaderboard.top(k=3)], [1, 2, 2])
+        self.assertEqual(leaderboard.ranks_for([40, 30, 99, 50, 40]), {99: 1, 50: 1, 40: 2, 30: 4})
+        self.assertEqual(leaderboard.ranks_for([]), {})
+        self.assertEqual(leaderboard.total_agents(), 5)
+
+    def test_around_breaks_ties_by_id(self):
+        agents = self.agents_with_points(50, 40, 40, 40, 40, 30)
+        order = self.standings()
+
+        for agent in agents:
+            with self.subTest(agent=agent.user.username):
+                index = order.index(agent.id)
+                window = leaderboard.around(agent, size=2)
+                self.assertEqual(
+                    [entry['employee_id'] for entry in window], order[max(index - 2, 0):index + 3],
+                )
+                self.assertEqual(
+                    [entry['rank'] for entry in window],
+                    [leaderboard.ranks_for([entry['aggregate_points']])[entry['aggregate_points']]
+                     for entry in window],
+                )
+
+        self.assertEqual(leaderboard.around(agents[0], size=0)[0]['employee_id'], agents[0].id)
+        self.assertEqual(len(leaderboard.around(agents[0], size=0)), 1)
+
+    def test_agent_without_metrics(self):
+        agent = make_agent('agent')
+        PerformanceMetrics.objects.filter(employee=agent).delete()
+        self.assertIsNone(leaderboard.position(agent))
+        self.assertEqual(leaderboard.around(agent), [])
+
+    def test_percentile_at_the_edges(self):
+        for rank, total, expected in [
+            (1, 0, 0.0),
+            (1, 1, 100.0),
+            (1, 3, 100.0),
+            (3, 3, 33.3),
+            (2, 3, 66.7),
+            (4, 4, 25.0),
+        ]:
+            with self.subTest(rank=rank, total=total):
+                self.assertEqual(leaderboard.percentile(rank, total), expected)
+
+    def test_position_of_tied_agents(self):
+        first, *tied = self.agents_with_points(20, 10, 10)
+
+        self.assertEqual(leaderboard.position(first)['percentile'], 100.0)
+        for agent in tied:
+            position = leaderboard.position(agent)
+            self.assertEqual((position['rank'], position['total'], position['percentile']), (2, 3, 66.7))
+
+
+TESTDATA = Path(__file__).resolve().parent / 'testdata'
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LoadListingsTests(TransactionTestCase):
+
+    def setUp(self):
+        search.get_backend().rebuild()
+
+    def load(self, name='listings.csv', *args, **options):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('load_property_listings', str(TESTDATA / name), *args, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def facet_counts(self):
+        return {
+            (facet, value): count for facet, value, count
+            in PropertyFacetCount.objects.filter(count__gt=0).values_list('facet', 'value', 'count')
+        }
+
+    def test_loads_valid_rows_and_reports_rejected_ones(self):
+        out, err = self.load(verbosity=2)
+
+        self.assertIn('Loaded 3 property listings', out)
+        self.assertIn('rejected 3 rows, skipped 0 already imported', out)
+        self.assertEqual(err.splitlines(), [
+            'Line 4 rejected: location longer than 30 characters',
+            'Line 5 rejected: wrong number of columns',
+            'Line 7 rejected: price: Ensure that there are no more than 15 digits in total.',
+        ])
+        self.assertEqual(
+            set(PropertyListing.objects.values_list('source_id', flat=True)), {'L1', 'L2', 'L5'},
+        )
+        listing = PropertyListing.objects.get(source_id='L2')
+        self.assertEqual((listing.location, listing.coveredArea, listing.covered_area_sqft),
+                         ('Hillcrest', '110 sq m', Decimal('1184.03')))
+        self.assertEqual(PropertyListing.objects.get(source_id='L1').price, Decimal('150000'))
+        self.assertEqual(PropertyListing.objects.get(source_id='L5').price, Decimal('0'))
+
+        self.assertEqual(self.facet_counts()[('location', 'Harbour')], 2)
+        self.assertEqual(search.get_backend().search('hillcrest').count(), 1)
+
+    def test_rerun_skips_rows_already_loaded(self):
+        out, _ = self.load(limit=2, batch_size=1)
+        self.assertIn('Loaded 2 property listings', out)
+        counts = self.facet_counts()
+
+        out, _ = self.load(batch_size=1)
+        self.assertIn('Loaded 1 property listings', out)
+        self.assertIn('skipped 2 already imported', out)
+
+        out, _ = self.load()
+        self.assertIn('Loaded 0 property listings', out)
+        self.assertIn('skipped 3 already imported', out)
+        self.assertEqual(PropertyListing.objects.count(), 3)
+        self.assertEqual(counts[('location', 'Harbour')], 1)
+        self.assertEqual(self.facet_counts()[('location', 'Harbour')], 2)
+
+    def test_upsert_updates_existing_rows_in_place(self):
+        self.load()
+        original = PropertyListing.objects.get(source_id='L1')
+
+        out, _ = self.load('listings_update.csv', upsert=True)
+
+        self.assertIn('Loaded 2 property listings', out)
+        updated = PropertyListing.objects.get(source_id='L1')
+        self.assertEqual(updated.pk, original.pk)
+        self.assertEqual((updated.location, updated.status, updated.price, updated.covered_area_sqft),
+                         ('Seaview', 'Sold', Decimal('1600000'), Decimal('1250.00')))
+        self.assertEqual(PropertyListing.objects.count(), 4)
+
+        counts = self.facet_counts()
+        self.assertEqual(counts[('location', 'Harbour')], 1)
+        self.assertEqual(counts[('location', 'Seaview')], 1)
+        self.assertEqual(counts[('location', 'Hillcrest')], 2)
+        self.assertEqual([listing.pk for listing in search.get_backend().search('seaview')[:]], [original.pk])
+        self.assertEqual(search.get_backend().search('harbour').count(), 1)
+
+    def test_loads_from_a_zip_archive(self):
+        with tempfile.TemporaryDirectory() as directory:
+            archive = Path(directory) / 'listings.zip'
+            with zipfile.ZipFile(archive, 'w') as zipped:
+                zipped.write(TESTDATA / 'listings.csv', 'listings.csv')
+            out, _ = self.load(archive)
+        self.assertIn('Loaded 3 property listings', out)
+
+    def test_missing_file(self):
+        with self.assertRaisesMessage(CommandError, 'does not exist'):
+            self.load('missing.csv')
+
+
+@override_settings(CACHES=TEST_CACHES, PRICE_PREDICTION_BATCH_LIMIT=4)
+class PredictPricesApiTests(TransactionTestCase):
+
+    def setUp(self):
+        pricing._loaded = None
+        add_listings(5)
+        pricing.train()
+        self.url = reverse('predict_property_prices_api')
+        self.client.force_login(User.objects.create_user('valuer'))
+
+    def post(self, body, content_type='application/json'):
+        if not isinstance(body, (str, bytes)):
+            body = json.dumps(body)
+        return self.client.post(self.url, body, content_type=content_type)
+
+    def test_prices_every_row(self):
+        response = self.post({'rows': [
+            {'location': 'Town', 'floors': 2, 'area': 1500, 'bedrooms': 3, 'bathrooms': 2},
+            {'area': '1200'},
+        ]})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['count'], data['errors']), (2, []))
+        expected = [
+            pricing.predict('Town', floors=2, covered_area_sqft=1500, bedroomCount=3, bathroomCount=2),
+            pricing.predict(covered_area_sqft=1200),
+        ]
+        for prediction, price in zip(data['predictions'], expected):
+            self.assertAlmostEqual(prediction, price, places=2)
+
+    def test_csv_rows(self):
+        response = self.post('location,floors,area,bedrooms,bathrooms\nTown,1,1000,2,1\n,,,,\n', 'text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_partial_failures_price_the_readable_rows(self):
+        response = self.post([
+            {'location': 'Town', 'area': 1000},
+            {'area': 'large'},
+            'not a row',
+            {'location': 'Town', 'area': 1100},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 4)
+        self.assertIsNone(data['predictions'][1])
+        self.assertIsNone(data['predictions'][2])
+        self.assertAlmostEqual(data['predictions'][3], pricing.predict('Town', covered_area_sqft=1100), places=2)
+        self.assertEqual([error['row'] for error in data['errors']], [1, 2])
+        self.assertIn("area must be a number, got 'large'", data['errors'][0]['error'])
+
+    def test_unreadable_values(self):
+        for row in [
+            {'floors': True},
+            {'area': 'nan'},
+            {'area': 'inf'},
+            {'bedrooms': [3]},
+            {'location': 7},
+            {'location': {'name': 'Town'}},
+        ]:
+            with self.subTest(row=row):
+                data = self.post([row]).json()
+                self.assertEqual(data['predictions'], [None])
+                self.assertEqual(len(data['errors']), 1)
+
+    def test_too_many_rows(self):
+        response = self.post([{'area': 1000}] * 5)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json()['error'], 'At most 4 rows per request, got 5')
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=100)
+    def test_too_large_body(self):
+        response = self.post({'rows': [{'location': 'x' * 200}]})
+        self.assertEqual(response.status_code, 413)
+
+    def test_malformed_payloads(self):
+        for body, content_type in [
+            ('{"rows": [', 'application/json'),
+            ('', 'application/json'),
+            ('"rows"', 'application/json'),
+            ('{"rows": {"area": 1}}', 'application/json'),
+            (b'\xff\xfe', 'text/csv'),
+        ]:
+            with self.subTest(body=body):
+                response = self.post(body, content_type)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Cannot read rows', response.json()['error'])
+
+    def test_requires_post_and_a_model(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        PriceModel.objects.all().delete()
+        pricing._loaded = None
+        self.assertEqual(self.post([{'area': 1000}]).status_code, 503)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ForecastingTests(TransactionTestCase):
+
+    def add_revenue(self, values, start=(2022, 1)):
+        year, month = start
+        for value in map(float, values):
+            value = round(value, 2)
+            Revenue.objects.create(year=year, month=month, total_revenue=value, total_expenses=0, net_profit=value)
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    def scores(self, forecast):
+        return {score['name']: score for score in forecast['models']}
+
+    def test_models_are_scored_on_shared_origins(self):
+        rng = np.random.default_rng(0)
+        self.add_revenue(1000 + 10 * np.arange(30) + rng.normal(0, 20, 30))
+
+        forecast = forecasting.build_forecast(horizon=3)
+
+        scores = self.scores(forecast)
+        self.assertEqual(set(scores), {'trend', 'seasonal_trend', 'seasonal_naive'})
+        self.assertEqual({score['origins'] for score in scores.values()}, {30 - forecasting.SeasonalTrend.min_history})
+        self.assertEqual(forecast['model'], min(scores.values(), key=lambda score: score['mae'])['name'])
+
+    def test_candidates_without_a_backtest_are_not_chosen(self):
+        self.add_revenue(1000 + 10 * np.arange(13))
+
+        scores = self.scores(forecasting.build_forecast())
+
+        self.assertEqual(scores['trend']['origins'], 13 - forecasting.LinearTrend.min_history)
+        self.assertNotIn('mae', scores['seasonal_naive'])  # 13 months: fits, but no origin left to score
+        self.assertNotIn('seasonal_trend', scores)
+        self.assertEqual(forecasting.build_forecast()['model'], 'trend')
+
+    def test_seasonal_series_picks_a_seasonal_model(self):
+        months = np.arange(36)
+        self.add_revenue(5000 + 20 * months + 2000 * np.sin(2 * np.pi * months / 12))
+
+        forecast = forecasting.build_forecast(horizon=12)
+
+        self.assertIn(forecast['model'], ('seasonal_trend', 'seasonal_naive'))
+        scores = self.scores(forecast)
+        self.assertLess(scores[forecast['model']]['mae'], scores['trend']['mae'])
+        self.assertEqual(forecast['forecast'][0]['period'], '2025-01')
+
+    def test_interval_coverage(self):
+        rng = np.random.default_rng(1)
+        t = np.arange(60)
+        y = 1000 + 5 * t + rng.normal(0, 50, 60)
+
+        wide = forecasting.backtest(forecasting.LinearTrend, t, y, horizon=3, level=0.95)
+        narrow = forecasting.backtest(forecasting.LinearTrend, t, y, horizon=3, level=0.5)
+
+        self.assertEqual(wide['origins'], 60 - forecasting.LinearTrend.min_history)
+        self.assertGreaterEqual(wide['coverage'], 85)
+        self.assertLess(narrow['coverage'], wide['coverage'])
+        self.assertAlmostEqual(narrow['coverage'], 50, delta=15)
+        self.assertEqual(forecasting.backtest(forecasting.LinearTrend, t, y, start=55)['origins'], 5)
+        self.assertIsNone(forecasting.backtest(forecasting.SeasonalTrend, t[:24], y[:24]))
+
+    def test_intervals_contain_the_forecast_and_widen(self):
+        rng = np.random.default_rng(2)
+        self.add_revenue(1000 + 10 * np.arange(12) + rng.normal(0, 20, 12))
+
+        forecast = forecasting.build_forecast(horizon=6)
+
+        widths = [row['upper'] - row['lower'] for row in forecast['forecast']]
+        for row in forecast['forecast']:
+            self.assertLess(row['lower'], row['value'])
+            self.assertLess(row['value'], row['upper'])
+        self.assertEqual(widths, sorted(widths))
+
+    def test_single_month_is_carried_forward(self):
+        self.add_revenue([750])
+        forecast = forecasting.build_forecast(horizon=2)
+        self.assertEqual(forecast['model'], 'trend')
+        self.assertEqual([(row['value'], row['lower'], row['upper']) for row in forecast['forecast']],
+                         [(750.0, 750.0, 750.0)] * 2)
+
+
+@override_settings(CACHES=TEST_CACHES, PROPERTY_IMAGE_WIDTHS=(32, 64))
+class ImageVariantTests(TransactionTestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def listing_with_image(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (100, 50), 'navy').save(buffer, 'PNG')
+        listing = PropertyListing(
+            propertyType='House', location='Town', address='1 Main St', floors=1, coveredArea='1000 sqft',
+            electricityStatus='Yes', bathroomCount=1, bedroomCount=2,
+            image=SimpleUploadedFile('house.png', buffer.getvalue(), content_type='image/png'),
+        )
+        listing.save()
+        return listing
+
+    def variant_names(self, listing):
+        return sorted(name for extension in ('webp', 'jpg') for name in listing.image_variants[extension].values())
+
+    def test_force_overwrites_existing_variants(self):
+        listing = self.listing_with_image()
+        names = self.variant_names(listing)
+        self.assertEqual(len(names), 4)  # 32 and 64 wide, in two formats
+        for name in names:
+            with default_storage.open(name, 'wb') as file:
+                file.write(b'corrupt')
+
+        call_command('generate_image_variants', stdout=io.StringIO())
+        with default_storage.open(names[0], 'rb') as file:
+            self.assertEqual(file.read(), b'corrupt')  # Listings with variants are skipped
+
+        out = io.StringIO()
+        call_command('generate_image_variants', force=True, stdout=out)
+
+        self.assertIn('Created variants for 1 images, 0 failed', out.getvalue())
+        listing.refresh_from_db()
+        self.assertEqual(self.variant_names(listing), names)
+        for name in names:
+            with default_storage.open(name, 'rb') as file:
+                self.assertEqual(Image.open(file).width, int(name.rsplit('-', 1)[1].split('.')[0]))
+        # Overwritten in place, not saved beside the old files under new names
+        _, files = default_storage.listdir(images.VARIANT_DIR)
+        self.assertEqual(sorted(f'{images.VARIANT_DIR}/{name}' for name in files), names)
+
+    def test_backfills_listings_without_variants(self):
+        listing = self.listing_with_image()
+        PropertyListing.objects.filter(pk=listing.pk).update(image_variants={})
+
+        out = io.StringIO()
+        call_command('generate_image_variants', stdout=out)
+
+        self.assertIn('Created variants for 1 images, 0 failed', out.getvalue())
+        listing.refresh_from_db()
+        self.assertEqual(listing.image_variants['width'], 100)
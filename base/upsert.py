@@ -0,0 +1,65 @@
+from uuid import uuid4
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F
+
+
+def upsert_increment(model, conflict_fields, rows, using=DEFAULT_DB_ALIAS):
+    """
+    Insert `rows` into `model`, adding to the existing row on a unique conflict.
+
+    Every row is a dict with the same keys: the `conflict_fields` (which must be
+    covered by a unique constraint) and the numeric fields to increment. All rows
+    go out as one `INSERT ... ON CONFLICT DO UPDATE SET f = f + EXCLUDED.f`
+    statement, so callers must pass each conflict key at most once.
+    """
+    if not rows:
+        return
+    connection = connections[using]
+    opts = model._meta
+    names = list(rows[0])
+    fields = [opts.get_field(name) for name in names]
+    increment_fields = [field for field in fields if field.name not in conflict_fields
+                        and field.attname not in conflict_fields]
+
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        _upsert_increment_fallback(model, conflict_fields, rows, increment_fields, using)
+        return
+
+    # UUID primary keys are generated in Python, so the INSERT has to supply them
+    add_pk = opts.pk.name not in names and opts.pk.attname not in names and opts.pk.default is uuid4
+    if add_pk:
+        fields = [opts.pk] + fields
+
+    qn = connection.ops.quote_name
+    table = qn(opts.db_table)
+    columns = ', '.join(qn(field.column) for field in fields)
+    conflict = ', '.join(qn(opts.get_field(name).column) for name in conflict_fields)
+    updates = ', '.join(
+        f'{qn(field.column)} = {table}.{qn(field.column)} + EXCLUDED.{qn(field.column)}'
+        for field in increment_fields
+    )
+    placeholder = '(' + ', '.join(['%s'] * len(fields)) + ')'
+
+    params = []
+    for row in rows:
+        values = [row[name] for name in names]
+        if add_pk:
+            values = [uuid4()] + values
+        params.extend(field.get_db_prep_save(value, connection) for field, value in zip(fields, values))
+
+    sql = (
+        f'INSERT INTO {table} ({columns}) VALUES {", ".join([placeholder] * len(rows))} '
+        f'ON CONFLICT ({conflict}) DO UPDATE SET {updates}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _upsert_increment_fallback(model, conflict_fields, rows, increment_fields, using):
+    for row in rows:
+        keys = {name: row[name] for name in conflict_fields}
+        updates = {field.attname: F(field.attname) + row[field.name if field.name in row else field.attname]
+                   for field in increment_fields}
+        if not model.objects.using(using).filter(**keys).update(**updates):
+            model.objects.using(using).create(**row)
@@ -1,4 +1,4 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from . import views
 
 urlpatterns = [
@@ -26,12 +26,16 @@ urlpatterns = [
     # Property Management
     path('property_list/', views.property_list, name='property_list'),
     path('property/<uuid:property_id>/', views.property_detail, name='property_detail'),
+    path('property/<uuid:property_id>/comparables/', views.comparables_api, name='property_comparables'),
+    path('comparables/', views.comparables_api, name='comparables_api'),
     path('property/add/', views.property_add, name='property_add'),
     path('property/<uuid:pk>/edit/', views.property_edit, name='property_edit'),
     path('property/<uuid:pk>/delete/', views.property_delete, name='property_delete'),
     path('property/<uuid:property_id>/make_sale/', views.make_sale, name='make_sale'),
     path('property/<uuid:pk>/update_status/', views.update_property_status, name='update_property_status'),
     path('export_properties/', views.export_properties, name='export_properties'),
+    path('export_sales/', views.export_sales, name='export_sales'),
+    path('export_agent_profits/', views.export_agent_profits, name='export_agent_profits'),
     path('sale_success/', views.sale_success, name='sale_success'),
 
     # Sales Management
@@ -48,13 +52,17 @@ urlpatterns = [
     path('employees/delete/<int:employee_id>/', views.delete_employee, name='delete_employee'),
     
     path('profile/', views.user_profile_view, name='user_profile'),
+    path('leaderboard/', views.leaderboard_api, name='leaderboard_api'),
+    path('activity/ping/', views.activity_ping, name='activity_ping'),
 
 
 
     path('predict/revenue/', views.predict_revenue, name='predict_revenue'),
     path('predict/property-price/', views.predict_property_price, name='predict_property_price'),
+    path('predict/property-prices/', views.predict_property_prices_api, name='predict_property_prices_api'),
 
     path("revenue-dashboard/", views.revenue_dashboard, name="revenue_dashboard"),
+    re_path(r'^charts/(?P<digest>[0-9a-f]{16})\.(?P<fmt>svg|png)$', views.chart_image, name='chart'),
 
     path('sale-summary/', views.sale_summary, name='sale_summary'),
 
@@ -1,10 +1,6 @@
 import json
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 import io
 import urllib
-import base64
 import csv  # Add csv import
 from datetime import datetime, timedelta
 from decimal import Decimal, InvalidOperation
@@ -12,16 +8,17 @@ from uuid import UUID
 from io import BytesIO
 
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.http import Http404, JsonResponse, HttpResponse
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.signals import user_logged_in, user_logged_out
 from django.dispatch import receiver
+from django.utils.cache import patch_cache_control
 from django.utils.timezone import now
+from django.views.decorators.http import etag
 from django.urls import reverse
-from django.core.paginator import Paginator
 from django.db import models
 from django.db.models import F, Q, Sum, Avg, Count
 from django.contrib.auth.forms import PasswordResetForm, SetPasswordForm
@@ -30,6 +27,7 @@ from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.core.mail import send_mail
 from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
 
 # Models
 from .models import (
@@ -47,70 +45,47 @@ from .models import (
 # Forms
 from .forms import PropertyListingForm
 
-# Machine Learning
-from sklearn.linear_model import LinearRegression
+# Dashboards
+from .dashboard import agent_sales_totals, build_admin_context, build_home_context
+from .exports import stream_csv
+from .pagination import paginate
+from .snapshots import get_snapshot
+from . import activity, facets, leaderboard, search
+
+# NumPy, scikit-learn and matplotlib live behind base.analytics, base.pricing,
+# base.forecasting, base.comps and base.charts. Those modules are imported inside
+# the views that use them, so workers serving everything else never load them.
 
 
 @receiver(user_logged_in)
 def track_login(sender, request, user, **kwargs):
-    if not hasattr(user, 'employee'):
+    employee_id = Employee.objects.filter(user=user).values_list('id', flat=True).first()
+    if employee_id is None:
         return  # Skip if user is not an employee
 
-    employee = user.employee
-    today = now().date()
-
-    # Ensure a daily record exists
-    tracker, created = ProductivityTracker.objects.get_or_create(
-        employee=employee, date=today,
-        defaults={'hours_worked': 0, 'tasks_completed': 0}
-    )
-
-    # Store login time (in session)
-    request.session['login_time'] = now().isoformat()
+    # Remembered so ActivityMiddleware can heartbeat without a query per request
+    request.session['employee_id'] = employee_id
+    activity.heartbeat(employee_id)
 
 
 @receiver(user_logged_out)
 def track_logout(sender, request, user, **kwargs):
-    if not hasattr(user, 'employee'):
-        return  # Skip if user is not an employee
+    employee_id = request.session.get('employee_id') if request is not None else None
+    if employee_id:
+        activity.end_session(employee_id)
 
-    employee = user.employee
-    today = now().date()
-    
-    login_time = request.session.pop('login_time', None)
-    if login_time:
-        login_time = now() - now().fromisoformat(login_time)
-        hours_worked = login_time.total_seconds() / 3600  # Convert to hours
-        
-        # Update ProductivityTracker
-        tracker, _ = ProductivityTracker.objects.get_or_create(
-            employee=employee, date=today,
-            defaults={'hours_worked': 0, 'tasks_completed': 0}
-        )
-        tracker.hours_worked += Decimal(str(round(hours_worked, 2)))
-        tracker.save()
 
+@login_required
+def activity_ping(request):
+    """Heartbeat target for open pages; ActivityMiddleware does the recording."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=405)
+    return JsonResponse({'status': 'ok'})
 
 
 def landing(request):
     return render(request, "base/landing_page.html")
 
-def generate_chart(data, title):
-    """Helper function to create base64-encoded chart images."""
-    plt.figure(figsize=(5, 3))
-    plt.plot(data, marker='o', linestyle='-')
-    plt.title(title)
-    plt.grid(True)
-    
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.getvalue()).decode()
-    buffer.close()
-    
-    return f"data:image/png;base64,{image_base64}"
-
-
 def signup(request):
     if request.method == 'POST':
         first_name = request.POST.get('first_name')
@@ -159,94 +134,7 @@ def signup(request):
 
 
 def home(request):
-    # Financial Summary
-    total_revenue = Sale.objects.aggregate(total=Sum("sale_price"))["total"] or Decimal("0")
-    
-    # Calculate net profit from Revenue model
-    latest_revenue = Revenue.objects.order_by('-year', '-month').first()
-    net_profit = latest_revenue.net_profit if latest_revenue else Decimal("0")
-
-    # Convert Decimal to float for JSON serialization
-    total_revenue = float(total_revenue)
-    net_profit = float(net_profit)
-
-    # Property Metrics
-    properties_sold = Sale.objects.count()
-    
-    # Property Status Distribution
-    property_status_data = {
-        'labels': ['Available', 'Sold', 'Under Contract'],
-        'data': [
-            PropertyListing.objects.filter(status='Available').count(),
-            Sale.objects.count(),
-            PropertyListing.objects.filter(status='Under Contract').count()
-        ]
-    }
-
-    # Agent Performance (sorted by highest points)
-    agent_performance = PerformanceMetrics.objects.select_related("employee__user").order_by("-aggregate_points")[:5]
-    
-    # Agent Performance Data for Chart
-    agent_performance_data = {
-        'labels': [metric.employee.user.get_full_name() for metric in agent_performance],
-        'tasks_completed': [metric.tasks_completed for metric in agent_performance],
-        'sales_closed': [metric.sales_closed for metric in agent_performance],
-        'aggregate_points': [metric.aggregate_points for metric in agent_performance]
-    }
-
-    # Monthly Sales Trend
-    current_year = now().year
-    monthly_sales = []
-    for month in range(1, 13):
-        count = Sale.objects.filter(
-            sale_date__year=current_year,
-            sale_date__month=month
-        ).count()
-        monthly_sales.append(count)
-
-    # Sales Volume Trends (last 30 days)
-    sales_data = [Sale.objects.filter(sale_date__day=i).count() for i in range(1, 31)]
-
-    # Productivity Trends
-    productivity_data = [agent.tasks_completed for agent in agent_performance]
-
-    # Revenue Trends Data
-    revenue_entries = Revenue.objects.all().order_by("year", "month")
-    revenue_trends = {
-        'labels': [f"{entry.year}-{entry.month:02d}" for entry in revenue_entries],
-        'total_revenue': [float(entry.total_revenue) for entry in revenue_entries],
-        'total_expenses': [float(entry.total_expenses) for entry in revenue_entries],
-        'net_profit': [float(entry.net_profit) for entry in revenue_entries]
-    }
-
-    # Generate labels for charts
-    last_30_days = [f"Day {i}" for i in range(1, 31)]
-    month_labels = ["January", "February", "March", "April", "May", "June", 
-                   "July", "August", "September", "October", "November", "December"]
-
-    context = {
-        "total_revenue": total_revenue,
-        "net_profit": net_profit,
-        "properties_sold": properties_sold,
-        "agent_performance": [
-            {
-                "name": metric.employee.user.get_full_name(),
-                "tasks_completed": metric.tasks_completed,
-                "sales_closed": metric.sales_closed,
-                "aggregate_points": metric.aggregate_points,
-            }
-            for metric in agent_performance
-        ],
-        "sales_data": json.dumps(sales_data),  
-        "productivity_data": json.dumps(productivity_data),  
-        "revenue_trends": json.dumps(revenue_trends),  
-        "last_30_days": json.dumps(last_30_days),  
-        "month_labels": json.dumps(month_labels),
-        "property_status_data": json.dumps(property_status_data),
-        "agent_performance_data": json.dumps(agent_performance_data),
-        "monthly_sales": json.dumps(monthly_sales),
-    }
-
+    context = get_snapshot('home', build_home_context)
     return render(request, "base/home.html", context)
 
 # Home View
@@ -290,8 +178,11 @@ def user_profile_view(request):
     # Get performance metrics
     performance_metrics = PerformanceMetrics.objects.filter(employee=employee).first()
 
-    # Fetch recent sales handled by the employee
-    sales = Sale.objects.filter(agent=employee).order_by('-sale_date')[:10]
+    # Fetch sales handled by the employee, newest first, a page at a time
+    sales = paginate(
+        Sale.objects.filter(agent=employee).select_related('property_listing'),
+        request.GET.get('cursor'), ordering=('-sale_date', '-id'),
+    )
 
     # Task status counts for chart display
     task_status_counts = [
@@ -317,6 +208,7 @@ def user_profile_view(request):
         'user': request.user,
         'employee': employee,
         'performance_metrics': performance_metrics or {},
+        'leaderboard_position': leaderboard.position(employee),
         'sales': sales,
         'task_status_counts': task_status_counts,
         'revenue_data': revenue_data,
@@ -325,43 +217,86 @@ def user_profile_view(request):
     return render(request, 'base/user_profile.html', context)
 
 
+@login_required
+def leaderboard_api(request):
+    """JSON leaderboard: top agents plus the requesting agent's rank and neighbours."""
+    try:
+        k = min(max(int(request.GET.get('top', 10)), 1), 100)
+        size = min(max(int(request.GET.get('around', 2)), 0), 50)
+    except ValueError:
+        return JsonResponse({'error': 'top and around must be integers'}, status=400)
+
+    data = {'top': leaderboard.top(k), 'total': leaderboard.total_agents()}
+
+    employee = Employee.objects.filter(user=request.user).first()
+    if employee is not None:
+        data['me'] = leaderboard.position(employee)
+        data['around'] = leaderboard.around(employee, size)
+
+    return JsonResponse(data)
+
+
+# Roles that tasks can be assigned to, individually or all at once
+ASSIGNABLE_ROLES = ['Agent']
+
+
 # Assign Task View
 @login_required
 def assign_task(request):
     if request.method == 'POST':
-        predefined_task_id = request.POST.get('predefined_task_id')
-        employee_id = request.POST.get('employee_id')
-        due_date = request.POST.get('due_date')
-        description = request.POST.get('description')  # Get the custom description
+        employee_ids = request.POST.getlist('employee_id')
+        role = request.POST.get('role')
+        description = request.POST.get('description', '')  # Custom description, shared by every task
 
         try:
-            predefined_task = PredefinedTask.objects.get(id=predefined_task_id)
-            employee = Employee.objects.get(id=employee_id)
-            
-            # Create task with custom description
-            task = Task.objects.create(
-                predefined_task=predefined_task,
-                assigned_to=employee,
-                description=description,  # Use the custom description
-                due_date=due_date,
-                status='Pending'
+            predefined_task_id = UUID(request.POST.get('predefined_task_id', ''))
+        except ValueError:
+            predefined_task_id = None
+        predefined_task = PredefinedTask.objects.filter(id=predefined_task_id).first() if predefined_task_id else None
+        try:
+            due_date = datetime.strptime(request.POST.get('due_date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            due_date = None
+
+        # Targets: the chosen agents and/or everyone with the chosen role
+        employees = Employee.objects.none()
+        if employee_ids:
+            employees = Employee.objects.filter(id__in=[int(value) for value in employee_ids if value.isdigit()])
+        if role:
+            employees = employees | Employee.objects.filter(role=role)
+        employees = employees.filter(role__in=ASSIGNABLE_ROLES)
+
+        if predefined_task is None or due_date is None:
+            messages.error(request, 'Choose a task and a valid due date.')
+        elif not all(value.isdigit() for value in employee_ids if value) or (role and role not in ASSIGNABLE_ROLES):
+            messages.error(request, 'Choose agents and roles from the lists.')
+        elif not employees.exists():
+            messages.error(request, 'Choose at least one agent or a role.')
+        else:
+            # One bulk insert in one transaction; metrics and the dashboard are updated once for the batch
+            tasks = Task.assign_many(
+                predefined_task, employees, due_date, description,
+                skip_existing=bool(request.POST.get('skip_existing')),
             )
-            
-            messages.success(request, 'Task assigned successfully!')
-            return redirect('assign_task')
-        except Exception as e:
-            messages.error(request, f'Error assigning task: {str(e)}')
-            return redirect('assign_task')
+            if tasks:
+                messages.success(request, f'Task assigned to {len(tasks)} agent{"s" if len(tasks) != 1 else ""}!')
+            else:
+                messages.error(request, 'Every selected agent already has this task open.')
+        return redirect('assign_task')
 
     # Fetch predefined tasks, agents, and assigned tasks
     predefined_tasks = PredefinedTask.objects.all()
-    agents = Employee.objects.filter(role='Agent')
-    assigned_tasks = Task.objects.filter(assigned_to__isnull=False)
+    agents = Employee.objects.filter(role='Agent').select_related('user')
+    assigned_tasks = paginate(
+        Task.objects.filter(assigned_to__isnull=False).select_related('predefined_task', 'assigned_to__user'),
+        request.GET.get('cursor'), ordering=('-due_date', '-id'), per_page=20, with_total=True,
+    )
 
     # Render the template with context data
     return render(request, 'base/assign_task.html', {
         'predefined_tasks': predefined_tasks,
         'agents': agents,
+        'roles': ASSIGNABLE_ROLES,
         'assigned_tasks': assigned_tasks,
     })
     
@@ -467,30 +402,105 @@ def delete_employee(request, employee_id):
     
     
 # Property Views
-def property_list(request):
-    query = request.GET.get('q')  # Search query
+def filter_properties(params, ranked=True, with_facets=True):
+    """
+    Listings matching the property_list filters in `params`: the facet
+    selections (status, type, location, bedrooms, bathrooms, price band), the
+    covered-area range `min_area`/`max_area` (sqft) and the search query `q`.
+    With `ranked`, a search comes back ordered by relevance; otherwise it
+    stays a plain queryset.
+    """
+    query = params.get('q')  # Search query
     properties = PropertyListing.objects.all()
+    filtered = False
+
+    for param, lookup in (('min_area', 'covered_area_sqft__gte'), ('max_area', 'covered_area_sqft__lte')):
+        try:
+            area = Decimal(params.get(param) or '')
+        except InvalidOperation:
+            continue
+        properties = properties.filter(**{lookup: area})
+        filtered = True
+
+    selected = facets.selected_facets(params) if with_facets else {}
+    if selected:
+        properties = facets.filter_by_facets(properties, selected)
+        filtered = True
 
     if query:
-        properties = properties.filter(
-            Q(location__icontains=query) |
-            Q(propertyType__icontains=query) |
-            Q(address__icontains=query)
-        )
+        backend = search.get_backend()
+        if ranked:
+            # Ranked by relevance through the configured search index
+            properties = backend.search(query, properties if filtered else None)
+        else:
+            properties = backend.filter(query, properties)
+    return properties
+
 
-    # Pagination
-    paginator = Paginator(properties, 10)  # Show 10 properties per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def property_list(request):
+    properties = filter_properties(request.GET)
+
+    # Cursor pagination: 10 properties per page, deep pages cost the same as the first
+    page_obj = paginate(properties, request.GET.get('cursor'), ordering=('pk',), with_total=True)
 
-    return render(request, 'base/property.html', {'view_mode': 'list', 'page_obj': page_obj})
+    # Facet counts: precomputed when only facets (or nothing) are chosen, one query otherwise
+    narrowed = any(request.GET.get(key) for key in ('q', 'min_area', 'max_area'))
+    facet_base = filter_properties(request.GET, ranked=False, with_facets=False) if narrowed else None
+    facet_list = facets.facet_counts(facet_base, facets.selected_facets(request.GET))
+
+    # Current filters, carried over into the pagination and export links
+    filter_query = request.GET.copy()
+    filter_query.pop('cursor', None)
+
+    return render(request, 'base/property.html', {
+        'view_mode': 'list',
+        'page_obj': page_obj,
+        'facets': facets.add_toggle_links(facet_list, request.GET),
+        'filter_query': filter_query.urlencode(),
+    })
 
 def property_detail(request, property_id):
     property = get_object_or_404(PropertyListing, id=property_id)
-    context = {
-        'property': property,
+    # The comparables panel is filled in by the page from comparables_api, keeping the
+    # analytics libraries off this view
+    return render(request, 'base/property_detail.html', {'property': property})
+
+
+def _comparable_json(listing, distance, same_location):
+    return {
+        'id': str(listing.pk),
+        'url': reverse('property_detail', args=[listing.pk]),
+        'propertyType': listing.propertyType,
+        'location': listing.location,
+        'price': float(listing.price) if listing.price is not None else None,
+        'covered_area_sqft': float(listing.covered_area_sqft) if listing.covered_area_sqft is not None else None,
+        'floors': listing.floors,
+        'bedroomCount': listing.bedroomCount,
+        'bathroomCount': listing.bathroomCount,
+        'status': listing.status,
+        'distance': round(distance, 4),
+        'same_location': same_location,
     }
-    return render(request, 'base/property_detail.html', context)
+
+
+def comparables_api(request, property_id=None):
+    """
+    JSON comparables for a listing, or for ad hoc criteria given as location,
+    floors, area, bedrooms and bathrooms query parameters. `count` caps the results.
+    """
+    from . import comps, pricing
+
+    try:
+        count = min(max(int(request.GET.get('count', comps.DEFAULT_COUNT)), 1), 50)
+        if property_id is not None:
+            results = comps.comparables_for(get_object_or_404(PropertyListing, id=property_id), count)
+        else:
+            locations, X = pricing.batch_features([request.GET.dict()])
+            features = dict(zip(comps.FEATURES, X[0].tolist()))  # NaN for missing, filled by comps
+            results = comps.comparables(locations[0], features, count)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse({'comparables': [_comparable_json(*result) for result in results]})
 
 def property_add(request):
     if request.method == 'POST':
@@ -533,29 +543,59 @@ def update_property_status(request, pk):
     return redirect('property_detail', pk=pk)
 
 def export_properties(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="properties.csv"'
+    """Stream the listings matching the property_list filters as CSV (gzipped with ?gzip=1)."""
+    properties = filter_properties(request.GET, ranked=False)
+    return stream_csv(
+        'properties.csv',
+        ['Address', 'Type', 'Location', 'Price', 'Status', 'Floors', 'Covered Area'],
+        properties.order_by('pk'),
+        ['address', 'propertyType', 'location', 'price', 'status', 'floors', 'coveredArea'],
+        compress=bool(request.GET.get('gzip')),
+    )
 
-    writer = csv.writer(response)
-    # Include only the basic fields that exist in the PropertyListing model
-    writer.writerow([
-        'Address', 'Type', 'Location', 'Price', 'Status', 
-        'Floors', 'Covered Area'
-    ])
 
-    properties = PropertyListing.objects.all()
-    for property in properties:
-        writer.writerow([
-            property.address,
-            property.propertyType,
-            property.location,
-            property.price,
-            property.status,
-            property.floors,
-            property.coveredArea
-        ])
+def _visible_to(request, queryset):
+    """Everything for superusers; otherwise only the logged-in agent's own rows."""
+    if request.user.is_superuser:
+        return queryset
+    return queryset.filter(agent__user=request.user)
 
-    return response
+
+@login_required
+def export_sales(request):
+    """Stream sales as CSV, optionally limited to ?start= / ?end= sale dates (YYYY-MM-DD)."""
+    bounds = {}
+    for param, lookup in (('start', 'sale_date__gte'), ('end', 'sale_date__lte')):
+        if request.GET.get(param):
+            try:
+                bounds[lookup] = datetime.strptime(request.GET[param], '%Y-%m-%d').date()
+            except ValueError:
+                return JsonResponse({'error': f'{param} must be a date in YYYY-MM-DD format'}, status=400)
+    sales = _visible_to(request, Sale.objects.filter(**bounds))
+    return stream_csv(
+        'sales.csv',
+        ['Sale ID', 'Sale Date', 'Closing Date', 'Property Type', 'Location', 'Address', 'Agent',
+         'Buyer', 'Buyer Email', 'Payment Method', 'Sale Price'],
+        sales.order_by('-sale_date', '-id'),
+        ['id', 'sale_date', 'closing_date', 'property_listing__propertyType', 'property_listing__location',
+         'property_listing__address', 'agent__user__username', 'buyer_name', 'buyer_email',
+         'payment_method', 'sale_price'],
+        compress=bool(request.GET.get('gzip')),
+    )
+
+
+@login_required
+def export_agent_profits(request):
+    """Stream agent profits as CSV."""
+    profits = _visible_to(request, AgentProfit.objects.all())
+    return stream_csv(
+        'agent_profits.csv',
+        ['Profit ID', 'Recorded At', 'Agent', 'Sale ID', 'Sale Date', 'Sale Price', 'Profit'],
+        profits.order_by('-recorded_at', '-id'),
+        ['id', 'recorded_at', 'agent__user__username', 'sale_id', 'sale__sale_date', 'sale__sale_price',
+         'profit_amount'],
+        compress=bool(request.GET.get('gzip')),
+    )
 # Task Performance View
 @login_required
 def task_performance(request):
@@ -597,18 +637,7 @@ def update_task_status(request, task_id):
             messages.success(request, 'Task completed successfully!')
         return redirect('update_task_status', task_id=task.id)
     
-    # For completed tasks, just show the review page
-    if task.status == 'Completed':
-        return render(request, 'base/update_task_status.html', {'task': task})
-    
-    # For non-completed tasks, determine status based on due date
-    if not task.document:
-        if task.due_date < now().date():
-            task.status = 'Overdue'
-        else:
-            task.status = 'Pending'
-        task.save(update_fields=['status'])
-    
+    # Read-only: the sweep_overdue_tasks command moves past-due tasks to Overdue
     return render(request, 'base/update_task_status.html', {'task': task})
 
 
@@ -752,10 +781,8 @@ def agent_workpage(request):
     # Fetch recent sales made by the agent
     recent_sales = Sale.objects.filter(agent=employee).order_by('-sale_date')[:5]
     
-    # Calculate sales performance metrics
-    total_sales = Sale.objects.filter(agent=employee).count()
-    total_revenue = Sale.objects.filter(agent=employee).aggregate(total=Sum('sale_price'))['total'] or 0
-    average_sale_price = Sale.objects.filter(agent=employee).aggregate(avg=Avg('sale_price'))['avg'] or 0
+    # Calculate sales performance metrics from the daily rollup
+    total_sales, total_revenue, average_sale_price = agent_sales_totals(employee)
     
     # Get performance metrics
     performance_metrics = PerformanceMetrics.objects.filter(employee=employee).first()
@@ -770,9 +797,7 @@ def agent_workpage(request):
 
     # Fetch available properties and apply pagination
     property_list = PropertyListing.objects.filter(status='Available')
-    paginator = Paginator(property_list, 10)
-    page_number = request.GET.get('page')
-    properties = paginator.get_page(page_number)
+    properties = paginate(property_list, request.GET.get('cursor'), ordering=('pk',))
 
     context = {
         'recent_sales': recent_sales,
@@ -795,111 +820,96 @@ def agent_workpage(request):
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def admin_panel(request):
-    # Employee Performance Metrics
-    employee_performance = PerformanceMetrics.objects.select_related('employee__user').all()
-
-    # Property Status
-    total_properties = PropertyListing.objects.count()
-    available_properties = PropertyListing.objects.filter(status='Available').count()
-    sold_properties = Sale.objects.count()  # Changed to count from Sale model
-    property_status = {
-        'total_properties': total_properties,
-        'available_properties': available_properties,
-        'sold_properties': sold_properties,
-    }
+    context = get_snapshot('admin_panel', build_admin_context)
+    return render(request, 'base/admin_panel.html', context)
 
-    # Financial Overview
-    total_revenue = Revenue.objects.aggregate(total_revenue=Sum('total_revenue'))['total_revenue'] or 0
-    total_expenses = Revenue.objects.aggregate(total_expenses=Sum('total_expenses'))['total_expenses'] or 0
-    net_profit = total_revenue - total_expenses
-    financial_overview = {
-        'total_revenue': total_revenue,
-        'total_expenses': total_expenses,
-        'net_profit': net_profit,
-    }
 
-    # Revenue Trends Data - Get last 12 months of data
-    current_date = now()
-    revenue_data = Revenue.objects.filter(
-        Q(year=current_date.year) |
-        Q(year=current_date.year - 1, month__gt=current_date.month)
-    ).order_by('year', 'month')
-
-    # Format data for the chart
-    revenue_trends = {
-        'labels': [],
-        'total_revenue': [],
-        'total_expenses': [],
-        'net_profit': []
-    }
 
-    for revenue in revenue_data:
-        revenue_trends['labels'].append(f"{revenue.year}-{revenue.month:02d}")
-        revenue_trends['total_revenue'].append(float(revenue.total_revenue))
-        revenue_trends['total_expenses'].append(float(revenue.total_expenses))
-        revenue_trends['net_profit'].append(float(revenue.net_profit))
 
-    # Recent Activities
-    recent_sales = Sale.objects.select_related('property_listing').order_by('-sale_date')[:5]
-    recent_tasks = Task.objects.select_related('assigned_to__user').order_by('-due_date')[:5]
 
-    context = {
-        'employee_performance': employee_performance,
-        'property_status': property_status,
-        'financial_overview': financial_overview,
-        'revenue_trends': json.dumps(revenue_trends),
-        'recent_sales': recent_sales,
-        'recent_tasks': recent_tasks,
-    }
 
-    return render(request, 'base/admin_panel.html', context)
 
 
 
+def predict_revenue(request):
+    from . import forecasting
+
+    field = request.GET.get('series', 'net_profit')
+    if field not in forecasting.FIELDS:
+        field = 'net_profit'
+    try:
+        horizon = min(max(int(request.GET.get('months', forecasting.DEFAULT_HORIZON)), 1), forecasting.MAX_HORIZON)
+    except ValueError:
+        horizon = forecasting.DEFAULT_HORIZON
 
+    # Served from the 'revenue' snapshot; models are only refitted after Revenue changes
+    forecast = forecasting.get_forecast(field, horizon)
+    if forecast is None:
+        return render(request, 'base/predictive_analysis.html', {'message': 'No revenue data available for prediction.'})
 
+    return render(request, 'base/predictive_analysis.html', {
+        'forecast': forecast,
+        'predictions': {row['period']: row['value'] for row in forecast['forecast']},
+        'forecast_fields': forecasting.FIELDS,
+        'forecast_chart': json.dumps({
+            'labels': [row['period'] for row in forecast['history'] + forecast['forecast']],
+            'history': [row['value'] for row in forecast['history']],
+            'forecast': [row['value'] for row in forecast['forecast']],
+            'lower': [row['lower'] for row in forecast['forecast']],
+            'upper': [row['upper'] for row in forecast['forecast']],
+        }),
+    })
 
 
+def _prediction_rows(request):
+    """Feature rows from a JSON (a list, or {"rows": [...]}) or CSV request body."""
+    if request.content_type in ('text/csv', 'application/csv'):
+        return list(csv.DictReader(io.StringIO(request.body.decode(request.encoding or 'utf-8'))))
+    rows = json.loads(request.body)
+    if isinstance(rows, dict):
+        rows = rows.get('rows')
+    if not isinstance(rows, list):
+        raise ValueError('Expected a list of rows or {"rows": [...]}')
+    return rows
 
 
-def predict_revenue(request):
-    # Fetch revenue data
-    revenue_data = Revenue.objects.all().order_by('year', 'month')
-    
-    if not revenue_data.exists():
-        return render(request, 'base/predictive_analysis.html', {'message': 'No revenue data available for prediction.'})
+@login_required
+def predict_property_prices_api(request):
+    """
+    Price a batch of candidate properties with the stored price model. POST
+    JSON or CSV rows of location, floors, area, bedrooms and bathrooms; the
+    response lists one prediction per row, in order. Rows that cannot be read
+    get a null prediction and an entry in `errors`; the rest are still priced.
+    """
+    from . import pricing
+
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=405)
+    try:
+        rows = _prediction_rows(request)
+    except RequestDataTooBig:
+        return JsonResponse({'error': 'Request body too large'}, status=413)
+    except (ValueError, UnicodeDecodeError, csv.Error) as exc:
+        return JsonResponse({'error': f'Cannot read rows: {exc}'}, status=400)
+
+    limit = getattr(settings, 'PRICE_PREDICTION_BATCH_LIMIT', 5000)
+    if len(rows) > limit:
+        return JsonResponse({'error': f'At most {limit} rows per request, got {len(rows)}'}, status=413)
+
+    locations, X, errors = pricing.parse_rows(rows)
+    prices = pricing.predict_many(locations, X)
+    if prices is None:
+        return JsonResponse({'error': 'No price model has been trained yet'}, status=503)
+    return JsonResponse({
+        'count': len(rows),
+        'predictions': [None if index in errors else round(price, 2) for index, price in enumerate(prices.tolist())],
+        'errors': [{'row': index, 'error': message} for index, message in sorted(errors.items())],
+    })
 
-    # Prepare data for prediction
-    dates = []  # X-axis (months since start)
-    revenues = []  # Y-axis (net profit)
-    
-    start_date = datetime(revenue_data.first().year, revenue_data.first().month, 1)
-    for record in revenue_data:
-        date = datetime(record.year, record.month, 1)
-        months_since_start = (date.year - start_date.year) * 12 + (date.month - start_date.month)
-        dates.append([months_since_start])
-        revenues.append(record.net_profit)
-    
-    # Convert to NumPy arrays
-    X = np.array(dates)
-    y = np.array(revenues)
-    
-    # Train linear regression model
-    model = LinearRegression()
-    model.fit(X, y)
-    
-    # Predict revenue for next 3 months
-    predictions = {}
-    last_month = X[-1][0]  # Last recorded month index
-    for i in range(1, 4):
-        next_month_index = last_month + i
-        next_month = (start_date + timedelta(days=30 * next_month_index)).strftime('%Y-%m')
-        predicted_value = model.predict([[next_month_index]])[0]
-        predictions[next_month] = round(predicted_value, 2)
-    
-    return render(request, 'base/predictive_analysis.html', {'predictions': predictions})
 
 def predict_property_price(request):
+    from . import analytics, pricing
+
     # Fetch available locations for filter options
     available_locations = PropertyListing.objects.values_list('location', flat=True).distinct()
 
@@ -907,6 +917,8 @@ def predict_property_price(request):
     selected_location = request.GET.get('location', None)
     selected_floors = request.GET.get('floors', None)
     selected_area = request.GET.get('covered_area', None)
+    selected_bedrooms = request.GET.get('bedrooms', None)
+    selected_bathrooms = request.GET.get('bathrooms', None)
 
     # Filter property data based on user input
     property_data = PropertyListing.objects.filter(price__isnull=False)
@@ -920,79 +932,33 @@ def predict_property_price(request):
             'locations': available_locations
         })
 
-    # Prepare data for graphs
-    property_data_list = []
-    for property in property_data:
-        try:
-            covered_area = float(property.coveredArea.replace('sqft', '').strip())
-            property_data_list.append({
-                'x': covered_area,
-                'y': float(property.price)
-            })
-        except (ValueError, AttributeError):
-            continue
-
-    # Calculate average prices by number of floors
-    floors_data = {}
-    for property in property_data:
-        floors = property.floors
-        if floors not in floors_data:
-            floors_data[floors] = {'total': 0, 'count': 0}
-        floors_data[floors]['total'] += float(property.price)
-        floors_data[floors]['count'] += 1
-
-    floors_labels = []
-    floors_values = []
-    for floors in sorted(floors_data.keys()):
-        floors_labels.append(f'{floors} Floors')
-        floors_values.append(round(floors_data[floors]['total'] / floors_data[floors]['count'], 2))
-
-    # Calculate average prices by location
-    location_data = {}
-    for property in property_data:
-        location = property.location
-        if location not in location_data:
-            location_data[location] = {'total': 0, 'count': 0}
-        location_data[location]['total'] += float(property.price)
-        location_data[location]['count'] += 1
-
-    location_labels = []
-    location_values = []
-    for location in sorted(location_data.keys()):
-        location_labels.append(location)
-        location_values.append(round(location_data[location]['total'] / location_data[location]['count'], 2))
-
-    # Prepare features for prediction
-    features = []
-    prices = []
-    for property in property_data:
-        try:
-            covered_area = float(property.coveredArea.replace('sqft', '').strip())
-        except (ValueError, AttributeError):
-            continue
-        features.append([property.floors, covered_area])
-        prices.append(float(property.price))
+    # Graph data, aggregated by the database rather than by looping over listings
+    property_data_list = analytics.price_vs_area(property_data)
+    floors_stats = analytics.average_price_by(property_data, 'floors')
+    floors_labels = [f'{floors} Floors' for floors, _, _ in floors_stats]
+    floors_values = [average for _, average, _ in floors_stats]
+    location_stats = analytics.average_price_by(property_data, 'location')
+    location_labels = [location for location, _, _ in location_stats]
+    location_values = [average for _, average, _ in location_stats]
 
-    if len(features) < 2:
+    # Predict with the stored price model (see base.pricing); it is trained once, not per request
+    try:
+        predicted_price = pricing.predict(
+            selected_location,
+            floors=int(selected_floors) if selected_floors else 2,
+            covered_area_sqft=float(selected_area) if selected_area else 1500,
+            bedroomCount=int(selected_bedrooms) if selected_bedrooms else None,
+            bathroomCount=int(selected_bathrooms) if selected_bathrooms else None,
+        )
+    except ValueError:
         return render(request, 'base/predictive_analysis.html', {
-            'message': 'Not enough data for prediction.',
+            'message': 'Invalid input values.',
             'locations': available_locations
         })
 
-    # Train model and make prediction
-    X = np.array(features)
-    y = np.array(prices)
-    model = LinearRegression()
-    model.fit(X, y)
-
-    try:
-        input_floors = int(selected_floors) if selected_floors else 2
-        input_area = float(selected_area) if selected_area else 1500
-        sample_features = [[input_floors, input_area]]
-        predicted_price = model.predict(sample_features)[0]
-    except ValueError:
+    if predicted_price is None:
         return render(request, 'base/predictive_analysis.html', {
-            'message': 'Invalid input values.',
+            'message': 'No price model has been trained yet; run the train_price_model command.',
             'locations': available_locations
         })
 
@@ -1003,6 +969,8 @@ def predict_property_price(request):
         'selected_location': selected_location,
         'selected_floors': selected_floors,
         'selected_area': selected_area,
+        'selected_bedrooms': selected_bedrooms,
+        'selected_bathrooms': selected_bathrooms,
         'property_data': json.dumps(property_data_list),
         'floors_labels': json.dumps(floors_labels),
         'floors_data': json.dumps(floors_values),
@@ -1017,6 +985,20 @@ def predict_property_price(request):
 
 
 
+@login_required
+@etag(lambda request, digest, fmt: f'"{digest}-{fmt}"')
+def chart_image(request, digest, fmt):
+    """A chart registered by base.charts.chart_url; its URL is content-addressed, so it never goes stale."""
+    from . import charts
+
+    image = charts.get_image(digest, fmt)
+    if image is None:
+        raise Http404('Unknown chart')
+    response = HttpResponse(image[0], content_type=image[1])
+    patch_cache_control(response, private=True, max_age=charts.cache_timeout(), immutable=True)
+    return response
+
+
 @login_required
 def revenue_dashboard(request):
     # Fetch revenue data and sort it by year and month
@@ -57,6 +57,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'base.middleware.ActivityMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -94,6 +95,30 @@ DATABASES = {
 }
 
 
+# Cache
+# File-based so every gunicorn worker on the host shares dashboard snapshots.
+# Snapshot version counters live in the database (base.SnapshotVersion), so a
+# snapshot is never served stale even when hosts have separate caches.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('DJANGO_CACHE_DIR', str(BASE_DIR / 'cache')),
+    }
+}
+
+SNAPSHOT_CACHE_TIMEOUT = 60 * 60  # Seconds a dashboard snapshot may live
+CHART_CACHE_TIMEOUT = 30 * 24 * 60 * 60  # Seconds a rendered chart is kept (and may be cached by browsers)
+
+# Property search: SQLite FTS5 index; use 'base.search.DatabaseBackend' on other databases
+PROPERTY_SEARCH_BACKEND = 'base.search.SQLiteFTS5Backend'
+
+# Activity tracking (seconds)
+ACTIVITY_IDLE_TIMEOUT = 15 * 60  # Longer gaps between heartbeats count as time away
+ACTIVITY_MIN_HEARTBEAT = 30  # Requests closer together than this are not recorded separately
+ACTIVITY_FLUSH_INTERVAL = 5 * 60  # How often each worker writes buffered hours
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -138,6 +163,20 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Widths (px) of the resized copies made of every property photo
+PROPERTY_IMAGE_WIDTHS = (320, 640, 1280)
+
+# Listing writes after which `train_price_model --if-stale` retrains the price model,
+# and the listings a location needs before it gets a model of its own
+PRICE_MODEL_RETRAIN_THRESHOLD = 500
+PRICE_MODEL_MIN_LOCATION_SAMPLES = 30
+
+# Most rows accepted by one request to the batch price prediction API
+PRICE_PREDICTION_BATCH_LIMIT = 5000
+
+# Listing writes after which `rebuild_comps_index --if-stale` rebuilds the comparable-properties index
+COMPS_REFRESH_THRESHOLD = 100
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -7,6 +7,24 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeSmoothScrolling();
 });
 
+// Activity heartbeat: keeps hours worked accurate while a page stays open
+document.addEventListener('DOMContentLoaded', function() {
+    const pingUrl = document.body.dataset.activityPing;
+    if (!pingUrl) return;
+
+    const csrfCookie = document.cookie.split('; ').find(row => row.startsWith('csrftoken='));
+    const csrfToken = csrfCookie ? csrfCookie.split('=')[1] : '';
+
+    setInterval(function() {
+        if (document.visibilityState !== 'visible') return;
+        fetch(pingUrl, {
+            method: 'POST',
+            headers: { 'X-CSRFToken': csrfToken },
+            credentials: 'same-origin'
+        });
+    }, 5 * 60 * 1000);
+});
+
 //navbar
 document.addEventListener('DOMContentLoaded', function() {
     const mobileMenuButton = document.querySelector('.mobile-menu-button');